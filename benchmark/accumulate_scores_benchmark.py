@@ -0,0 +1,55 @@
+"""
+Benchmark the Python and the NumPy accumulation of plotting data
+
+Usage:
+    python -m benchmark.accumulate_scores_benchmark [amount ...]
+
+Without arguments 10k, 1M and 10M points are benchmarked, the largest size
+needs several GB of memory for the input dicts alone.
+"""
+import sys
+import time
+
+from datetime import datetime, timedelta
+from random import randint, random
+
+from common.utils.plotting import accumulate_scores_numpy, accumulate_scores_python
+
+GRANULARITY_IN_MINUTES = 60
+DEFAULT_AMOUNTS = [10_000, 1_000_000, 10_000_000]
+
+
+def generate_plotting_data(amount: int) -> list:
+    timestamp = datetime(2020, 1, 1)
+    plotting_data = []
+    for _ in range(amount):
+        timestamp += timedelta(seconds=randint(0, 1800))
+        plotting_data.append(
+            {"timestamp": timestamp.isoformat(), "score": random(), "count": 1}
+        )
+    return plotting_data
+
+
+def measure(function, plotting_data: list) -> float:
+    start = time.perf_counter()
+    function(plotting_data, GRANULARITY_IN_MINUTES)
+    return time.perf_counter() - start
+
+
+def main(amounts: list):
+    print(f"{'points':>12} {'python (s)':>12} {'numpy (s)':>12} {'speedup':>8}")
+    for amount in amounts:
+        plotting_data = generate_plotting_data(amount)
+
+        # NumPy first, the Python implementation mutates the input
+        time_numpy = measure(accumulate_scores_numpy, plotting_data)
+        time_python = measure(accumulate_scores_python, plotting_data)
+
+        print(
+            f"{amount:>12} {time_python:>12.3f} {time_numpy:>12.3f} "
+            f"{time_python / time_numpy:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(amount) for amount in sys.argv[1:]] or DEFAULT_AMOUNTS)
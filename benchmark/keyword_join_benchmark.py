@@ -0,0 +1,94 @@
+"""
+Benchmark the join strategies of get_unprocessed_crawls
+
+Usage:
+    python -m benchmark.keyword_join_benchmark [amount ...]
+
+Needs a running MongoDB selected through MONGO_URL, the crawls are written to
+a throwaway database which is dropped afterwards. Every amount of crawls is
+spread over KEYWORD_AMOUNT keywords and read three times: joined by $lookup,
+joined on the client and, after the keyword fields were migrated onto the
+crawls, without any join at all.
+"""
+import sys
+import time
+
+from datetime import datetime
+from bson import ObjectId
+
+from common.config import SUPPORTED_LANGUAGES
+from common.mongo.controller import MongoController
+from common.mongo.data_types.crawling.enums.crawl_types import CrawlTypes
+
+DB_NAME = "apoa-benchmark-keyword-join"
+KEYWORD_AMOUNT = 100
+DEFAULT_AMOUNTS = [10_000, 100_000, 1_000_000]
+
+
+def load_crawls(mongo_controller: MongoController, amount: int) -> None:
+    """
+    Insert the keywords and the unprocessed crawls without keyword fields
+    """
+    keywords = [
+        {
+            "_id": ObjectId(),
+            "keyword_string": f"some keyword {i}",
+            "language": SUPPORTED_LANGUAGES[0],
+            "users": ["some user"],
+            "indexes": [],
+            "deleted": False,
+        }
+        for i in range(KEYWORD_AMOUNT)
+    ]
+    mongo_controller.keywords_collection.insert_many(keywords)
+
+    timestamp = datetime.now()
+    for offset in range(0, amount, 10_000):
+        mongo_controller.crawls_collection.insert_many(
+            {
+                "keyword_ref": keywords[i % KEYWORD_AMOUNT]["_id"],
+                "text": f"some text {i}",
+                "timestamp": timestamp,
+                "crawl_type": CrawlTypes.TWITTER.value,
+                "entities": [],
+                "categories": [],
+            }
+            for i in range(offset, min(offset + 10_000, amount))
+        )
+
+
+def measure(mongo_controller: MongoController, join: str) -> float:
+    start = time.perf_counter()
+    for _ in mongo_controller.iter_unprocessed_crawls(join=join):
+        pass
+    return time.perf_counter() - start
+
+
+def main(amounts: list):
+    mongo_controller = MongoController(db_name=DB_NAME)
+
+    print(
+        f"{'crawls':>10} {'lookup (s)':>12} {'client (s)':>12} "
+        f"{'stored (s)':>12} {'speedup':>8}"
+    )
+    for amount in amounts:
+        mongo_controller.client.drop_database(DB_NAME)
+        mongo_controller.configure_database()
+        load_crawls(mongo_controller, amount)
+
+        time_lookup = measure(mongo_controller, "lookup")
+        time_client = measure(mongo_controller, "client")
+
+        mongo_controller.migrate_crawl_keywords()
+        time_stored = measure(mongo_controller, "client")
+
+        print(
+            f"{amount:>10} {time_lookup:>12.3f} {time_client:>12.3f} "
+            f"{time_stored:>12.3f} {time_lookup / time_client:>7.1f}x"
+        )
+
+    mongo_controller.client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    main([int(amount) for amount in sys.argv[1:]] or DEFAULT_AMOUNTS)
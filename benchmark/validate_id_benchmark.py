@@ -0,0 +1,41 @@
+"""
+Benchmark the overhead the validate_id decorator adds to a call
+
+Usage:
+    python -m benchmark.validate_id_benchmark [calls]
+"""
+import sys
+import timeit
+
+from bson import ObjectId
+
+from common.mongo.decorators.validation import validate_id
+
+DEFAULT_CALLS = 1_000_000
+
+
+def get_keyword_by_id(self, _id, username=None, cast=False):
+    return _id
+
+
+get_keyword_by_id_validated = validate_id("_id")(get_keyword_by_id)
+
+
+def main(calls: int):
+    _id = ObjectId()
+    _id_string = str(_id)
+
+    cases = [
+        ("undecorated", lambda: get_keyword_by_id(None, _id)),
+        ("ObjectId positional", lambda: get_keyword_by_id_validated(None, _id)),
+        ("ObjectId keyword", lambda: get_keyword_by_id_validated(None, _id=_id)),
+        ("str positional", lambda: get_keyword_by_id_validated(None, _id_string)),
+    ]
+
+    for name, call in cases:
+        seconds = timeit.timeit(call, number=calls)
+        print(f"{name:>20}: {seconds / calls * 1e9:8.0f} ns per call")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CALLS)
@@ -21,3 +21,9 @@ class UnsupportedIndexTypeError(Exception):
     def __init__(self, index_type):
         message = f'Unsupported Index Type: "{index_type}"'
         super(UnsupportedIndexTypeError, self).__init__(message)
+
+
+class UnsupportedCrawlTypeError(Exception):
+    def __init__(self, crawl_type):
+        message = f'Unsupported Crawl Type: "{crawl_type}"'
+        super(UnsupportedCrawlTypeError, self).__init__(message)
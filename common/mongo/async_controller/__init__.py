@@ -0,0 +1,229 @@
+"""
+Module to implement the asyncio database interaction functionality
+
+The AsyncMongoController mirrors the MongoController, every query method is a
+coroutine and the iter_* methods are async generators. Queries, pipelines and
+documents are built by the same helpers as in the MongoController, so both
+controllers send the same requests.
+
+Configuring the database (collections, indexes, meta), the cache and the
+migrations are only provided by the MongoController.
+
+Motor is an optional dependency, install the "motor" extra to use this package.
+"""
+
+import threading
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from common.mongo.controller.connection import (
+    PoolStatsListener,
+    client_settings,
+    client_options,
+    resolve_target,
+)
+from common.utils.cache import TTLCache
+
+
+class AsyncMongoController:
+    """
+    Class to handle the database interactions from within an asyncio event loop
+
+    :param str connection_string: The address of the database
+    :param str db_name: The name of the databse
+
+    The connection settings are the same as the ones of the MongoController,
+    see common.mongo.controller.connection.
+    """
+
+    """
+    Imports
+    """
+
+    # Connection
+    from common.mongo.controller.connection import stats, _read_collection
+
+    # Keywords
+    from common.mongo.async_controller.queries_keyword import (
+        _set_deleted_flag,
+        _invalidate_keyword,
+        add_keyword,
+        get_keyword,
+        get_keywords_user,
+        get_keyword_batch_cursor,
+        get_keyword_by_id,
+        get_keywords_by_ids,
+        delete_keyword,
+        get_keywords_public,
+        add_index_to_keyword,
+        delete_index_from_keyword,
+        get_keywords_by_index,
+        get_outdated_keywords,
+        iter_outdated_keywords,
+    )
+
+    # Crawls
+    from common.mongo.controller.queries_crawls import (
+        count_recrawls,
+        _drop_unparseable_bucket,
+    )
+    from common.mongo.async_controller.queries_crawls import (
+        bulk_write_crawls,
+        crawl_keyword_fields,
+        _with_keyword,
+        _join_keywords,
+        _join_keywords_batch,
+        _unprocessed_crawls,
+        get_unprocessed_crawls,
+        iter_unprocessed_crawls,
+        claim_unprocessed_crawls,
+        set_score_crawl,
+        get_crawl_by_id,
+        get_crawls_plotting_data,
+        get_crawls_average_score,
+        get_crawls_texts,
+        iter_crawls_texts,
+        set_entities_crawl,
+        set_categories_crawl,
+        set_processing_results_bulk,
+        get_entities,
+        get_categories,
+    )
+
+    # Rollups
+    from common.mongo.async_controller.queries_rollups import (
+        _set_crawl_values,
+        _update_rollups,
+        _get_rollup_top_values,
+    )
+
+    # Twitter
+    from common.mongo.async_controller.queries_crawls_twitter import (
+        add_crawl_twitter,
+        add_crawls_twitter_bulk,
+        get_crawl_twitter_by_id,
+    )
+
+    # News
+    from common.mongo.async_controller.queries_crawls_news import (
+        add_crawl_news,
+        get_crawl_news,
+    )
+
+    # NYT
+    from common.mongo.async_controller.queries_crawls_nyt import (
+        add_crawl_nyt,
+        get_crawl_nyt,
+    )
+
+    # Users
+    from common.mongo.async_controller.queries_user import (
+        add_user,
+        get_user,
+    )
+
+    # Meta
+    from common.mongo.async_controller.queries_meta import (
+        set_meta_keywords_public_ids,
+        get_meta_keywords_public_ids,
+        is_meta_initialised,
+    )
+
+    # Indexes
+    from common.mongo.async_controller.queries_index import (
+        get_index_by_id,
+        get_index,
+        add_index,
+        get_indexes_by_type,
+        get_indexes,
+    )
+
+    def __init__(
+        self,
+        connection_string=None,
+        db_name=None,
+        max_pool_size=None,
+        min_pool_size=None,
+        wait_queue_timeout_ms=None,
+        compressors=None,
+        analytics_read_preference=None,
+        read_preferences=None,
+        max_staleness_seconds=None,
+        bulk_write_concern=None,
+        event_listeners=None,
+        keyword_cache_size=10000,
+    ):
+        """
+        Setup the controller, the connection is only opened by the first query
+
+        :param str connection_string: The URL used to connect to the database
+        :param str db_name: The databse which shall be using during runtime
+        :param int max_pool_size: The max amount of connections per server
+        :param int min_pool_size: The amount of connections kept open per server
+        :param int wait_queue_timeout_ms: The max time to wait for a free connection
+        :param str compressors: The wire compressors to offer, e.g. "zstd,zlib"
+        :param str analytics_read_preference: The read preference of the analytics
+            aggregations, e.g. "secondaryPreferred"
+        :param dict read_preferences: The read preference per method name
+        :param int max_staleness_seconds: The max replication lag of a secondary
+            serving a routed read, at least 90 seconds
+        :param str bulk_write_concern: The write concern of bulk writes, e.g. "1"
+        :param list event_listeners: Additional pymongo monitoring listeners
+            of the client
+        :param int keyword_cache_size: The max amount of keywords cached by
+            the client side join
+        """
+        connection_string, db_name = resolve_target(connection_string, db_name)
+
+        self.settings = client_settings(
+            max_pool_size=max_pool_size,
+            min_pool_size=min_pool_size,
+            wait_queue_timeout_ms=wait_queue_timeout_ms,
+            compressors=compressors,
+            analytics_read_preference=analytics_read_preference,
+            read_preferences=read_preferences,
+            max_staleness_seconds=max_staleness_seconds,
+            bulk_write_concern=bulk_write_concern,
+        )
+        self.pool_listener = PoolStatsListener()
+
+        self.client = AsyncIOMotorClient(
+            connection_string,
+            event_listeners=[self.pool_listener] + list(event_listeners or []),
+            **client_options(self.settings),
+        )
+        self.db = self.client[db_name]
+
+        # Counters of the work the controller saved, see stats
+        self.counters = {"recrawls_skipped": 0, "plotting_rows_dropped": 0}
+        self.counters_lock = threading.Lock()
+
+        # The keyword fields by keyword ID, see MongoController
+        self.keyword_join_cache = TTLCache(max_size=keyword_cache_size)
+
+        # By default use the default collection names
+        self.set_collections()
+
+    def set_collections(
+        self,
+        keywords_collection_name="keywords",
+        crawls_collection_name="crawls",
+        users_collection_name="users",
+        meta_collection_name="meta",
+        indexes_collection_name="indexes",
+        rollups_collection_name="rollups",
+    ) -> None:
+        """
+        Set the collections used, they have to be created by the MongoController
+        """
+        self.keywords_collection = self.db[keywords_collection_name]
+        self.crawls_collection = self.db[crawls_collection_name]
+        self.users_collection = self.db[users_collection_name]
+        self.meta_collection = self.db[meta_collection_name]
+        self.indexes_collection = self.db[indexes_collection_name]
+        self.rollups_collection = self.db[rollups_collection_name]
+
+    def __str__(self):
+        return 'Currently connected to "{}" using database "{}"'.format(
+            self.client.HOST, self.db.name
+        )
@@ -0,0 +1,514 @@
+"""
+This module deals with the asyncio queries related to all the crawl collections
+
+See common.mongo.controller.queries_crawls for the attributes every crawl has to share.
+"""
+import sys
+
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from common.exceptions.parameters import InvalidParameterError
+from common.mongo import operations, pipelines
+from common.mongo.data_types.crawling.crawl_result import CrawlResult
+from common.mongo.decorators.validation import validate_id
+from common.utils.plotting import accumulate_scores
+
+
+async def bulk_write_crawls(
+    self, write_operations: list, batch_size=1000, apply_bulk_write_concern=True
+) -> dict:
+    """
+    Send write operations to the crawls collection as unordered bulk writes,
+    works just like MongoController.bulk_write_crawls
+
+    :param list write_operations: The pymongo write operations (UpdateOne, ...)
+    :param int batch_size: The max amount of operations sent per bulk write
+    :param boolean apply_bulk_write_concern: If false use the write concern of the
+        collection instead of the bulk_write_concern setting
+    :return: The aggregated matched, modified and upserted counts plus the errors
+    :rtype: dict
+    """
+    collection = self.crawls_collection
+    if apply_bulk_write_concern and self.settings["bulk_write_concern"] is not None:
+        collection = collection.with_options(
+            write_concern=self.settings["bulk_write_concern"]
+        )
+
+    result = operations.bulk_write_result()
+
+    for offset, batch in operations.bulk_batches(write_operations, batch_size):
+        try:
+            details = operations.bulk_write_details(
+                await collection.bulk_write(batch, ordered=False)
+            )
+        except BulkWriteError as ex:  # Some of the operations failed
+            details = ex.details
+
+        operations.merge_bulk_write_result(result, details, offset)
+
+    return result
+
+
+@validate_id("keyword_id")
+async def crawl_keyword_fields(self, keyword_id: ObjectId) -> dict:
+    """
+    Get the keyword fields which are stored on a new crawl of the keyword,
+    served by the keyword_join_cache just like the client side join
+    """
+    keyword_fields = self.keyword_join_cache.get(keyword_id)
+
+    if keyword_fields is None:
+        projection = dict.fromkeys(pipelines.KEYWORD_FIELDS, 1)
+        keyword = await self.keywords_collection.find_one(
+            {"_id": keyword_id}, projection
+        )
+
+        keyword_fields = pipelines.keyword_fields(keyword)
+        self.keyword_join_cache.set(keyword_id, keyword_fields)
+
+    return keyword_fields
+
+
+async def _with_keyword(self, crawl: dict, keep_orphan=False) -> dict:
+    """
+    Attach the keyword fields to a crawl which was stored before they were
+    denormalised, crawls which already hold them are returned as they are
+
+    :param dict crawl: The crawl or None
+    :param boolean keep_orphan: If true, a crawl whose keyword doesn't exist is
+        returned without the keyword fields instead of None
+    """
+    if crawl is None or "keyword_string" in crawl:
+        return crawl
+
+    keyword = None
+    if "keyword_ref" in crawl:
+        keyword = await self.get_keyword_by_id(crawl["keyword_ref"])
+
+    if keyword is None and keep_orphan:
+        return crawl
+
+    return pipelines.crawl_with_keyword(crawl, keyword)
+
+
+async def _join_keywords(self, crawls, batch_size=1000):
+    """
+    Stream crawls and attach the keyword fields to the ones which don't store them,
+    works just like MongoController._join_keywords
+
+    :param crawls: An async iterable of crawls, e.g. a cursor
+    :param int batch_size: The amount of crawls joined at once
+    """
+    batch = []
+    async for crawl in crawls:
+        batch.append(crawl)
+
+        if len(batch) == batch_size:
+            for joined in await self._join_keywords_batch(batch):
+                yield joined
+            batch = []
+
+    for joined in await self._join_keywords_batch(batch):
+        yield joined
+
+
+async def _join_keywords_batch(self, crawls: list) -> list:
+    """
+    Attach the keyword fields to a batch of crawls, the keywords which
+    are not cached are fetched with a single query
+    """
+    keyword_fields_by_ref, missing = operations.cached_keyword_fields(
+        crawls, self.keyword_join_cache
+    )
+
+    if missing:
+        query = {"_id": {"$in": missing}}
+        projection = dict.fromkeys(pipelines.KEYWORD_FIELDS, 1)
+
+        keywords = await self.keywords_collection.find(query, projection).to_list(
+            length=None
+        )
+        operations.cache_keyword_fields(
+            keyword_fields_by_ref, missing, keywords, self.keyword_join_cache
+        )
+
+    return pipelines.crawls_with_keywords(crawls, keyword_fields_by_ref)
+
+
+@validate_id("_id")
+async def get_crawl_by_id(self, _id, cast=False):
+    """
+    Find and return a crawl object using its ID
+
+    :param ObjectId _id: The ID of the crawl
+    :param boolean cast: If true, cast the crawl dict to a CrawlResult
+    """
+    crawl = await self.crawls_collection.find_one(
+        {"_id": _id}, pipelines.CRAWL_PROJECTION
+    )
+
+    crawl = await self._with_keyword(crawl)
+
+    if cast and crawl:
+        crawl = CrawlResult.from_dict(crawl)
+
+    return crawl
+
+
+def _unprocessed_crawls(self, limit, batch_size, join):
+    """
+    Get an async iterator over the unprocessed crawls using the join strategy
+    """
+    if join not in pipelines.JOIN_STRATEGIES:
+        raise InvalidParameterError(join)
+
+    if join == "lookup":
+        pipeline = pipelines.unprocessed_crawls(self.keywords_collection.name, limit)
+        return self.crawls_collection.aggregate(pipeline, batchSize=batch_size)
+
+    cursor = self.crawls_collection.find(
+        {"score": {"$exists": False}},
+        pipelines.CRAWL_PROJECTION,
+        limit=limit or 0,
+        batch_size=batch_size,
+    )
+    return self._join_keywords(cursor, batch_size)
+
+
+async def get_unprocessed_crawls(self, limit=sys.maxsize, cast=False, join="client"):
+    """
+    Get all the crawls which don't have a score yet
+
+    :param int limit: The max amount of returned results
+    :param boolean cast: If true, cast all results to CrawlResult
+    :param str join: How crawls which don't store the keyword fields are joined
+        with their keyword, one of pipelines.JOIN_STRATEGIES
+    :return: Unprocessed crawls
+    :rtype: List<CrawlResult> or List<dict>
+    """
+    if limit >= sys.maxsize:
+        limit = None
+
+    crawls = [crawl async for crawl in self._unprocessed_crawls(limit, 1000, join)]
+
+    if cast:
+        crawls = [CrawlResult.from_dict(crawl) for crawl in crawls]
+
+    return crawls
+
+
+async def iter_unprocessed_crawls(
+    self, limit=None, batch_size=1000, cast=False, join="client"
+):
+    """
+    Stream the crawls which don't have a score yet
+
+    Only one batch of crawls is held in memory at a time.
+
+    :param int limit: The max amount of returned results, no limit if None
+    :param int batch_size: The amount of crawls fetched per round trip
+    :param boolean cast: If true, cast all results to CrawlResult
+    :param str join: How crawls which don't store the keyword fields are joined
+        with their keyword, one of pipelines.JOIN_STRATEGIES
+    :return: Unprocessed crawls
+    :rtype: AsyncGenerator<CrawlResult> or AsyncGenerator<dict>
+    """
+    async for crawl in self._unprocessed_crawls(limit, batch_size, join):
+        yield CrawlResult.from_dict(crawl) if cast else crawl
+
+
+async def claim_unprocessed_crawls(
+    self, worker_id: str, batch_size=100, lease_seconds=300, cast=False
+):
+    """
+    Lease a batch of unprocessed crawls to a worker
+
+    Works just like MongoController.claim_unprocessed_crawls, both controllers
+    can claim from the same collection.
+
+    :param str worker_id: The worker which claims the crawls
+    :param int batch_size: The max amount of claimed crawls
+    :param int lease_seconds: The time the worker has to process the crawls
+    :param boolean cast: If true, cast all results to CrawlResult
+    :return: The claimed crawls
+    :rtype: List<CrawlResult> or List<dict>
+    """
+    now = datetime.utcnow()
+
+    query_claimable = pipelines.claimable_crawls(now)
+
+    candidates = self.crawls_collection.find(query_claimable, {"_id": 1}).limit(
+        batch_size
+    )
+    candidate_ids = [candidate["_id"] async for candidate in candidates]
+
+    if not candidate_ids:
+        return []
+
+    # Only claim the candidates which were not claimed in the meantime
+    lease_token = ObjectId()
+    query, update = pipelines.claim_crawls(
+        candidate_ids, now, worker_id, lease_token, lease_seconds
+    )
+
+    await self.crawls_collection.update_many(query, update)
+
+    cursor = self.crawls_collection.find(
+        pipelines.claimed_crawls(candidate_ids, lease_token),
+        pipelines.CRAWL_PROJECTION,
+    )
+
+    crawls = [crawl async for crawl in self._join_keywords(cursor, batch_size)]
+
+    if cast:
+        crawls = [CrawlResult.from_dict(crawl) for crawl in crawls]
+
+    return crawls
+
+
+@validate_id("_id")
+async def set_score_crawl(self, _id, score, return_object=False, cast=False):
+    """
+    Sets the score of a crawl
+
+    :param ObjectId _id: The id of the crawl
+    :param int score: The score to be set
+    :param boolean return_object: If true return the updated object
+    :param boolean cast: If true cast the returned object to CrawlObject
+    """
+    query = {"_id": _id}
+    update = {"$set": {"score": score}}
+
+    if not return_object:
+        return await self.crawls_collection.update_one(query, update)
+
+    crawl = await self.crawls_collection.find_one_and_update(
+        query,
+        update,
+        projection=pipelines.CRAWL_PROJECTION,
+        return_document=ReturnDocument.AFTER,
+    )
+
+    crawl = await self._with_keyword(crawl)
+
+    if cast and crawl:
+        crawl = CrawlResult.from_dict(crawl)
+
+    return crawl
+
+
+async def set_processing_results_bulk(self, results: list, batch_size=1000) -> dict:
+    """
+    Write the processing results of many crawls using unordered bulk writes
+
+    Every result is applied as one combined $set, missing fields are left untouched.
+    The rollups are moved by the difference to the values read right before the
+    write. Unlike set_entities_crawl and set_categories_crawl this read is not
+    atomic with the write, so the rollups of crawls which are changed concurrently
+    by other writers can drift, run rebuild-rollups to correct them.
+
+    :param list results: Dicts holding the _id plus score, entities and/or categories
+    :param int batch_size: The max amount of results sent per bulk write
+    :return: The aggregated matched and modified counts plus the errors
+    :rtype: dict
+    :raises InvalidParameterError: When a crawl shows up more than once
+    """
+    write_operations, updates, rollup_ids = operations.processing_results_updates(
+        results
+    )
+
+    previous = {}
+    if rollup_ids:
+        query = {"_id": {"$in": rollup_ids}}
+        projection = dict.fromkeys(["keyword_ref"] + list(pipelines.ROLLUP_MEASURES), 1)
+
+        previous = {
+            crawl["_id"]: crawl
+            async for crawl in self.crawls_collection.find(query, projection)
+        }
+
+    bulk_result = await self.bulk_write_crawls(write_operations, batch_size)
+
+    rollups = operations.processing_results_rollups(updates, previous, bulk_result)
+    for kind, changes in rollups.items():
+        await self._update_rollups(kind, changes)
+
+    return bulk_result
+
+
+@validate_id("keyword_id")
+async def get_crawls_plotting_data(
+    self,
+    keyword_id: ObjectId,
+    date_cutoff=None,
+    granularity_in_minutes=60,
+    server_side=False,
+):
+    """
+    Gather all the crawls belonging to the given keyword id
+    and transform the data such that it can be used to plot a graph
+    using the score.
+
+    See MongoController.get_crawls_plotting_data for the bucket semantics.
+
+    :param ObjectId keyword_id: The ID of the keyword
+    :param datetime date_cutoff: Ignore all crawls before this date
+    :param int granularity_in_minutes: The time span of one bucket
+    :param boolean server_side: If true accumulate the scores within the database
+    :return: The buckets in chronological order
+    :rtype: List<{timestamp, score, count}>
+    """
+    # Default date cutoff if none is provided
+    if not date_cutoff:
+        date_cutoff = datetime(1970, 1, 1)
+
+    pipeline = pipelines.crawls_plotting_data(
+        keyword_id, date_cutoff, granularity_in_minutes, server_side
+    )
+
+    collection = self._read_collection(
+        self.crawls_collection, "get_crawls_plotting_data"
+    )
+
+    plotting_data = await collection.aggregate(pipeline).to_list(length=None)
+
+    if server_side:
+        return self._drop_unparseable_bucket(plotting_data)
+
+    return accumulate_scores(plotting_data, granularity_in_minutes)
+
+
+@validate_id("keyword_id")
+async def get_crawls_average_score(self, keyword_id):
+    """
+    Get the average score of a keyword
+
+    :param ObjectId keyword_id: The ID of the keyword
+    """
+    pipeline = pipelines.crawls_average_score(keyword_id)
+
+    collection = self._read_collection(
+        self.crawls_collection, "get_crawls_average_score"
+    )
+
+    results = await collection.aggregate(pipeline).to_list(length=1)
+
+    return results[0]["avg"] if results else None
+
+
+@validate_id("keyword_id")
+async def get_crawls_texts(self, keyword_id: ObjectId):
+    """
+    Get all the texts of a keyword plus their score, newest first
+
+    The texts are sorted by the timestamp converted to a date, so crawls which
+    still store an ISO string are ordered along with the migrated ones.
+    """
+    pipeline = pipelines.crawls_texts(keyword_id)
+
+    # The sort on the converted date can't use an index and may spill to disk
+    cursor = self.crawls_collection.aggregate(pipeline, allowDiskUse=True)
+
+    return await cursor.to_list(length=None)
+
+
+@validate_id("keyword_id")
+async def iter_crawls_texts(self, keyword_id: ObjectId, batch_size=1000):
+    """
+    Stream all the texts of a keyword plus their score
+
+    Only one batch of texts is held in memory at a time, the texts are ordered
+    just like by get_crawls_texts.
+
+    :param ObjectId keyword_id: The ID of the keyword
+    :param int batch_size: The amount of texts fetched per round trip
+    :return: The texts, newest first
+    :rtype: AsyncGenerator<{text, score, timestamp}>
+    """
+    pipeline = pipelines.crawls_texts(keyword_id)
+
+    cursor = self.crawls_collection.aggregate(
+        pipeline, allowDiskUse=True, batchSize=batch_size
+    )
+
+    async for text in cursor:
+        yield text
+
+
+@validate_id("_id")
+async def set_entities_crawl(self, _id: ObjectId, entities: list):
+    """
+    Set the entities of a crawl result and update the rollups
+    """
+    return await self._set_crawl_values(_id, "entities", entities)
+
+
+@validate_id("_id")
+async def set_categories_crawl(self, _id: ObjectId, categories: list):
+    """
+    Set the categories of a crawl result and update the rollups
+    """
+    return await self._set_crawl_values(_id, "categories", categories)
+
+
+@validate_id("keyword_ref")
+async def get_entities(
+    self,
+    keyword_ref: ObjectId,
+    limit=sys.maxsize,
+    allow_disk_use=False,
+    from_rollup=False,
+) -> list:
+    """
+    Get the entities related to a keyword, the most common first
+
+    :param ObjectId keyword_ref: The ID of the keyword
+    :param int limit: The max amount of returned entities
+    :param boolean allow_disk_use: If true the database may spill to disk when
+        the entities of a keyword don't fit into the memory limit of a stage
+    :param boolean from_rollup: If true read the entities from the rollups
+        instead of scanning the crawls
+    :return: {count: int, score: float, value: string}
+    """
+    if from_rollup:
+        return await self._get_rollup_top_values(keyword_ref, "entities", limit)
+
+    pipeline = pipelines.entities(keyword_ref, limit)
+
+    collection = self._read_collection(self.crawls_collection, "get_entities")
+
+    cursor = collection.aggregate(pipeline, allowDiskUse=allow_disk_use)
+    return await cursor.to_list(length=None)
+
+
+@validate_id("keyword_ref")
+async def get_categories(
+    self,
+    keyword_ref: ObjectId,
+    limit=sys.maxsize,
+    allow_disk_use=False,
+    from_rollup=False,
+) -> list:
+    """
+    Get the categories related to a keyword, the most common first
+
+    :param ObjectId keyword_ref: The ID of the keyword
+    :param int limit: The max amount of returned categories
+    :param boolean allow_disk_use: If true the database may spill to disk when
+        the categories of a keyword don't fit into the memory limit of a stage
+    :param boolean from_rollup: If true read the categories from the rollups
+        instead of scanning the crawls
+    :return: {count: int, confidence: float, value: string}
+    """
+    if from_rollup:
+        return await self._get_rollup_top_values(keyword_ref, "categories", limit)
+
+    pipeline = pipelines.categories(keyword_ref, limit)
+
+    collection = self._read_collection(self.crawls_collection, "get_categories")
+
+    cursor = collection.aggregate(pipeline, allowDiskUse=allow_disk_use)
+    return await cursor.to_list(length=None)
@@ -0,0 +1,69 @@
+"""
+All asyncio news crawl result database functionality is defined in this module
+
+Primary key used to define a news article is author + title
+"""
+
+from bson import ObjectId
+from datetime import datetime
+from typing import Union
+
+from common.mongo import pipelines
+from common.mongo.controller.queries_crawls_news import (
+    DEDUPE_FIELDS,
+    MUTABLE_FIELDS,
+    crawl_news_document,
+)
+from common.mongo.data_types.crawling.crawl_results.news_result import NewsResult
+
+
+async def add_crawl_news(
+    self,
+    keyword_id: ObjectId,
+    author: str,
+    title: str,
+    text: str,
+    timestamp: Union[datetime, str],
+    return_object=False,
+    cast=False,
+):
+    """
+    Add a new news article to the crawl collection
+    """
+    document = crawl_news_document(keyword_id, author, title, text, timestamp)
+    document.update(await self.crawl_keyword_fields(keyword_id))
+
+    query, update = pipelines.crawl_upsert(document, DEDUPE_FIELDS, MUTABLE_FIELDS)
+
+    update_result = await self.crawls_collection.update_one(query, update, upsert=True)
+
+    self.count_recrawls(update_result.matched_count)
+
+    if return_object:
+        return await self.get_crawl_news(author, title, cast)
+
+    return update_result
+
+
+async def get_crawl_news(self, author, title, cast=False):
+    """
+    Find a news article using the author and title
+
+    :param str author: The author who has written the article
+    :param str title: The title of the article
+    :param boolean cast: If true cast the returned object to NewsResult
+    :return: The news result found
+    :rtype: NewsResult or None
+    """
+    projection = pipelines.source_projection(["author", "title"])
+
+    news_article = await self.crawls_collection.find_one(
+        {"author": author, "title": title}, projection
+    )
+
+    if news_article is None:  # The article was not found
+        return None
+
+    news_article = await self._with_keyword(news_article, keep_orphan=True)
+
+    return NewsResult.from_dict(news_article) if cast else news_article
@@ -0,0 +1,64 @@
+"""
+All asyncio nyt crawl result database functionality is defined in this module
+"""
+from bson import ObjectId
+from datetime import datetime
+from typing import Union
+
+from common.mongo import pipelines
+from common.mongo.controller.queries_crawls_nyt import (
+    DEDUPE_FIELDS,
+    MUTABLE_FIELDS,
+    crawl_nyt_document,
+)
+from common.mongo.data_types.crawling.crawl_results.nyt_result import NytResult
+
+
+async def add_crawl_nyt(
+    self,
+    keyword_id: ObjectId,
+    article_id: str,
+    text: str,
+    timestamp: Union[datetime, str],
+    return_object=False,
+    cast=False,
+):
+    """
+    Add a new nyt article to the crawl collection
+    """
+    document = crawl_nyt_document(keyword_id, article_id, text, timestamp)
+    document.update(await self.crawl_keyword_fields(keyword_id))
+
+    query, update = pipelines.crawl_upsert(document, DEDUPE_FIELDS, MUTABLE_FIELDS)
+
+    update_result = await self.crawls_collection.update_one(query, update, upsert=True)
+
+    self.count_recrawls(update_result.matched_count)
+
+    if return_object:
+        return await self.get_crawl_nyt(article_id, cast)
+
+    return update_result
+
+
+async def get_crawl_nyt(self, article_id, cast=False):
+    """
+    Find a news article using the article ID
+
+    :param str article_id: The ID of the article provided by NYT
+    :param boolean cast: If true cast the returned object to NytResult
+    :return: The nyt result found
+    :rtype: NytResult or None
+    """
+    projection = pipelines.source_projection(["article_id"])
+
+    nyt_article = await self.crawls_collection.find_one(
+        {"article_id": article_id}, projection
+    )
+
+    if nyt_article is None:  # The article was not found
+        return None
+
+    nyt_article = await self._with_keyword(nyt_article, keep_orphan=True)
+
+    return NytResult.from_dict(nyt_article) if cast else nyt_article
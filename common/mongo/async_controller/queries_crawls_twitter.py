@@ -0,0 +1,113 @@
+"""
+All asyncio twitter crawl result database functionality is defined in this module
+"""
+from bson import ObjectId
+from datetime import datetime
+from pymongo.results import UpdateResult
+from typing import Union
+
+from common.mongo import operations, pipelines
+from common.mongo.controller.queries_crawls_twitter import (
+    DEDUPE_FIELDS,
+    MUTABLE_FIELDS,
+    crawl_twitter_document,
+)
+from common.mongo.data_types.crawling.crawl_results.twitter_result import TwitterResult
+from common.mongo.decorators.validation import validate_id
+
+
+@validate_id("keyword_id")
+async def add_crawl_twitter(
+    self,
+    keyword_id: ObjectId,
+    tweet_id: int,
+    text: str,
+    likes: int,
+    retweets: int,
+    timestamp: Union[datetime, str],
+    return_object=False,
+    cast=False,
+) -> UpdateResult:
+    """
+    Add a new twitter crawl to the crawl twitter collection
+    If the tweet already exists, only its likes and retweets are updated
+    """
+    document = crawl_twitter_document(
+        keyword_id, tweet_id, text, likes, retweets, timestamp
+    )
+    document.update(await self.crawl_keyword_fields(keyword_id))
+
+    query, update = pipelines.crawl_upsert(document, DEDUPE_FIELDS, MUTABLE_FIELDS)
+
+    update_result = await self.crawls_collection.update_one(query, update, upsert=True)
+
+    self.count_recrawls(update_result.matched_count)
+
+    if return_object:
+        return await self.get_crawl_twitter_by_id(tweet_id, cast)
+
+    return update_result
+
+
+@validate_id("keyword_id")
+async def add_crawls_twitter_bulk(
+    self, keyword_id: ObjectId, tweets: list, batch_size=1000
+):
+    """
+    Add many twitter crawls at once using unordered bulk writes
+
+    Tweets are deduplicated on their tweet_id just like in add_crawl_twitter,
+    if the same tweet_id shows up more than once the last occurrence wins.
+    Stored tweets keep their processing results, the matched count tells how
+    many of the tweets were already stored.
+
+    :param ObjectId keyword_id: The ID of the keyword the tweets were found with
+    :param list tweets: Dicts holding tweet_id, text, likes, retweets and timestamp
+    :param int batch_size: The max amount of tweets sent per bulk write
+    :return: The aggregated matched, modified and upserted counts plus the errors,
+        every error holds the tweet_id and the index of its last occurrence in tweets
+    :rtype: dict
+    """
+    keyword_fields = await self.crawl_keyword_fields(keyword_id)
+
+    documents = []
+    for tweet in tweets:
+        document = crawl_twitter_document(
+            keyword_id,
+            tweet["tweet_id"],
+            tweet["text"],
+            tweet["likes"],
+            tweet["retweets"],
+            tweet["timestamp"],
+        )
+        document.update(keyword_fields)
+        documents.append(document)
+
+    write_operations, positions = operations.crawl_upserts(
+        documents, DEDUPE_FIELDS, MUTABLE_FIELDS
+    )
+
+    result = await self.bulk_write_crawls(write_operations, batch_size)
+
+    # Point the errors to the tweets instead of the deduplicated operations
+    operations.point_errors_to_documents(result, documents, positions, DEDUPE_FIELDS)
+
+    self.count_recrawls(result["matched"])
+
+    return result
+
+
+async def get_crawl_twitter_by_id(self, tweet_id: int, cast=False):
+    """
+    Find a twitter result using the tweet id
+    """
+    projection = pipelines.source_projection(["tweet_id", "likes", "retweets"])
+
+    tweet = await self.crawls_collection.find_one({"tweet_id": tweet_id}, projection)
+
+    if tweet is None:  # The tweet was not found
+        return None
+
+    tweet = await self._with_keyword(tweet, keep_orphan=True)
+
+    return TwitterResult.from_dict(tweet) if cast else tweet
@@ -0,0 +1,89 @@
+"""
+Index database functionality of the AsyncMongoController
+"""
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from common.exceptions.parameters import UnsupportedIndexTypeError
+from common.mongo.decorators.validation import validate_id
+from common.mongo.data_types.index import Index, IndexTypes
+
+
+@validate_id("_id")
+async def get_index_by_id(self, _id: ObjectId, cast=False):
+    query = {"_id": _id}
+
+    index = await self.indexes_collection.find_one(query)
+
+    if cast:
+        return Index.from_dict(index)
+    return index
+
+
+async def get_index(self, name: str, cast=False):
+    query = {"name": name}
+
+    index = await self.indexes_collection.find_one(query)
+
+    if cast:
+        return Index.from_dict(index)
+    return index
+
+
+async def add_index(
+    self,
+    name: str,
+    index_type: IndexTypes,
+    username: str,
+    return_object=False,
+    cast=False,
+):
+    """
+    Add a user to an index, the index is created if it doesn't exist yet
+    """
+    query = {"name": name}
+    update = {
+        "$addToSet": {"users": username},
+        "$set": {"deleted": False},
+        "$setOnInsert": {"index_type": index_type},
+    }
+
+    # A concurrent upsert of the same new index hits the unique index, retry once
+    for attempt in range(2):
+        try:
+            index = await self.indexes_collection.find_one_and_update(
+                query, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError:
+            if attempt:
+                raise
+
+    if return_object:
+        return Index.from_dict(index) if cast else index
+
+
+async def get_indexes_by_type(self, index_type: IndexTypes, username: str, cast=False):
+    if index_type not in [index_type.value for index_type in IndexTypes]:
+        raise UnsupportedIndexTypeError(index_type)
+
+    query = {"index_type": index_type, "users": username}
+
+    indexes = await self.indexes_collection.find(query).to_list(length=None)
+
+    if cast:
+        indexes = [Index.from_dict(mongo_result) for mongo_result in indexes]
+
+    return indexes
+
+
+async def get_indexes(self, username: str, cast=False):
+    query = {"users": username}
+
+    indexes = await self.indexes_collection.find(query).to_list(length=None)
+
+    if cast:
+        indexes = [Index.from_dict(mongo_result) for mongo_result in indexes]
+
+    return indexes
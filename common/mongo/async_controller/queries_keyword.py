@@ -0,0 +1,287 @@
+"""
+All keyword database functionality of the AsyncMongoController is defined in this module
+"""
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import InsertOneResult, UpdateResult
+
+from common import config
+from common.exceptions.parameters import UnsupportedLanguageError
+from common.mongo import pipelines
+from common.mongo.data_types.keyword import Keyword
+from common.mongo.decorators.validation import validate_id
+
+
+def _invalidate_keyword(self, _id: ObjectId) -> None:
+    """
+    Remove a keyword from the keyword join cache
+    """
+    self.keyword_join_cache.delete(_id)
+
+
+@validate_id("_id")
+async def _set_deleted_flag(self, _id: ObjectId):
+    """
+    Set the deleted flag of a keyword.
+    This will usually be called after a keyword was altered
+    """
+    query = {"_id": _id}
+
+    await self.keywords_collection.update_one(query, [pipelines.keyword_deleted_flag()])
+
+    self._invalidate_keyword(_id)
+
+
+async def add_keyword(
+    self,
+    keyword_string: str,
+    language: str,
+    username: str,
+    return_object=False,
+    cast=False,
+):
+    """
+    Add a new keyword document to the database or add the user to the
+    existing keyword, both in a single upsert
+
+    :return: The keyword if return_object is set, else an InsertOneResult if
+        the keyword was created or an UpdateResult if the user was added
+    """
+    if language not in config.SUPPORTED_LANGUAGES:
+        raise UnsupportedLanguageError(language)
+
+    query = {"keyword_string": keyword_string, "language": language}
+    update = pipelines.keyword_add_user(username)
+
+    # A concurrent upsert of the same new keyword hits the unique index, retry once
+    for attempt in range(2):
+        try:
+            if return_object:
+                keyword = await self.keywords_collection.find_one_and_update(
+                    query, update, upsert=True, return_document=ReturnDocument.AFTER
+                )
+            else:
+                result = await self.keywords_collection.update_one(
+                    query, update, upsert=True
+                )
+            break
+        except DuplicateKeyError:
+            if attempt:
+                raise
+
+    if return_object:
+        self._invalidate_keyword(keyword["_id"])
+
+        return Keyword.from_dict(keyword) if cast else keyword
+
+    if result.upserted_id is not None:  # Created
+        self._invalidate_keyword(result.upserted_id)
+
+        return InsertOneResult(result.upserted_id, result.acknowledged)
+
+    # The keyword fields of an existing keyword never change,
+    # so the keyword join cache is still valid
+    return result
+
+
+async def get_keyword(
+    self, keyword_string: str, language: str, username=None, cast=False
+):
+    """
+    Get a keyword object from the database
+    """
+    query = {"keyword_string": keyword_string, "language": language}
+
+    keyword = await self.keywords_collection.find_one(query)
+
+    # Make sure the username is associated to the keyword
+    if keyword and username and username not in keyword["users"]:
+        keyword = None
+
+    if keyword and cast:
+        keyword = Keyword.from_dict(keyword)
+
+    return keyword
+
+
+async def get_keywords_user(self, username: str, cast=False):
+    """
+    Get the keywords of a particular username
+    """
+    query = {"users": username}
+
+    keywords = await self.keywords_collection.find(query).to_list(length=None)
+
+    if cast:
+        keywords = [Keyword.from_dict(mongo_result) for mongo_result in keywords]
+
+    return keywords
+
+
+@validate_id("_id")
+async def get_keyword_by_id(self, _id: ObjectId, username=None, cast=False):
+    """
+    Get a keyword via its ID
+    """
+    query = {"_id": _id}
+
+    keyword = await self.keywords_collection.find_one(query)
+
+    # Make sure the username is associated to the keyword
+    if keyword and username and username not in keyword["users"]:
+        keyword = None
+
+    if cast:
+        keyword = Keyword.from_dict(keyword)
+
+    return keyword
+
+
+@validate_id("_id")
+async def delete_keyword(self, _id: ObjectId, username: str) -> UpdateResult:
+    """
+    Delete a user from a keyword given the ID
+    """
+    query = {"_id": _id}
+    update = pipelines.keyword_remove_user(username)
+
+    deletion = await self.keywords_collection.update_one(query, update)
+
+    self._invalidate_keyword(_id)
+
+    return deletion
+
+
+def get_keyword_batch_cursor(self):
+    """
+    Get a cursor over all keywords which returns raw BSON batches
+
+    :return: A cursor with batches of size 100
+    :rtype: AsyncIOMotorCursor
+    """
+    cursor = self.keywords_collection.find_raw_batches(no_cursor_timeout=True)
+    return cursor
+
+
+async def get_keywords_by_ids(self, _ids: list, cast=False) -> list:
+    """
+    Get many keywords via their IDs with a single query
+
+    The keywords are returned in the order of the IDs, IDs which
+    don't belong to a keyword are skipped.
+
+    :param list _ids: The IDs of the keywords
+    :param boolean cast: If true, cast all results to Keyword
+    :return: The keywords found
+    :rtype: List<Keyword> or List<dict>
+    """
+    _ids = [_id if type(_id) is ObjectId else ObjectId(_id) for _id in _ids]
+
+    query = {"_id": {"$in": _ids}}
+
+    keywords_by_id = {
+        keyword["_id"]: keyword
+        async for keyword in self.keywords_collection.find(query)
+    }
+
+    keywords = [keywords_by_id[_id] for _id in _ids if _id in keywords_by_id]
+
+    if cast:
+        keywords = [Keyword.from_dict(mongo_result) for mongo_result in keywords]
+
+    return keywords
+
+
+async def get_keywords_public(self, cast=False) -> list:
+    keywords_public_ids = await self.get_meta_keywords_public_ids()
+
+    return await self.get_keywords_by_ids(keywords_public_ids, cast=cast)
+
+
+@validate_id(["keyword_id", "index_id"])
+async def add_index_to_keyword(
+    self, keyword_id: ObjectId, index_id: ObjectId, return_object=False, cast=False
+):
+    query = {"_id": keyword_id}
+    update = {"$addToSet": {"indexes": index_id}}
+
+    if not return_object:
+        await self.keywords_collection.update_one(query, update)
+        return
+
+    keyword = await self.keywords_collection.find_one_and_update(
+        query, update, return_document=ReturnDocument.AFTER
+    )
+
+    return Keyword.from_dict(keyword) if cast else keyword
+
+
+@validate_id(["keyword_id", "index_id"])
+async def delete_index_from_keyword(
+    self, keyword_id: ObjectId, index_id: ObjectId, return_object=False, cast=False
+):
+    query = {"_id": keyword_id}
+    update = {"$pull": {"indexes": index_id}}
+
+    if not return_object:
+        await self.keywords_collection.update_one(query, update)
+        return
+
+    keyword = await self.keywords_collection.find_one_and_update(
+        query, update, return_document=ReturnDocument.AFTER
+    )
+
+    return Keyword.from_dict(keyword) if cast else keyword
+
+
+@validate_id("index_id")
+async def get_keywords_by_index(self, index_id: ObjectId, cast=False):
+    query = {"indexes": index_id}
+
+    keywords = await self.keywords_collection.find(query).to_list(length=None)
+
+    if cast:
+        keywords = [Keyword.from_dict(mongo_result) for mongo_result in keywords]
+
+    return keywords
+
+
+async def get_outdated_keywords(self, timestamp: datetime, cast=False):
+    """
+    Get all keywords which have crawls older than the timestamp
+
+    :param datetime timestamp: Crawls up to this point in time are outdated
+    :param boolean cast: If true, cast all results to Keyword
+    :return: The distinct outdated keywords
+    :rtype: List<Keyword> or List<dict>
+    """
+    pipeline = pipelines.outdated_keywords(self.keywords_collection.name, timestamp)
+
+    keywords = await self.crawls_collection.aggregate(pipeline).to_list(length=None)
+
+    if cast:
+        keywords = [Keyword.from_dict(mongo_result) for mongo_result in keywords]
+
+    return keywords
+
+
+async def iter_outdated_keywords(
+    self, timestamp: datetime, batch_size=1000, cast=False
+):
+    """
+    Stream all keywords which have crawls older than the timestamp
+
+    :param datetime timestamp: Crawls up to this point in time are outdated
+    :param int batch_size: The amount of keywords fetched per round trip
+    :param boolean cast: If true, cast all results to Keyword
+    :return: The distinct outdated keywords
+    :rtype: AsyncGenerator<Keyword> or AsyncGenerator<dict>
+    """
+    pipeline = pipelines.outdated_keywords(self.keywords_collection.name, timestamp)
+
+    async for keyword in self.crawls_collection.aggregate(
+        pipeline, batchSize=batch_size
+    ):
+        yield Keyword.from_dict(keyword) if cast else keyword
@@ -0,0 +1,42 @@
+"""
+This module deals with the asyncio queries related to the meta collection
+
+There is only ONE object in this collection
+"""
+from pymongo import ReturnDocument
+
+
+async def set_meta_keywords_public_ids(
+    self, keywords_public_ids: list, return_object=False
+) -> dict:
+    query = {}
+    update = {"$set": {"keywords_public_ids": keywords_public_ids}}
+
+    if return_object:
+        meta = await self.meta_collection.find_one_and_update(
+            query,
+            update,
+            projection={"keywords_public_ids": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return meta["keywords_public_ids"]
+
+    return await self.meta_collection.update_one(query, update, upsert=True)
+
+
+async def get_meta_keywords_public_ids(self) -> dict:
+    query = {}
+    projection = {"keywords_public_ids": 1}
+
+    meta = await self.meta_collection.find_one(query, projection)
+
+    return meta["keywords_public_ids"]
+
+
+async def is_meta_initialised(self) -> bool:
+    query = {}
+
+    exists = await self.meta_collection.find_one(query)
+
+    return True if exists else False
@@ -0,0 +1,63 @@
+"""
+The asyncio maintenance of the entity and category rollups is defined in this module
+
+See common.mongo.controller.queries_rollups for how the rollups are structured.
+"""
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.results import UpdateResult
+
+from common.mongo import pipelines
+from common.mongo.controller.queries_rollups import _update_result
+
+
+async def _set_crawl_values(
+    self, _id: ObjectId, kind: str, values: list
+) -> UpdateResult:
+    """
+    Set the entities or categories of a crawl and update the rollups
+
+    :param ObjectId _id: The ID of the crawl
+    :param str kind: entities or categories
+    :param list values: The new entities or categories
+    """
+    previous = await self.crawls_collection.find_one_and_update(
+        {"_id": _id},
+        {"$set": {kind: values}},
+        projection={"_id": 0, "keyword_ref": 1, kind: 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+
+    if previous is not None:
+        await self._update_rollups(
+            kind, [(previous.get("keyword_ref"), previous.get(kind), values)]
+        )
+
+    acknowledged = self.crawls_collection.write_concern.acknowledged
+
+    return _update_result(previous, kind, values, acknowledged)
+
+
+async def _update_rollups(self, kind: str, changes: list) -> None:
+    """
+    Apply the changes of the entities or categories of crawls to the rollups
+
+    :param str kind: entities or categories
+    :param list changes: (keyword_ref, previous values, current values) per crawl
+    """
+    operations = [
+        UpdateOne(query, update, upsert=True)
+        for query, update in pipelines.rollup_updates(kind, changes)
+    ]
+
+    if operations:
+        await self.rollups_collection.bulk_write(operations, ordered=False)
+
+
+async def _get_rollup_top_values(self, keyword_ref: ObjectId, kind: str, limit: int):
+    """
+    Get the most common entities or categories of a keyword from the rollups
+    """
+    pipeline = pipelines.rollup_top_values(keyword_ref, kind, limit)
+
+    return await self.rollups_collection.aggregate(pipeline).to_list(length=None)
@@ -0,0 +1,50 @@
+"""
+This module handles all user database interactions of the AsyncMongoController
+"""
+import asyncio
+
+from passlib.hash import pbkdf2_sha512
+from datetime import datetime
+
+from common.mongo.data_types.user import User
+
+
+async def add_user(self, username, password, is_hashed=False):
+    """
+    Hashes input password and adds new user to the database
+
+    Hashing takes a while, it runs in the default executor to not block the event loop.
+
+    :param str username: The username of the new user
+    :param str password: The password of the new user
+    :param boolean is_hashed: Is the password hashed yet?
+    """
+    if not is_hashed:
+        loop = asyncio.get_running_loop()
+        password = await loop.run_in_executor(None, pbkdf2_sha512.encrypt, password)
+
+    today = datetime.now()  # Time of creation
+
+    document = {
+        "username": username,
+        "password": password,
+        "created_at": today.isoformat(),
+    }
+
+    return await self.users_collection.insert_one(document)
+
+
+async def get_user(self, username):
+    """
+    Get a user from the database
+
+    :param str username: The username of the user
+    """
+    query = {"username": username}
+
+    user_dict = await self.users_collection.find_one(query)
+
+    if user_dict:
+        return User.from_dict(user_dict)
+    else:
+        return None
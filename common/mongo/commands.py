@@ -0,0 +1,94 @@
+"""
+Maintenance commands which are run against the database by hand
+
+Usage:
+    python -m common.mongo.commands <command> [options]
+
+The database is selected through MONGO_URL and MONGO_DATABASE_NAME.
+"""
+import argparse
+
+from common.mongo.controller import MongoController
+
+
+def configure(mongo_controller: MongoController, args) -> None:
+    """
+    Create the collections and apply the schemas and indexes
+    """
+    mongo_controller.configure_database()
+
+    print(f"Configured database {mongo_controller.db.name}")
+    for method_name in mongo_controller.find_collection_scans():
+        print(f"The query of {method_name} is not backed by an index")
+
+
+def migrate_timestamps(mongo_controller: MongoController, args) -> None:
+    """
+    Convert the string timestamps of legacy crawls to native dates
+    """
+    result = mongo_controller.migrate_crawl_timestamps(
+        batch_size=args.batch_size, start_after=args.start_after
+    )
+
+    print(f"Migrated {result['migrated']} crawls, last ID: {result['last_id']}")
+    for _id in result["failed"]:
+        print(f"Could not parse the timestamp of crawl {_id}")
+
+
+def migrate_keywords(mongo_controller: MongoController, args) -> None:
+    """
+    Store the keyword_string and language of the keyword on legacy crawls
+    """
+    result = mongo_controller.migrate_crawl_keywords(batch_size=args.batch_size)
+
+    print(f"Migrated {result['migrated']} crawls")
+
+
+def rebuild_rollups(mongo_controller: MongoController, args) -> None:
+    """
+    Recompute the entity and category rollups from the crawls
+    """
+    written = mongo_controller.rebuild_rollups(
+        keyword_ref=args.keyword_id, batch_size=args.batch_size
+    )
+
+    print(f"Rebuilt {written} rollups")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_configure = subparsers.add_parser(
+        "configure", help=configure.__doc__.strip()
+    )
+    parser_configure.set_defaults(run=configure)
+
+    parser_timestamps = subparsers.add_parser(
+        "migrate-timestamps", help=migrate_timestamps.__doc__.strip()
+    )
+    parser_timestamps.add_argument("--batch-size", type=int, default=1000)
+    parser_timestamps.add_argument("--start-after", default=None)
+    parser_timestamps.set_defaults(run=migrate_timestamps)
+
+    parser_keywords = subparsers.add_parser(
+        "migrate-keywords", help=migrate_keywords.__doc__.strip()
+    )
+    parser_keywords.add_argument("--batch-size", type=int, default=1000)
+    parser_keywords.set_defaults(run=migrate_keywords)
+
+    parser_rollups = subparsers.add_parser(
+        "rebuild-rollups", help=rebuild_rollups.__doc__.strip()
+    )
+    parser_rollups.add_argument("--keyword-id", default=None)
+    parser_rollups.add_argument("--batch-size", type=int, default=1000)
+    parser_rollups.set_defaults(run=rebuild_rollups)
+
+    args = parser.parse_args()
+    args.run(MongoController(), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,17 +7,31 @@ The idea to structre this class in this way comes from this stack overflow post:
 https://stackoverflow.com/questions/9155618/splitting-a-class-that-is-too-large
 """
 
+import threading
+
 from pymongo import MongoClient
 
-from common.utils.environment import check_environment
+from common.mongo.controller.connection import (
+    PoolStatsListener,
+    client_settings,
+    client_options,
+    resolve_target,
+)
+from common.utils.cache import TTLCache
 
 
 class MongoController:
     """
     Class to handle the database interactions
 
+    Constructing a controller is cheap, no request is sent until the first query.
+
     :param str connection_string: The address of the database
     :param str db_name: The name of the databse
+    :param boolean configure: If true apply the schemas and indexes right away
+
+    The connection settings (pool size, compression, analytics read preference,
+    bulk write concern) are described in common.mongo.controller.connection.
     """
 
     """
@@ -28,10 +42,32 @@ class MongoController:
     from common.mongo.controller.setup import (
         set_db,
         configure_database,
-        create_collection_if_not_exists,
+        find_collection_scans,
         set_collections,
     )
 
+    # Connection
+    from common.mongo.controller.connection import stats, _read_collection
+
+    # Cache
+    from common.mongo.controller.cache import (
+        enable_cache,
+        disable_cache,
+        get_cache_stats,
+        start_cache_invalidation,
+        stop_cache_invalidation,
+        _watch_cache_changes,
+        _tail_cache_invalidation,
+        _evict_change,
+        _cache_get,
+        _cache_get_by_key,
+        _cache_set,
+        _cache_set_keyword,
+        _cache_set_index,
+        _invalidate_keyword,
+        _invalidate_index,
+    )
+
     # Keywords
     from common.mongo.controller.queries_keyword import (
         _set_deleted_flag,
@@ -40,31 +76,54 @@ class MongoController:
         get_keywords_user,
         get_keyword_batch_cursor,
         get_keyword_by_id,
+        get_keywords_by_ids,
         delete_keyword,
         get_keywords_public,
         add_index_to_keyword,
         delete_index_from_keyword,
         get_keywords_by_index,
         get_outdated_keywords,
+        iter_outdated_keywords,
     )
 
     # Crawls
     from common.mongo.controller.queries_crawls import (
+        bulk_write_crawls,
+        count_recrawls,
+        _drop_unparseable_bucket,
+        crawl_keyword_fields,
+        _with_keyword,
+        _join_keywords,
+        _join_keywords_batch,
+        _unprocessed_crawls,
         get_unprocessed_crawls,
+        iter_unprocessed_crawls,
+        claim_unprocessed_crawls,
         set_score_crawl,
         get_crawl_by_id,
         get_crawls_plotting_data,
         get_crawls_average_score,
         get_crawls_texts,
+        iter_crawls_texts,
         set_entities_crawl,
         set_categories_crawl,
+        set_processing_results_bulk,
         get_entities,
         get_categories,
     )
 
+    # Rollups
+    from common.mongo.controller.queries_rollups import (
+        _set_crawl_values,
+        _update_rollups,
+        _get_rollup_top_values,
+        rebuild_rollups,
+    )
+
     # Twitter
     from common.mongo.controller.queries_crawls_twitter import (
         add_crawl_twitter,
+        add_crawls_twitter_bulk,
         get_crawl_twitter_by_id,
     )
 
@@ -93,6 +152,12 @@ class MongoController:
         is_meta_initialised,
     )
 
+    # Migrations
+    from common.mongo.controller.migrations import (
+        migrate_crawl_timestamps,
+        migrate_crawl_keywords,
+    )
+
     # Indexes
     from common.mongo.controller.queries_index import (
         get_index_by_id,
@@ -102,33 +167,92 @@ class MongoController:
         get_indexes,
     )
 
-    def __init__(self, connection_string=None, db_name=None):
+    def __init__(
+        self,
+        connection_string=None,
+        db_name=None,
+        configure=False,
+        max_pool_size=None,
+        min_pool_size=None,
+        wait_queue_timeout_ms=None,
+        compressors=None,
+        analytics_read_preference=None,
+        read_preferences=None,
+        max_staleness_seconds=None,
+        bulk_write_concern=None,
+        event_listeners=None,
+        keyword_cache_size=10000,
+        client=None,
+    ):
         """
-        Setup the controller with a connection to the database and all configurations loaded
+        Setup the controller, the connection is only opened by the first query
 
         :param str connection_string: The URL used to connect to the database
         :param str db_name: The databse which shall be using during runtime
+        :param boolean configure: If true call configure_database, this only has to
+            be done once per database, see python -m common.mongo.commands configure
+        :param int max_pool_size: The max amount of connections per server
+        :param int min_pool_size: The amount of connections kept open per server
+        :param int wait_queue_timeout_ms: The max time to wait for a free connection
+        :param str compressors: The wire compressors to offer, e.g. "zstd,zlib"
+        :param str analytics_read_preference: The read preference of the analytics
+            aggregations, e.g. "secondaryPreferred"
+        :param dict read_preferences: The read preference per method name
+        :param int max_staleness_seconds: The max replication lag of a secondary
+            serving a routed read, at least 90 seconds
+        :param str bulk_write_concern: The write concern of bulk writes, e.g. "1"
+        :param list event_listeners: Additional pymongo monitoring listeners
+            of the client
+        :param int keyword_cache_size: The max amount of keywords cached to join
+            them with crawls which don't store the keyword fields
+        :param MongoClient client: An existing client to share instead of creating
+            one, the client options and event_listeners are then ignored and the
+            pool stats are only counted by the controller which created it
         """
-        # If no direct parameter is provided, check for env vars
-        if not connection_string:
-            connection_string = check_environment("MONGO_URL", connection_string)
-        if not db_name:
-            db_name = check_environment("MONGO_DATABASE_NAME", db_name)
-
-        # If not even env vars were provided, use default values
-        if not connection_string:
-            connection_string = "mongodb://localhost:27017"
-        if not db_name:
-            db_name = "default_db"
-
-        self.client = MongoClient(connection_string)
+        connection_string, db_name = resolve_target(connection_string, db_name)
+
+        self.settings = client_settings(
+            max_pool_size=max_pool_size,
+            min_pool_size=min_pool_size,
+            wait_queue_timeout_ms=wait_queue_timeout_ms,
+            compressors=compressors,
+            analytics_read_preference=analytics_read_preference,
+            read_preferences=read_preferences,
+            max_staleness_seconds=max_staleness_seconds,
+            bulk_write_concern=bulk_write_concern,
+        )
+        self.pool_listener = PoolStatsListener()
+
+        if client is None:
+            client = MongoClient(
+                connection_string,
+                connect=False,
+                event_listeners=[self.pool_listener] + list(event_listeners or []),
+                **client_options(self.settings),
+            )
+
+        self.client = client
         self.db = self.client[db_name]
 
+        # Counters of the work the controller saved, see stats
+        self.counters = {"recrawls_skipped": 0, "plotting_rows_dropped": 0}
+        self.counters_lock = threading.Lock()
+
+        # The cache is disabled until enable_cache is called
+        self.cache = None
+        self.cache_invalidation_stop = None
+        self.cache_invalidation_failures = 0
+        self.cache_invalidation_error = None
+
+        # The keyword fields by keyword ID, always on as the fields never change
+        self.keyword_join_cache = TTLCache(max_size=keyword_cache_size)
+
         # By default use the default collection names
         self.set_collections()
 
         # Configure the database
-        self.configure_database()
+        if configure:
+            self.configure_database()
 
     def __str__(self):
         return 'Currently connected to "{}" using database "{}"'.format(
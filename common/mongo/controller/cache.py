@@ -0,0 +1,294 @@
+"""
+The optional read through cache of the mongo controller is defined in this module
+
+Keywords and indexes are cached by their ID, their natural key (keyword_string +
+language, name) only maps to the ID. The natural key of a document never changes,
+so invalidating the ID is all it takes to evict a document. The meta data is
+cached under ("meta",).
+The cache is process local, every method which mutates a cached document
+has to invalidate it. Changes made by other processes are only picked up once
+the entries expire, unless start_cache_invalidation is running.
+"""
+import threading
+
+from copy import deepcopy
+from pymongo.errors import PyMongoError
+
+from common.utils.cache import TTLCache
+
+# The max time to wait before a failed change stream is resumed
+MAX_RESUME_BACKOFF_SECONDS = 60
+
+
+def enable_cache(self, max_size=10000, ttl_seconds=300) -> None:
+    """
+    Cache keyword, index and meta data lookups
+
+    :param int max_size: The max amount of cached entries
+    :param float ttl_seconds: The time an entry stays valid
+    """
+    self.cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+
+def disable_cache(self) -> None:
+    """
+    Stop caching and drop all cached entries
+    """
+    self.stop_cache_invalidation()
+    self.cache = None
+
+
+def start_cache_invalidation(self) -> bool:
+    """
+    Evict cache entries whenever any process changes a keyword, an index or
+    the meta data, by tailing a change stream in a background thread
+
+    Change streams need a replica set or sharded cluster, on a standalone
+    server the cache stays in TTL only mode.
+
+    :return: True if the change stream is tailed, False if only the TTL applies
+    :rtype: boolean
+    """
+    if self.cache is None:
+        return False
+
+    if self.cache_invalidation_stop is not None:  # Already running
+        return True
+
+    try:
+        change_stream = self._watch_cache_changes()
+    except PyMongoError:  # Change streams are not supported by the deployment
+        return False
+
+    self.cache_invalidation_stop = threading.Event()
+
+    thread = threading.Thread(
+        target=self._tail_cache_invalidation,
+        args=(change_stream, self.cache_invalidation_stop),
+        daemon=True,
+    )
+    thread.start()
+
+    return True
+
+
+def stop_cache_invalidation(self) -> None:
+    """
+    Stop tailing the change stream, the cache falls back to TTL only mode
+    """
+    if self.cache_invalidation_stop is not None:
+        self.cache_invalidation_stop.set()
+        self.cache_invalidation_stop = None
+
+
+def _watch_cache_changes(self, resume_after=None):
+    """
+    Open a change stream of the keywords, indexes and meta collections
+
+    :param dict resume_after: The resume token to continue after, if any
+    """
+    pipeline = [
+        {
+            "$match": {
+                "ns.coll": {
+                    "$in": [
+                        self.keywords_collection.name,
+                        self.indexes_collection.name,
+                        self.meta_collection.name,
+                    ]
+                }
+            }
+        }
+    ]
+
+    # Only the documentKey is needed to evict, the changed documents are not fetched
+    return self.db.watch(pipeline, max_await_time_ms=1000, resume_after=resume_after)
+
+
+def _tail_cache_invalidation(self, change_stream, stop: threading.Event) -> None:
+    """
+    Evict the cache entry of every change until stop is set
+
+    A failing change stream is resumed after the last seen change with an
+    exponential backoff. Only if resuming fails as well, changes might have been
+    missed and the cache starts over empty. The failures are counted in
+    get_cache_stats.
+    """
+    resume_token = None
+    attempt = 0
+
+    while not stop.is_set():
+        try:
+            if change_stream is None:
+                change_stream = self._watch_cache_changes(resume_token)
+
+            with change_stream:
+                while not stop.is_set() and change_stream.alive:
+                    change = change_stream.try_next()
+                    resume_token = change_stream.resume_token
+                    attempt = 0
+
+                    if change is not None:
+                        self._evict_change(change)
+        except PyMongoError as ex:
+            self.cache_invalidation_failures += 1
+            self.cache_invalidation_error = str(ex)
+
+            # Without a token or after a failed resume the changes can't be replayed
+            if resume_token is None or attempt > 0:
+                resume_token = None
+                if self.cache is not None:
+                    self.cache.clear()
+
+            stop.wait(min(2 ** attempt, MAX_RESUME_BACKOFF_SECONDS))
+            attempt += 1
+
+        change_stream = None
+
+    # Only reset the state if it still belongs to this thread
+    if self.cache_invalidation_stop is stop:
+        self.cache_invalidation_stop = None
+
+
+def _evict_change(self, change: dict) -> None:
+    """
+    Evict the cache entries affected by a change stream event
+    """
+    if self.cache is None:
+        return
+
+    if "documentKey" not in change:  # drop, rename, invalidate, ...
+        self.cache.clear()
+        return
+
+    collection_name = change["ns"]["coll"]
+    _id = change["documentKey"]["_id"]
+
+    if collection_name == self.keywords_collection.name:
+        self._invalidate_keyword(_id)
+    elif collection_name == self.indexes_collection.name:
+        self._invalidate_index(_id)
+    elif collection_name == self.meta_collection.name:
+        self.cache.delete(("meta",))
+
+
+def get_cache_stats(self) -> dict:
+    """
+    Get the hit and miss counters of the cache and the state of the invalidation
+
+    invalidation_running tells if the change stream is tailed,
+    invalidation_failures counts the errors of the change stream and
+    invalidation_error holds the last one.
+
+    :return: The cache stats or None if the cache is disabled
+    :rtype: dict
+    """
+    if self.cache is None:
+        return None
+
+    stats = self.cache.stats()
+    stats["invalidation_running"] = self.cache_invalidation_stop is not None
+    stats["invalidation_failures"] = self.cache_invalidation_failures
+    stats["invalidation_error"] = self.cache_invalidation_error
+    return stats
+
+
+def _cache_get(self, key: tuple) -> dict:
+    """
+    Get a copy of a cached document, None if it isn't cached
+    """
+    if self.cache is None:
+        return None
+
+    document = self.cache.get(key)
+    return deepcopy(document) if document is not None else None
+
+
+def _cache_get_by_key(self, key: tuple, kind: str) -> dict:
+    """
+    Get a copy of a document cached by its ID through its natural key,
+    None if it isn't cached
+
+    :param tuple key: The natural key which maps to the ID
+    :param str kind: The first element of the ID key, e.g. keyword
+    """
+    if self.cache is None:
+        return None
+
+    # Only the lookup of the document counts as hit or miss
+    return self._cache_get((kind, self.cache.peek(key)))
+
+
+def _cache_set(self, keys: list, document: dict) -> None:
+    """
+    Cache a document under all of its keys
+    """
+    if self.cache is None or document is None:
+        return
+
+    document = deepcopy(document)
+    for key in keys:
+        self.cache.set(key, document)
+
+
+def _cache_set_keyword(self, keyword: dict) -> None:
+    if self.cache is None or keyword is None:
+        return
+
+    self._cache_set([("keyword", keyword["_id"])], keyword)
+    self.cache.set(
+        ("keyword_string", keyword["keyword_string"], keyword["language"]),
+        keyword["_id"],
+    )
+
+
+def _cache_set_index(self, index: dict) -> None:
+    if self.cache is None or index is None:
+        return
+
+    self._cache_set([("index", index["_id"])], index)
+    self.cache.set(("index_name", index["name"]), index["_id"])
+
+
+def _invalidate_keyword(self, _id=None, keyword_string=None, language=None) -> None:
+    """
+    Remove a keyword from the cache and from the keyword join cache,
+    either identified by its ID or by its keyword_string and language
+
+    If only the natural key is given but it was already evicted, the ID is looked
+    up since the keyword might still be cached under it.
+    """
+    if self.cache is not None and keyword_string is not None:
+        key = ("keyword_string", keyword_string, language)
+        if _id is None:
+            _id = self.cache.peek(key)
+        if _id is None:
+            keyword = self.keywords_collection.find_one(
+                {"keyword_string": keyword_string, "language": language}, {"_id": 1}
+            )
+            _id = keyword["_id"] if keyword else None
+        self.cache.delete(key)
+
+    if _id is None:
+        return
+
+    self.keyword_join_cache.delete(_id)
+    if self.cache is not None:
+        self.cache.delete(("keyword", _id))
+
+
+def _invalidate_index(self, _id=None, name=None) -> None:
+    """
+    Remove an index from the cache, either identified by its ID or by its name
+    """
+    if self.cache is None:
+        return
+
+    if name is not None:
+        key = ("index_name", name)
+        if _id is None:
+            _id = self.cache.peek(key)
+        self.cache.delete(key)
+
+    if _id is not None:
+        self.cache.delete(("index", _id))
@@ -0,0 +1,302 @@
+"""
+The connection settings of the mongo controller are defined in this module
+
+Every setting can be passed to the MongoController or set through an env var,
+a parameter takes precedence over the env var:
+
+    max_pool_size             MONGO_MAX_POOL_SIZE
+    min_pool_size             MONGO_MIN_POOL_SIZE
+    wait_queue_timeout_ms     MONGO_WAIT_QUEUE_TIMEOUT_MS
+    compressors               MONGO_COMPRESSORS, e.g. "zstd,zlib"
+    analytics_read_preference MONGO_ANALYTICS_READ_PREFERENCE, e.g. "secondaryPreferred"
+    read_preferences          MONGO_READ_PREFERENCES, e.g. "get_entities=nearest"
+    max_staleness_seconds     MONGO_MAX_STALENESS_SECONDS, at least 90
+    bulk_write_concern        MONGO_BULK_WRITE_CONCERN, e.g. "1" or "majority"
+
+Settings which are not set keep the driver defaults.
+A bulk_write_concern of "0" doesn't wait for the server to apply the bulk writes,
+their results are then unacknowledged and hold neither counts nor errors.
+
+Read preferences are routed per method, the analytics_read_preference applies to
+all ANALYTICS_METHODS and read_preferences overrides single ANALYTICS_METHODS,
+other method names are rejected. The max staleness applies to every routed read
+preference except primary. Methods which aren't routed, like the ingestion and
+the leasing of crawls, use the primary.
+"""
+import threading
+
+from pymongo import WriteConcern
+from pymongo.monitoring import ConnectionPoolListener
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+
+from common.exceptions.parameters import InvalidParameterError
+from common.utils.environment import check_environment
+
+# The read heavy aggregations which can be served by secondaries
+ANALYTICS_METHODS = [
+    "get_crawls_plotting_data",
+    "get_crawls_average_score",
+    "get_entities",
+    "get_categories",
+]
+
+
+class PoolStatsListener(ConnectionPoolListener):
+    """
+    Count the connection pool events of a client, summed over all servers
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checked_out": 0,
+            "check_out_failures": 0,
+            "pools_cleared": 0,
+        }
+
+    def _increment(self, counter: str, amount=1) -> None:
+        with self.lock:
+            self.counters[counter] += amount
+
+    def pool_created(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._increment("pools_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._increment("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._increment("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._increment("check_out_failures")
+
+    def connection_checked_out(self, event):
+        self._increment("checked_out")
+
+    def connection_checked_in(self, event):
+        self._increment("checked_out", -1)
+
+    def stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.counters)
+
+        stats["connections_open"] = (
+            stats["connections_created"] - stats["connections_closed"]
+        )
+        return stats
+
+
+def resolve_target(connection_string=None, db_name=None) -> tuple:
+    """
+    Resolve the database to connect to, falling back to the env vars
+    MONGO_URL and MONGO_DATABASE_NAME and then to the defaults
+
+    :return: connection_string, db_name
+    :rtype: tuple
+    """
+    # If no direct parameter is provided, check for env vars
+    if not connection_string:
+        connection_string = check_environment("MONGO_URL", connection_string)
+    if not db_name:
+        db_name = check_environment("MONGO_DATABASE_NAME", db_name)
+
+    # If not even env vars were provided, use default values
+    if not connection_string:
+        connection_string = "mongodb://localhost:27017"
+    if not db_name:
+        db_name = "default_db"
+
+    return connection_string, db_name
+
+
+def _setting(value, variable_name: str):
+    """
+    Get a setting from the parameter, falling back to the env var
+    """
+    return value if value is not None else check_environment(variable_name, None)
+
+
+def _parse_int(value):
+    return int(value) if value is not None else None
+
+
+def _parse_read_preference(value, max_staleness_seconds=None):
+    """
+    Parse a read preference name like secondaryPreferred
+    """
+    if value is None or not isinstance(value, str):
+        return value
+
+    mode = read_pref_mode_from_name(value)
+
+    if max_staleness_seconds is None or value == "primary":
+        return make_read_preference(mode, None)
+    return make_read_preference(mode, None, max_staleness_seconds)
+
+
+def _parse_read_preferences(value) -> dict:
+    """
+    Parse the read preferences per method like
+    get_entities=secondaryPreferred,get_categories=nearest
+
+    :raises InvalidParameterError: When a method is not one of ANALYTICS_METHODS
+    """
+    if value is None or isinstance(value, dict):
+        read_preferences = dict(value or {})
+    else:
+        read_preferences = {}
+        for route in value.split(","):
+            method_name, read_preference = route.split("=")
+            read_preferences[method_name.strip()] = read_preference.strip()
+
+    # Only the analytics methods read through _read_collection
+    for method_name in read_preferences:
+        if method_name not in ANALYTICS_METHODS:
+            raise InvalidParameterError(method_name)
+
+    return read_preferences
+
+
+def _parse_write_concern(value):
+    """
+    Parse a write concern like 1 or majority
+    """
+    if value is None or isinstance(value, WriteConcern):
+        return value
+    value = str(value)
+    return WriteConcern(w=int(value) if value.isdigit() else value)
+
+
+def client_settings(
+    max_pool_size=None,
+    min_pool_size=None,
+    wait_queue_timeout_ms=None,
+    compressors=None,
+    analytics_read_preference=None,
+    read_preferences=None,
+    max_staleness_seconds=None,
+    bulk_write_concern=None,
+) -> dict:
+    """
+    Resolve the connection settings from the parameters and the env vars
+
+    :return: The resolved settings, None if a setting is not set, read_preferences
+        maps the routed method names to their read preference
+    :rtype: dict
+    """
+    compressors = _setting(compressors, "MONGO_COMPRESSORS")
+    if isinstance(compressors, (list, tuple)):
+        compressors = ",".join(compressors)
+
+    max_staleness_seconds = _parse_int(
+        _setting(max_staleness_seconds, "MONGO_MAX_STALENESS_SECONDS")
+    )
+
+    analytics_read_preference = _parse_read_preference(
+        _setting(analytics_read_preference, "MONGO_ANALYTICS_READ_PREFERENCE"),
+        max_staleness_seconds,
+    )
+
+    routes = {}
+    if analytics_read_preference is not None:
+        routes = dict.fromkeys(ANALYTICS_METHODS, analytics_read_preference)
+
+    routes.update(
+        {
+            method_name: _parse_read_preference(read_preference, max_staleness_seconds)
+            for method_name, read_preference in _parse_read_preferences(
+                _setting(read_preferences, "MONGO_READ_PREFERENCES")
+            ).items()
+        }
+    )
+
+    return {
+        "max_pool_size": _parse_int(_setting(max_pool_size, "MONGO_MAX_POOL_SIZE")),
+        "min_pool_size": _parse_int(_setting(min_pool_size, "MONGO_MIN_POOL_SIZE")),
+        "wait_queue_timeout_ms": _parse_int(
+            _setting(wait_queue_timeout_ms, "MONGO_WAIT_QUEUE_TIMEOUT_MS")
+        ),
+        "compressors": compressors,
+        "analytics_read_preference": analytics_read_preference,
+        "read_preferences": routes,
+        "max_staleness_seconds": max_staleness_seconds,
+        "bulk_write_concern": _parse_write_concern(
+            _setting(bulk_write_concern, "MONGO_BULK_WRITE_CONCERN")
+        ),
+    }
+
+
+def client_options(settings: dict) -> dict:
+    """
+    Translate the resolved settings to MongoClient keyword arguments
+    """
+    options = {
+        "maxPoolSize": settings["max_pool_size"],
+        "minPoolSize": settings["min_pool_size"],
+        "waitQueueTimeoutMS": settings["wait_queue_timeout_ms"],
+        "compressors": settings["compressors"],
+    }
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def stats(self) -> dict:
+    """
+    Get the connection pool counters, the connection settings in use
+    and the counters of the controller
+
+    connections_open and checked_out are gauges, the other counters are
+    totals since the client was created. recrawls_skipped counts the crawls
+    which were added again but kept their processing results,
+    plotting_rows_dropped the crawls left out of the server side plotting data
+    as their timestamp couldn't be converted.
+
+    :return: {pool: {...}, settings: {...}, counters: {...}}
+    :rtype: dict
+    """
+    settings = dict(self.settings)
+    for key in ["analytics_read_preference", "bulk_write_concern"]:
+        if settings[key] is not None:
+            settings[key] = settings[key].document
+
+    settings["read_preferences"] = {
+        method_name: read_preference.document
+        for method_name, read_preference in settings["read_preferences"].items()
+    }
+
+    with self.counters_lock:
+        counters = dict(self.counters)
+
+    return {
+        "pool": self.pool_listener.stats(),
+        "settings": settings,
+        "counters": counters,
+    }
+
+
+def _read_collection(self, collection, method_name: str):
+    """
+    Get the collection with the read preference routed to the method
+
+    :param Collection collection: The collection the method reads from
+    :param str method_name: The name of the controller method
+    """
+    read_preference = self.settings["read_preferences"].get(method_name)
+
+    if read_preference is None:
+        return collection
+
+    return collection.with_options(read_preference=read_preference)
@@ -0,0 +1,99 @@
+"""
+All data migrations of the database are defined in this module
+
+Every migration works in batches and only touches documents which still need
+to be migrated, so it can be interrupted and run again at any time.
+"""
+from bson import ObjectId
+from pymongo import UpdateMany, UpdateOne
+
+from common.mongo import pipelines
+
+from common.utils.dates import parse_timestamp
+
+
+def migrate_crawl_timestamps(self, batch_size=1000, start_after=None) -> dict:
+    """
+    Convert the string timestamps of legacy crawls to native dates
+
+    :param int batch_size: The amount of crawls migrated per round trip
+    :param ObjectId start_after: Only migrate crawls with a greater ID, use the
+        returned last_id to resume an interrupted migration
+    :return: The amount of migrated crawls, the IDs of the crawls whose timestamp
+        could not be parsed and the ID of the last crawl looked at
+    :rtype: dict
+    """
+    result = {"migrated": 0, "failed": [], "last_id": start_after}
+
+    while True:
+        query = {"timestamp": {"$type": "string"}}
+        if result["last_id"] is not None:
+            query["_id"] = {"$gt": ObjectId(result["last_id"])}
+
+        crawls = list(
+            self.crawls_collection.find(query, {"timestamp": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+
+        if not crawls:
+            return result
+
+        operations = []
+        for crawl in crawls:
+            try:
+                timestamp = parse_timestamp(crawl["timestamp"])
+            except (ValueError, OverflowError):
+                result["failed"].append(crawl["_id"])
+                continue
+
+            # Match the old value so concurrent writes are not overwritten
+            query = {"_id": crawl["_id"], "timestamp": crawl["timestamp"]}
+            update = {"$set": {"timestamp": timestamp}}
+            operations.append(UpdateOne(query, update))
+
+        # The migrated counts need acknowledged writes
+        if operations:
+            bulk_result = self.bulk_write_crawls(
+                operations, batch_size, apply_bulk_write_concern=False
+            )
+            result["migrated"] += bulk_result["modified"]
+
+        result["last_id"] = crawls[-1]["_id"]
+
+
+def migrate_crawl_keywords(self, batch_size=1000) -> dict:
+    """
+    Store the keyword_string and language of the keyword on legacy crawls
+
+    The crawls are updated per keyword, only crawls which don't hold
+    the fields yet are touched.
+
+    :param int batch_size: The amount of keywords whose crawls are migrated
+        per bulk write
+    :return: The amount of migrated crawls
+    :rtype: dict
+    """
+    result = {"migrated": 0}
+
+    projection = dict.fromkeys(pipelines.KEYWORD_FIELDS, 1)
+    keywords = self.keywords_collection.find({}, projection, batch_size=batch_size)
+
+    # The migrated counts need acknowledged writes
+    def write(operations):
+        return self.bulk_write_crawls(operations, apply_bulk_write_concern=False)
+
+    operations = []
+    for keyword in keywords:
+        query = {"keyword_ref": keyword["_id"], "keyword_string": {"$exists": False}}
+        update = {"$set": pipelines.keyword_fields(keyword)}
+        operations.append(UpdateMany(query, update))
+
+        if len(operations) == batch_size:
+            result["migrated"] += write(operations)["modified"]
+            operations = []
+
+    if operations:
+        result["migrated"] += write(operations)["modified"]
+
+    return result
@@ -10,15 +10,172 @@ Those attributes are:
     - language
 """
 import sys
-import math
 
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime, timedelta
-from dateutil import parser
+from itertools import islice
+from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 
+from common.exceptions.parameters import InvalidParameterError
+from common.mongo import operations, pipelines
 from common.mongo.data_types.crawling.crawl_result import CrawlResult
 from common.mongo.decorators.validation import validate_id
+from common.utils.plotting import accumulate_scores
+
+
+def bulk_write_crawls(
+    self, write_operations: list, batch_size=1000, apply_bulk_write_concern=True
+) -> dict:
+    """
+    Send write operations to the crawls collection as unordered bulk writes
+
+    The operations are split into chunks of batch_size, a failing operation
+    does not stop the remaining ones from being applied.
+
+    :param list write_operations: The pymongo write operations (UpdateOne, ...)
+    :param int batch_size: The max amount of operations sent per bulk write
+    :param boolean apply_bulk_write_concern: If false use the write concern of the
+        collection instead of the bulk_write_concern setting
+    :return: The aggregated matched, modified and upserted counts plus the errors,
+        the index of an error refers to the position within write_operations. With an
+        unacknowledged write concern (w=0) acknowledged is False and the counts
+        are None, as the server reports neither counts nor errors.
+    :rtype: dict
+    """
+    collection = self.crawls_collection
+    if apply_bulk_write_concern and self.settings["bulk_write_concern"] is not None:
+        collection = collection.with_options(
+            write_concern=self.settings["bulk_write_concern"]
+        )
+
+    result = operations.bulk_write_result()
+
+    for offset, batch in operations.bulk_batches(write_operations, batch_size):
+        try:
+            details = operations.bulk_write_details(
+                collection.bulk_write(batch, ordered=False)
+            )
+        except BulkWriteError as ex:  # Some of the operations failed
+            details = ex.details
+
+        operations.merge_bulk_write_result(result, details, offset)
+
+    return result
+
+
+def count_recrawls(self, amount: int) -> None:
+    """
+    Count the crawls which were already stored when they were added again,
+    their processing results were kept so they are not processed again
+
+    The amount of unacknowledged writes is unknown (None) and not counted.
+    """
+    if amount is None:
+        return
+
+    with self.counters_lock:
+        self.counters["recrawls_skipped"] += amount
+
+
+def _drop_unparseable_bucket(self, plotting_data: list) -> list:
+    """
+    Remove the bucket of the crawls whose timestamp couldn't be converted
+    from the server side plotting data and count them as dropped
+    """
+    buckets = []
+    for bucket in plotting_data:
+        if bucket.pop("_id") is not None:
+            buckets.append(bucket)
+            continue
+
+        with self.counters_lock:
+            self.counters["plotting_rows_dropped"] += bucket["count"]
+
+    return buckets
+
+
+@validate_id("keyword_id")
+def crawl_keyword_fields(self, keyword_id: ObjectId) -> dict:
+    """
+    Get the keyword fields which are stored on a new crawl of the keyword,
+    served by the keyword_join_cache just like the client side join
+    """
+    keyword_fields = self.keyword_join_cache.get(keyword_id)
+
+    if keyword_fields is None:
+        projection = dict.fromkeys(pipelines.KEYWORD_FIELDS, 1)
+        keyword = self.keywords_collection.find_one({"_id": keyword_id}, projection)
+
+        keyword_fields = pipelines.keyword_fields(keyword)
+        self.keyword_join_cache.set(keyword_id, keyword_fields)
+
+    return keyword_fields
+
+
+def _with_keyword(self, crawl: dict, keep_orphan=False) -> dict:
+    """
+    Attach the keyword fields to a crawl which was stored before they were
+    denormalised, crawls which already hold them are returned as they are
+
+    :param dict crawl: The crawl or None
+    :param boolean keep_orphan: If true, a crawl whose keyword doesn't exist is
+        returned without the keyword fields instead of None
+    """
+    if crawl is None or "keyword_string" in crawl:
+        return crawl
+
+    # Served by the cache if it is enabled
+    keyword = None
+    if "keyword_ref" in crawl:
+        keyword = self.get_keyword_by_id(crawl["keyword_ref"])
+
+    if keyword is None and keep_orphan:
+        return crawl
+
+    return pipelines.crawl_with_keyword(crawl, keyword)
+
+
+def _join_keywords(self, crawls, batch_size=1000):
+    """
+    Stream crawls and attach the keyword fields to the ones which don't store them
+
+    The distinct keywords of every batch of crawls are resolved with a single
+    $in query, keywords which were resolved before are served by the
+    keyword_join_cache of the controller. Crawls whose keyword doesn't exist
+    are dropped just like $lookup + $unwind does.
+
+    :param crawls: An iterable of crawls, e.g. a cursor
+    :param int batch_size: The amount of crawls joined at once
+    """
+    crawls = iter(crawls)
+    while True:
+        batch = list(islice(crawls, batch_size))
+        if not batch:
+            return
+
+        yield from self._join_keywords_batch(batch)
+
+
+def _join_keywords_batch(self, crawls: list) -> list:
+    """
+    Attach the keyword fields to a batch of crawls, the keywords which
+    are not cached are fetched with a single query
+    """
+    keyword_fields_by_ref, missing = operations.cached_keyword_fields(
+        crawls, self.keyword_join_cache
+    )
+
+    if missing:
+        query = {"_id": {"$in": missing}}
+        projection = dict.fromkeys(pipelines.KEYWORD_FIELDS, 1)
+
+        keywords = list(self.keywords_collection.find(query, projection))
+        operations.cache_keyword_fields(
+            keyword_fields_by_ref, missing, keywords, self.keyword_join_cache
+        )
+
+    return pipelines.crawls_with_keywords(crawls, keyword_fields_by_ref)
 
 
 @validate_id("_id")
@@ -29,36 +186,9 @@ def get_crawl_by_id(self, _id, cast=False):
     :param ObjectId _id: The ID of the crawl
     :param boolean cast: If true, cast the crawl dict to a CrawlResult
     """
-    pipeline = [
-        {"$match": {"_id": _id,}},
-        {"$limit": 1,},
-        {
-            "$lookup": {
-                "from": self.keywords_collection.name,
-                "localField": "keyword_ref",
-                "foreignField": "_id",
-                "as": "keyword",
-            }
-        },
-        {"$unwind": "$keyword"},
-        {
-            "$project": {
-                "_id": 1,
-                "keyword_ref": 1,
-                "keyword_string": "$keyword.keyword_string",
-                "language": "$keyword.language",
-                "text": 1,
-                "timestamp": 1,
-                "entities": 1,
-                "categories": 1,
-            }
-        },
-    ]
+    crawl = self.crawls_collection.find_one({"_id": _id}, pipelines.CRAWL_PROJECTION)
 
-    try:
-        crawl = self.crawls_collection.aggregate(pipeline).next()
-    except:
-        crawl = None
+    crawl = self._with_keyword(crawl)
 
     if cast and crawl:
         crawl = CrawlResult.from_dict(crawl)
@@ -66,42 +196,112 @@ def get_crawl_by_id(self, _id, cast=False):
     return crawl
 
 
-def get_unprocessed_crawls(self, limit=sys.maxsize, cast=False):
+def _unprocessed_crawls(self, limit, batch_size, join):
+    """
+    Get an iterator over the unprocessed crawls using the join strategy
+    """
+    if join not in pipelines.JOIN_STRATEGIES:
+        raise InvalidParameterError(join)
+
+    if join == "lookup":
+        pipeline = pipelines.unprocessed_crawls(self.keywords_collection.name, limit)
+        return self.crawls_collection.aggregate(pipeline, batchSize=batch_size)
+
+    cursor = self.crawls_collection.find(
+        {"score": {"$exists": False}},
+        pipelines.CRAWL_PROJECTION,
+        limit=limit or 0,
+        batch_size=batch_size,
+    )
+    return self._join_keywords(cursor, batch_size)
+
+
+def get_unprocessed_crawls(self, limit=sys.maxsize, cast=False, join="client"):
     """
     Get all the crawls which don't have a score yet
 
     :param int limit: The max amount of returned results
     :param boolean cast: If true, cast all results to CrawlResult
+    :param str join: How crawls which don't store the keyword fields are joined
+        with their keyword, one of pipelines.JOIN_STRATEGIES
     :return: Unprocessed crawls
     :rtype: List<CrawlResult> or List<dict>
     """
-    pipeline = [
-        {"$match": {"score": {"$exists": False}}},
-        {"$limit": limit},
-        {
-            "$lookup": {
-                "from": self.keywords_collection.name,
-                "localField": "keyword_ref",
-                "foreignField": "_id",
-                "as": "keyword",
-            }
-        },
-        {"$unwind": "$keyword"},
-        {
-            "$project": {
-                "_id": 1,
-                "keyword_ref": 1,
-                "keyword_string": "$keyword.keyword_string",
-                "language": "$keyword.language",
-                "text": 1,
-                "timestamp": 1,
-                "entities": 1,
-                "categories": 1,
-            }
-        },
-    ]
-
-    crawls = list(self.crawls_collection.aggregate(pipeline))
+    if limit >= sys.maxsize:
+        limit = None
+
+    crawls = list(self._unprocessed_crawls(limit, 1000, join))
+
+    if cast:
+        crawls = [CrawlResult.from_dict(crawl) for crawl in crawls]
+
+    return crawls
+
+
+def iter_unprocessed_crawls(
+    self, limit=None, batch_size=1000, cast=False, join="client"
+):
+    """
+    Stream the crawls which don't have a score yet
+
+    Only one batch of crawls is held in memory at a time.
+
+    :param int limit: The max amount of returned results, no limit if None
+    :param int batch_size: The amount of crawls fetched per round trip
+    :param boolean cast: If true, cast all results to CrawlResult
+    :param str join: How crawls which don't store the keyword fields are joined
+        with their keyword, one of pipelines.JOIN_STRATEGIES
+    :return: Unprocessed crawls
+    :rtype: Generator<CrawlResult> or Generator<dict>
+    """
+    for crawl in self._unprocessed_crawls(limit, batch_size, join):
+        yield CrawlResult.from_dict(crawl) if cast else crawl
+
+
+def claim_unprocessed_crawls(
+    self, worker_id: str, batch_size=100, lease_seconds=300, cast=False
+):
+    """
+    Lease a batch of unprocessed crawls to a worker
+
+    Claimed crawls are skipped by the other workers until the lease expires,
+    crawls whose lease expired without being scored can be claimed again.
+    If workers compete for the same crawls, a worker may get less than
+    batch_size crawls even though more are unprocessed.
+
+    :param str worker_id: The worker which claims the crawls
+    :param int batch_size: The max amount of claimed crawls
+    :param int lease_seconds: The time the worker has to process the crawls
+    :param boolean cast: If true, cast all results to CrawlResult
+    :return: The claimed crawls
+    :rtype: List<CrawlResult> or List<dict>
+    """
+    now = datetime.utcnow()
+
+    query_claimable = pipelines.claimable_crawls(now)
+
+    candidates = self.crawls_collection.find(query_claimable, {"_id": 1}).limit(
+        batch_size
+    )
+    candidate_ids = [candidate["_id"] for candidate in candidates]
+
+    if not candidate_ids:
+        return []
+
+    # Only claim the candidates which were not claimed in the meantime
+    lease_token = ObjectId()
+    query, update = pipelines.claim_crawls(
+        candidate_ids, now, worker_id, lease_token, lease_seconds
+    )
+
+    self.crawls_collection.update_many(query, update)
+
+    cursor = self.crawls_collection.find(
+        pipelines.claimed_crawls(candidate_ids, lease_token),
+        pipelines.CRAWL_PROJECTION,
+    )
+
+    crawls = list(self._join_keywords(cursor, batch_size))
 
     if cast:
         crawls = [CrawlResult.from_dict(crawl) for crawl in crawls]
@@ -122,104 +322,109 @@ def set_score_crawl(self, _id, score, return_object=False, cast=False):
     query = {"_id": _id}
     update = {"$set": {"score": score}}
 
-    update_result = self.crawls_collection.update_one(query, update)
+    if not return_object:
+        return self.crawls_collection.update_one(query, update)
 
-    if return_object:
-        return self.get_crawl_by_id(_id, cast=cast)
+    crawl = self.crawls_collection.find_one_and_update(
+        query,
+        update,
+        projection=pipelines.CRAWL_PROJECTION,
+        return_document=ReturnDocument.AFTER,
+    )
 
-    return update_result
+    crawl = self._with_keyword(crawl)
 
+    if cast and crawl:
+        crawl = CrawlResult.from_dict(crawl)
+
+    return crawl
 
-def __accumulate_scores(plotting_data: list, granularity_in_minutes: int) -> list:
-    plotting_data_accumulated = []
-    if not plotting_data or len(plotting_data) == 0:
-        return plotting_data
 
-    accumulator = plotting_data[0]
-    cut_off = parser.parse(accumulator["timestamp"]) + timedelta(
-        minutes=granularity_in_minutes
+def set_processing_results_bulk(self, results: list, batch_size=1000) -> dict:
+    """
+    Write the processing results of many crawls using unordered bulk writes
+
+    Every result is applied as one combined $set, missing fields are left untouched.
+    The rollups are moved by the difference to the values read right before the
+    write. Unlike set_entities_crawl and set_categories_crawl this read is not
+    atomic with the write, so the rollups of crawls which are changed concurrently
+    by other writers can drift, run rebuild-rollups to correct them.
+
+    :param list results: Dicts holding the _id plus score, entities and/or categories
+    :param int batch_size: The max amount of results sent per bulk write
+    :return: The aggregated matched and modified counts plus the errors
+    :rtype: dict
+    :raises InvalidParameterError: When a crawl shows up more than once
+    """
+    write_operations, updates, rollup_ids = operations.processing_results_updates(
+        results
     )
-    for i in range(len(plotting_data)):
-        if i == 0:
-            continue
-        data = plotting_data[i]
-        if parser.parse(data["timestamp"]) <= cut_off:
-            accumulator["score"] = (
-                accumulator["score"] * accumulator["count"]
-                + data["score"] * data["count"]
-            ) / (accumulator["count"] + data["count"])
-            accumulator["count"] += data["count"]
-        else:
-            plotting_data_accumulated.append(accumulator)
-            accumulator = data
-            cut_off = parser.parse(accumulator["timestamp"]) + timedelta(
-                minutes=granularity_in_minutes
-            )
 
-    if accumulator["count"] > 0:
-        plotting_data_accumulated.append(accumulator)
+    previous = {}
+    if rollup_ids:
+        query = {"_id": {"$in": rollup_ids}}
+        projection = dict.fromkeys(["keyword_ref"] + list(pipelines.ROLLUP_MEASURES), 1)
+
+        previous = {
+            crawl["_id"]: crawl
+            for crawl in self.crawls_collection.find(query, projection)
+        }
 
-    return plotting_data_accumulated
+    bulk_result = self.bulk_write_crawls(write_operations, batch_size)
+
+    rollups = operations.processing_results_rollups(updates, previous, bulk_result)
+    for kind, changes in rollups.items():
+        self._update_rollups(kind, changes)
+
+    return bulk_result
 
 
 @validate_id("keyword_id")
 def get_crawls_plotting_data(
-    self, keyword_id: ObjectId, date_cutoff=None, granularity_in_minutes=60
+    self,
+    keyword_id: ObjectId,
+    date_cutoff=None,
+    granularity_in_minutes=60,
+    server_side=False,
 ):
     """
     Gather all the crawls belonging to the given keyword id
     and transform the data such that it can be used to plot a graph
     using the score.
 
-    You could be more efficient by implementing the Accumulation of the scores piecewise
-    in the mongo query. This seems to be quite the challenge and the for loop is just of O(N).
-    Still an improvement worth making if this function slows down the process.
+    By default the scores are accumulated in Python, every bucket starts at the
+    first crawl after the previous bucket and spans granularity_in_minutes.
+    If server_side is set, the accumulation is done by the database instead, the
+    buckets are then aligned to multiples of granularity_in_minutes since the
+    epoch and only one row per bucket is transferred. This needs MongoDB 4.0+
+    ($convert), crawls whose timestamp can't be converted to a date are left out
+    and counted as plotting_rows_dropped, see stats.
+
+    :param ObjectId keyword_id: The ID of the keyword
+    :param datetime date_cutoff: Ignore all crawls before this date
+    :param int granularity_in_minutes: The time span of one bucket
+    :param boolean server_side: If true accumulate the scores within the database
+    :return: The buckets in chronological order
+    :rtype: List<{timestamp, score, count}>
     """
     # Default date cutoff if none is provided
     if not date_cutoff:
         date_cutoff = datetime(1970, 1, 1)
 
-    pipeline = [
-        {
-            "$match": {
-                "keyword_ref": keyword_id,
-                "score": {"$exists": True},
-                "timestamp": {"$gte": date_cutoff.isoformat()},
-            },
-        },
-        {"$project": {"_id": 0, "timestamp": 1, "score": 1, "count": {"$literal": 1}}},
-        {"$sort": {"timestamp": 1},},
-    ]
-
-    plotting_data = list(self.crawls_collection.aggregate(pipeline))
-
-    thread_size = 1000
-    threads_amount = math.ceil(len(plotting_data) / thread_size)
-
-    futures = []
-    for i in range(threads_amount):
-        plotting_data_slice = plotting_data[i * thread_size : (i + 1) * thread_size]
-
-        executor = ThreadPoolExecutor()
-        future = executor.submit(
-            __accumulate_scores, plotting_data_slice, granularity_in_minutes
-        )
-        futures.append({"future": future, "position": i})
+    pipeline = pipelines.crawls_plotting_data(
+        keyword_id, date_cutoff, granularity_in_minutes, server_side
+    )
 
-    results = [
-        {"future": future["future"].result(), "position": future["position"]}
-        for future in futures
-    ]
+    collection = self._read_collection(
+        self.crawls_collection, "get_crawls_plotting_data"
+    )
 
-    plotting_data_accumulated = []
-    for result in results:
-        plotting_data_accumulated += result["future"]
+    plotting_data = list(collection.aggregate(pipeline))
 
-    plotting_data_accumulated = __accumulate_scores(
-        plotting_data_accumulated, granularity_in_minutes
-    )
+    if server_side:
+        return self._drop_unparseable_bucket(plotting_data)
 
-    return plotting_data_accumulated
+    return accumulate_scores(plotting_data, granularity_in_minutes)
 
 
 @validate_id("keyword_id")
@@ -229,13 +434,14 @@ def get_crawls_average_score(self, keyword_id):
 
     :param ObjectId keyword_id: The ID of the keyword
     """
-    pipeline = [
-        {"$match": {"keyword_ref": keyword_id},},
-        {"$group": {"_id": "$keyword_ref", "avg": {"$avg": "$score"}}},
-    ]
+    pipeline = pipelines.crawls_average_score(keyword_id)
+
+    collection = self._read_collection(
+        self.crawls_collection, "get_crawls_average_score"
+    )
 
     try:
-        result = self.crawls_collection.aggregate(pipeline).next()
+        result = collection.aggregate(pipeline).next()
         avg = result["avg"]
     except:
         avg = None
@@ -246,115 +452,111 @@ def get_crawls_average_score(self, keyword_id):
 @validate_id("keyword_id")
 def get_crawls_texts(self, keyword_id: ObjectId):
     """
-    Get all the texts of a keyword plus their score
-    """
-    query = {"keyword_ref": keyword_id}
-    projection = {"_id": 0, "text": 1, "score": 1, "timestamp": 1}
+    Get all the texts of a keyword plus their score, newest first
 
-    result = self.crawls_collection.find(query, projection).sort([("timestamp", -1)])
+    The texts are sorted by the timestamp converted to a date, so crawls which
+    still store an ISO string are ordered along with the migrated ones.
+    """
+    pipeline = pipelines.crawls_texts(keyword_id)
 
-    return list(result)
+    # The sort on the converted date can't use an index and may spill to disk
+    return list(self.crawls_collection.aggregate(pipeline, allowDiskUse=True))
 
 
-@validate_id("_id")
-def set_entities_crawl(self, _id: ObjectId, entities: list):
+@validate_id("keyword_id")
+def iter_crawls_texts(self, keyword_id: ObjectId, batch_size=1000):
     """
-    Set the entities of a crawl result
+    Stream all the texts of a keyword plus their score
+
+    Only one batch of texts is held in memory at a time, the texts are ordered
+    just like by get_crawls_texts.
+
+    :param ObjectId keyword_id: The ID of the keyword
+    :param int batch_size: The amount of texts fetched per round trip
+    :return: The texts, newest first
+    :rtype: Generator<{text, score, timestamp}>
     """
-    query = {"_id": _id}
-    update = {"$set": {"entities": entities}}
+    pipeline = pipelines.crawls_texts(keyword_id)
 
-    update_results = self.crawls_collection.update_one(query, update)
+    cursor = self.crawls_collection.aggregate(
+        pipeline, allowDiskUse=True, batchSize=batch_size
+    )
 
-    return update_results
+    for text in cursor:
+        yield text
 
 
 @validate_id("_id")
-def set_categories_crawl(self, _id: ObjectId, categories: list):
+def set_entities_crawl(self, _id: ObjectId, entities: list):
     """
-    Set the entities of a crawl result
+    Set the entities of a crawl result and update the rollups
     """
-    query = {"_id": _id}
-    update = {"$set": {"categories": categories}}
+    return self._set_crawl_values(_id, "entities", entities)
 
-    update_results = self.crawls_collection.update_one(query, update)
 
-    return update_results
+@validate_id("_id")
+def set_categories_crawl(self, _id: ObjectId, categories: list):
+    """
+    Set the categories of a crawl result and update the rollups
+    """
+    return self._set_crawl_values(_id, "categories", categories)
 
 
 @validate_id("keyword_ref")
-def get_entities(self, keyword_ref: ObjectId, limit=sys.maxsize) -> list:
+def get_entities(
+    self,
+    keyword_ref: ObjectId,
+    limit=sys.maxsize,
+    allow_disk_use=False,
+    from_rollup=False,
+) -> list:
     """
-    Get all the entities related to a keyword
-
+    Get the entities related to a keyword, the most common first
+
+    :param ObjectId keyword_ref: The ID of the keyword
+    :param int limit: The max amount of returned entities
+    :param boolean allow_disk_use: If true the database may spill to disk when
+        the entities of a keyword don't fit into the memory limit of a stage
+    :param boolean from_rollup: If true read the entities from the rollups
+        instead of scanning the crawls, see queries_rollups
     :return: {count: int, score: float, value: string}
     """
-    pipeline = [
-        {"$match": {"keyword_ref": keyword_ref}},
-        {"$group": {"_id": "$keyword_ref", "entities": {"$push": "$entities"}}},
-        {
-            "$project": {
-                "_id": 0,
-                "entities": {
-                    "$reduce": {
-                        "input": "$entities",
-                        "initialValue": [],
-                        "in": {"$concatArrays": ["$$value", "$$this"]},
-                    }
-                },
-            }
-        },
-        {"$unwind": "$entities"},
-        {
-            "$group": {
-                "_id": "$entities.value",
-                "count": {"$sum": "$entities.count"},
-                "score": {"$avg": "$entities.score"},
-            }
-        },
-        {"$limit": limit},
-        {"$project": {"_id": 0, "value": "$_id", "count": 1, "score": 1}},
-        {"$sort": {"count": -1}},
-    ]
-
-    entities = list(self.crawls_collection.aggregate(pipeline))
+    if from_rollup:
+        return self._get_rollup_top_values(keyword_ref, "entities", limit)
+
+    pipeline = pipelines.entities(keyword_ref, limit)
+
+    collection = self._read_collection(self.crawls_collection, "get_entities")
+
+    entities = list(collection.aggregate(pipeline, allowDiskUse=allow_disk_use))
     return entities
 
 
 @validate_id("keyword_ref")
-def get_categories(self, keyword_ref: ObjectId, limit=sys.maxsize) -> list:
+def get_categories(
+    self,
+    keyword_ref: ObjectId,
+    limit=sys.maxsize,
+    allow_disk_use=False,
+    from_rollup=False,
+) -> list:
     """
-    Get all the categories related to a keyword
-
+    Get the categories related to a keyword, the most common first
+
+    :param ObjectId keyword_ref: The ID of the keyword
+    :param int limit: The max amount of returned categories
+    :param boolean allow_disk_use: If true the database may spill to disk when
+        the categories of a keyword don't fit into the memory limit of a stage
+    :param boolean from_rollup: If true read the categories from the rollups
+        instead of scanning the crawls, see queries_rollups
     :return: {count: int, confidence: float, value: string}
     """
-    pipeline = [
-        {"$match": {"keyword_ref": keyword_ref}},
-        {"$group": {"_id": "$keyword_ref", "categories": {"$push": "$categories"}}},
-        {
-            "$project": {
-                "_id": 0,
-                "categories": {
-                    "$reduce": {
-                        "input": "$categories",
-                        "initialValue": [],
-                        "in": {"$concatArrays": ["$$value", "$$this"]},
-                    }
-                },
-            }
-        },
-        {"$unwind": "$categories"},
-        {
-            "$group": {
-                "_id": "$categories.value",
-                "count": {"$sum": "$categories.count"},
-                "confidence": {"$avg": "$categories.confidence"},
-            }
-        },
-        {"$limit": limit},
-        {"$project": {"_id": 0, "value": "$_id", "count": 1, "confidence": 1}},
-        {"$sort": {"count": -1}},
-    ]
-
-    categories = list(self.crawls_collection.aggregate(pipeline))
+    if from_rollup:
+        return self._get_rollup_top_values(keyword_ref, "categories", limit)
+
+    pipeline = pipelines.categories(keyword_ref, limit)
+
+    collection = self._read_collection(self.crawls_collection, "get_categories")
+
+    categories = list(collection.aggregate(pipeline, allowDiskUse=allow_disk_use))
     return categories
@@ -5,40 +5,66 @@ Primary key used to define a news article is author + title
 """
 
 from bson import ObjectId
+from datetime import datetime
+from typing import Union
 
+from common.mongo import pipelines
 from common.mongo.data_types.crawling.crawl_results.news_result import NewsResult
 from common.mongo.data_types.crawling.enums.crawl_types import CrawlTypes
+from common.utils.dates import parse_timestamp
 
+# The fields which identify a news article
+DEDUPE_FIELDS = ["author", "title"]
 
-def add_crawl_news(
-    self,
+# The fields which change when a news article is crawled again
+MUTABLE_FIELDS = []
+
+
+def crawl_news_document(
     keyword_id: ObjectId,
     author: str,
     title: str,
     text: str,
-    timestamp: str,
-    return_object=False,
-    cast=False,
-):
+    timestamp: Union[datetime, str],
+) -> dict:
     """
-    Add a new news article to the crawl collection
+    Build the crawl document stored for a news article
     """
-    document = {
+    return {
         "keyword_ref": keyword_id
         if type(keyword_id) is ObjectId
         else ObjectId(keyword_id),
         "author": author,
         "title": title,
         "text": text,
-        "timestamp": str(timestamp),
+        "timestamp": parse_timestamp(timestamp),
         "crawl_type": CrawlTypes.NEWS.value,
         "entities": [],
         "categories": [],
     }
 
-    query = {"author": author, "title": title}
 
-    update_result = self.crawls_collection.replace_one(query, document, upsert=True)
+def add_crawl_news(
+    self,
+    keyword_id: ObjectId,
+    author: str,
+    title: str,
+    text: str,
+    timestamp: Union[datetime, str],
+    return_object=False,
+    cast=False,
+):
+    """
+    Add a new news article to the crawl collection
+    """
+    document = crawl_news_document(keyword_id, author, title, text, timestamp)
+    document.update(self.crawl_keyword_fields(keyword_id))
+
+    query, update = pipelines.crawl_upsert(document, DEDUPE_FIELDS, MUTABLE_FIELDS)
+
+    update_result = self.crawls_collection.update_one(query, update, upsert=True)
+
+    self.count_recrawls(update_result.matched_count)
 
     if return_object:
         return self.get_crawl_news(author, title, cast)
@@ -56,50 +82,13 @@ def get_crawl_news(self, author, title, cast=False):
     :return: The twitter result found
     :rtype: TwitterResult or None
     """
-    pipeline = [
-        {"$match": {"author": author, "title": title}},
-        {"$limit": 1},
-        {
-            "$lookup": {
-                "from": self.keywords_collection.name,
-                "localField": "keyword_ref",
-                "foreignField": "_id",
-                "as": "keyword",
-            }
-        },
-        {  # Convert keyword from array to object
-            "$project": {
-                "_id": 1,
-                "author": 1,
-                "title": 1,
-                "text": 1,
-                "timestamp": 1,
-                "keyword": {"$arrayElemAt": ["$keyword", 0]},
-                "keyword_ref": 1,
-                "score": 1,
-                "entities": 1,
-                "categories": 1,
-            }
-        },
-        {  # Final projection
-            "$project": {
-                "_id": 1,
-                "author": 1,
-                "title": 1,
-                "text": 1,
-                "timestamp": 1,
-                "keyword_string": "$keyword.keyword_string",
-                "language": "$keyword.language",
-                "keyword_ref": 1,
-                "score": 1,
-                "entities": 1,
-                "categories": 1,
-            }
-        },
-    ]
+    projection = pipelines.source_projection(["author", "title"])
 
     try:
-        news_article = self.crawls_collection.aggregate(pipeline).next()
+        news_article = self.crawls_collection.find_one(
+            {"author": author, "title": title}, projection
+        )
+        news_article = self._with_keyword(news_article, keep_orphan=True)
 
         if cast:
             news_article = NewsResult.from_dict(news_article)
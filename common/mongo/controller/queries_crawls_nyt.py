@@ -2,38 +2,60 @@
 All nyt crawl result database functionality is defined in this module
 """
 from bson import ObjectId
+from datetime import datetime
+from typing import Union
 
+from common.mongo import pipelines
 from common.mongo.data_types.crawling.crawl_results.nyt_result import NytResult
 from common.mongo.data_types.crawling.enums.crawl_types import CrawlTypes
+from common.utils.dates import parse_timestamp
 
+# The fields which identify a nyt article
+DEDUPE_FIELDS = ["article_id"]
 
-def add_crawl_nyt(
-    self,
-    keyword_id: ObjectId,
-    article_id: str,
-    text: str,
-    timestamp: str,
-    return_object=False,
-    cast=False,
-):
+# The fields which change when a nyt article is crawled again
+MUTABLE_FIELDS = []
+
+
+def crawl_nyt_document(
+    keyword_id: ObjectId, article_id: str, text: str, timestamp: Union[datetime, str],
+) -> dict:
     """
-    Add a new nyt article to the crawl collection
+    Build the crawl document stored for a nyt article
     """
-    document = {
+    return {
         "keyword_ref": keyword_id
         if type(keyword_id) is ObjectId
         else ObjectId(keyword_id),
         "article_id": article_id,
         "text": text,
-        "timestamp": str(timestamp),
+        "timestamp": parse_timestamp(timestamp),
         "crawl_type": CrawlTypes.NYT.value,
         "entities": [],
         "categories": [],
     }
 
-    query = {"article_id": article_id}
 
-    update_result = self.crawls_collection.replace_one(query, document, upsert=True)
+def add_crawl_nyt(
+    self,
+    keyword_id: ObjectId,
+    article_id: str,
+    text: str,
+    timestamp: Union[datetime, str],
+    return_object=False,
+    cast=False,
+):
+    """
+    Add a new nyt article to the crawl collection
+    """
+    document = crawl_nyt_document(keyword_id, article_id, text, timestamp)
+    document.update(self.crawl_keyword_fields(keyword_id))
+
+    query, update = pipelines.crawl_upsert(document, DEDUPE_FIELDS, MUTABLE_FIELDS)
+
+    update_result = self.crawls_collection.update_one(query, update, upsert=True)
+
+    self.count_recrawls(update_result.matched_count)
 
     if return_object:
         return self.get_crawl_nyt(article_id, cast)
@@ -50,48 +72,13 @@ def get_crawl_nyt(self, article_id, cast=False):
     :return: The nyt result found
     :rtype: NytResult or None
     """
-    pipeline = [
-        {"$match": {"article_id": article_id}},
-        {"$limit": 1},
-        {
-            "$lookup": {
-                "from": self.keywords_collection.name,
-                "localField": "keyword_ref",
-                "foreignField": "_id",
-                "as": "keyword",
-            }
-        },
-        {  # Convert keyword from array to object
-            "$project": {
-                "_id": 1,
-                "article_id": 1,
-                "text": 1,
-                "timestamp": 1,
-                "keyword": {"$arrayElemAt": ["$keyword", 0]},
-                "keyword_ref": 1,
-                "score": 1,
-                "entities": 1,
-                "categories": 1,
-            }
-        },
-        {  # Final projection
-            "$project": {
-                "_id": 1,
-                "article_id": 1,
-                "text": 1,
-                "timestamp": 1,
-                "keyword_string": "$keyword.keyword_string",
-                "language": "$keyword.language",
-                "keyword_ref": 1,
-                "score": 1,
-                "entities": 1,
-                "categories": 1,
-            }
-        },
-    ]
+    projection = pipelines.source_projection(["article_id"])
 
     try:
-        nyt_article = self.crawls_collection.aggregate(pipeline).next()
+        nyt_article = self.crawls_collection.find_one(
+            {"article_id": article_id}, projection
+        )
+        nyt_article = self._with_keyword(nyt_article, keep_orphan=True)
 
         if cast:
             nyt_article = NytResult.from_dict(nyt_article)
@@ -4,29 +4,33 @@ All twitter crawl result database functionality is defined in this module
 from bson import ObjectId
 from datetime import datetime
 from pymongo.results import UpdateResult
+from typing import Union
 
+from common.mongo import operations, pipelines
 from common.mongo.data_types.crawling.crawl_results.twitter_result import TwitterResult
 from common.mongo.data_types.crawling.enums.crawl_types import CrawlTypes
 from common.mongo.decorators.validation import validate_id
+from common.utils.dates import parse_timestamp
 
+# The fields which identify a tweet
+DEDUPE_FIELDS = ["tweet_id"]
 
-@validate_id("keyword_id")
-def add_crawl_twitter(
-    self,
+# The fields which change when a tweet is crawled again
+MUTABLE_FIELDS = ["likes", "retweets"]
+
+
+def crawl_twitter_document(
     keyword_id: ObjectId,
     tweet_id: int,
     text: str,
     likes: int,
     retweets: int,
-    timestamp: str,
-    return_object=False,
-    cast=False,
-) -> UpdateResult:
+    timestamp: Union[datetime, str],
+) -> dict:
     """
-    Add a new twitter crawl to the crawl twitter collection
-    If the tweet already exists, update the document
+    Build the crawl document stored for a tweet
     """
-    document = {
+    return {
         "keyword_ref": keyword_id
         if type(keyword_id) is ObjectId
         else ObjectId(keyword_id),
@@ -34,15 +38,39 @@ def add_crawl_twitter(
         "text": text,
         "likes": likes,
         "retweets": retweets,
-        "timestamp": str(timestamp),
+        "timestamp": parse_timestamp(timestamp),
         "crawl_type": CrawlTypes.TWITTER.value,
         "entities": [],
         "categories": [],
     }
 
-    query = {"tweet_id": tweet_id}
 
-    update_result = self.crawls_collection.replace_one(query, document, upsert=True)
+@validate_id("keyword_id")
+def add_crawl_twitter(
+    self,
+    keyword_id: ObjectId,
+    tweet_id: int,
+    text: str,
+    likes: int,
+    retweets: int,
+    timestamp: Union[datetime, str],
+    return_object=False,
+    cast=False,
+) -> UpdateResult:
+    """
+    Add a new twitter crawl to the crawl twitter collection
+    If the tweet already exists, only its likes and retweets are updated
+    """
+    document = crawl_twitter_document(
+        keyword_id, tweet_id, text, likes, retweets, timestamp
+    )
+    document.update(self.crawl_keyword_fields(keyword_id))
+
+    query, update = pipelines.crawl_upsert(document, DEDUPE_FIELDS, MUTABLE_FIELDS)
+
+    update_result = self.crawls_collection.update_one(query, update, upsert=True)
+
+    self.count_recrawls(update_result.matched_count)
 
     if return_object:
         return self.get_crawl_twitter_by_id(tweet_id, cast)
@@ -50,56 +78,61 @@ def add_crawl_twitter(
     return update_result
 
 
+@validate_id("keyword_id")
+def add_crawls_twitter_bulk(self, keyword_id: ObjectId, tweets: list, batch_size=1000):
+    """
+    Add many twitter crawls at once using unordered bulk writes
+
+    Tweets are deduplicated on their tweet_id just like in add_crawl_twitter,
+    if the same tweet_id shows up more than once the last occurrence wins.
+    Stored tweets keep their processing results, the matched count tells how
+    many of the tweets were already stored.
+
+    :param ObjectId keyword_id: The ID of the keyword the tweets were found with
+    :param list tweets: Dicts holding tweet_id, text, likes, retweets and timestamp
+    :param int batch_size: The max amount of tweets sent per bulk write
+    :return: The aggregated matched, modified and upserted counts plus the errors,
+        every error holds the tweet_id and the index of its last occurrence in tweets
+    :rtype: dict
+    """
+    keyword_fields = self.crawl_keyword_fields(keyword_id)
+
+    documents = []
+    for tweet in tweets:
+        document = crawl_twitter_document(
+            keyword_id,
+            tweet["tweet_id"],
+            tweet["text"],
+            tweet["likes"],
+            tweet["retweets"],
+            tweet["timestamp"],
+        )
+        document.update(keyword_fields)
+        documents.append(document)
+
+    write_operations, positions = operations.crawl_upserts(
+        documents, DEDUPE_FIELDS, MUTABLE_FIELDS
+    )
+
+    result = self.bulk_write_crawls(write_operations, batch_size)
+
+    # Point the errors to the tweets instead of the deduplicated operations
+    operations.point_errors_to_documents(result, documents, positions, DEDUPE_FIELDS)
+
+    self.count_recrawls(result["matched"])
+
+    return result
+
+
 def get_crawl_twitter_by_id(self, tweet_id: int, cast=False):
     """
     Find a twitter result using the tweet id
     """
-    pipeline = [
-        {"$match": {"tweet_id": tweet_id}},
-        {"$limit": 1},
-        {
-            "$lookup": {
-                "from": self.keywords_collection.name,
-                "localField": "keyword_ref",
-                "foreignField": "_id",
-                "as": "keyword",
-            }
-        },
-        {  # Convert keyword from array to object
-            "$project": {
-                "_id": 1,
-                "tweet_id": 1,
-                "text": 1,
-                "likes": 1,
-                "retweets": 1,
-                "timestamp": 1,
-                "keyword": {"$arrayElemAt": ["$keyword", 0]},
-                "keyword_ref": 1,
-                "score": 1,
-                "entities": 1,
-                "categories": 1,
-            }
-        },
-        {  # Final projection
-            "$project": {
-                "_id": 1,
-                "tweet_id": 1,
-                "text": 1,
-                "likes": 1,
-                "retweets": 1,
-                "timestamp": 1,
-                "keyword_string": "$keyword.keyword_string",
-                "language": "$keyword.language",
-                "keyword_ref": 1,
-                "score": 1,
-                "entities": 1,
-                "categories": 1,
-            }
-        },
-    ]
+    projection = pipelines.source_projection(["tweet_id", "likes", "retweets"])
 
     try:
-        tweet = self.crawls_collection.aggregate(pipeline).next()
+        tweet = self.crawls_collection.find_one({"tweet_id": tweet_id}, projection)
+        tweet = self._with_keyword(tweet, keep_orphan=True)
 
         if cast:
             tweet = TwitterResult.from_dict(tweet)
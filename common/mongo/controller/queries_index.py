@@ -2,6 +2,8 @@
 Indexes are accumulations of keywords, they are designed after stock market indexes
 """
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from common.exceptions.parameters import UnsupportedIndexTypeError
 from common.mongo.decorators.validation import validate_id
@@ -10,9 +12,14 @@ from common.mongo.data_types.index import Index, IndexTypes
 
 @validate_id("_id")
 def get_index_by_id(self, _id: ObjectId, cast=False):
-    query = {"_id": _id}
+    index = self._cache_get(("index", _id))
 
-    index = self.indexes_collection.find_one(query)
+    if index is None:
+        query = {"_id": _id}
+
+        index = self.indexes_collection.find_one(query)
+
+        self._cache_set_index(index)
 
     if cast:
         return Index.from_dict(index)
@@ -20,9 +27,14 @@ def get_index_by_id(self, _id: ObjectId, cast=False):
 
 
 def get_index(self, name: str, cast=False):
-    query = {"name": name}
+    index = self._cache_get_by_key(("index_name", name), "index")
+
+    if index is None:
+        query = {"name": name}
+
+        index = self.indexes_collection.find_one(query)
 
-    index = self.indexes_collection.find_one(query)
+        self._cache_set_index(index)
 
     if cast:
         return Index.from_dict(index)
@@ -37,25 +49,30 @@ def add_index(
     return_object=False,
     cast=False,
 ):
-    index_exists = self.get_index(name)
-
-    if index_exists:
-        query = {"_id": index_exists["_id"]}
-        update = {"$addToSet": {"users": username}, "$set": {"deleted": False}}
-
-        self.indexes_collection.update_one(query, update)
-    else:
-        index = {
-            "name": name,
-            "users": [username],
-            "index_type": index_type,
-            "deleted": False,
-        }
-
-        self.indexes_collection.insert_one(index)
+    """
+    Add a user to an index, the index is created if it doesn't exist yet
+    """
+    query = {"name": name}
+    update = {
+        "$addToSet": {"users": username},
+        "$set": {"deleted": False},
+        "$setOnInsert": {"index_type": index_type},
+    }
+
+    # A concurrent upsert of the same new index hits the unique index, retry once
+    for attempt in range(2):
+        try:
+            index = self.indexes_collection.find_one_and_update(
+                query, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError:
+            if attempt:
+                raise
+
+    self._invalidate_index(index["_id"], name=name)
 
     if return_object:
-        index = self.get_index(name)
         return Index.from_dict(index) if cast else index
 
 
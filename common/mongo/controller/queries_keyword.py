@@ -7,10 +7,13 @@ TODO:
 """
 from datetime import datetime
 from bson import ObjectId
-from pymongo.results import UpdateResult
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import InsertOneResult, UpdateResult
 
 from common import config
 from common.exceptions.parameters import UnsupportedLanguageError
+from common.mongo import pipelines
 from common.mongo.data_types.keyword import Keyword
 from common.mongo.decorators.validation import validate_id
 
@@ -21,13 +24,11 @@ def _set_deleted_flag(self, _id: ObjectId):
     Set the deleted flag of a keyword.
     This will usually be called after a keyword was altered
     """
-
-    keyword = self.get_keyword_by_id(_id, cast=True)
-
     query = {"_id": _id}
-    update = {"$set": {"deleted": keyword.deleted}}
 
-    self.keywords_collection.update_one(query, update)
+    self.keywords_collection.update_one(query, [pipelines.keyword_deleted_flag()])
+
+    self._invalidate_keyword(_id)
 
 
 def add_keyword(
@@ -39,37 +40,44 @@ def add_keyword(
     cast=False,
 ):
     """
-    Add a new keyword document to the database
+    Add a new keyword document to the database or add the user to the
+    existing keyword, both in a single upsert
+
+    :return: The keyword if return_object is set, else an InsertOneResult if
+        the keyword was created or the UpdateResult if the user was added
     """
     if language not in config.SUPPORTED_LANGUAGES:
         raise UnsupportedLanguageError(language)
 
-    # Try to find the keyword
     query = {"keyword_string": keyword_string, "language": language}
-    keyword_dict = self.keywords_collection.find_one(query)
-
-    if keyword_dict:  # Add username to users of keyword
-        query = {"_id": keyword_dict["_id"]}
-        update = {"$addToSet": {"users": username}}
+    update = pipelines.keyword_add_user(username)
+
+    # Two concurrent upserts of a new keyword can both try to insert it,
+    # the loser hits the unique index and matches the keyword when retrying
+    for attempt in range(2):
+        try:
+            if return_object:
+                keyword = self.keywords_collection.find_one_and_update(
+                    query, update, upsert=True, return_document=ReturnDocument.AFTER
+                )
+            else:
+                result = self.keywords_collection.update_one(query, update, upsert=True)
+            break
+        except DuplicateKeyError:
+            if attempt:
+                raise
 
-        update_result = self.keywords_collection.update_one(query, update)
+    if return_object:
+        self._invalidate_keyword(keyword["_id"], keyword_string, language)
 
-        self._set_deleted_flag(keyword_dict["_id"])
+        return Keyword.from_dict(keyword) if cast else keyword
 
-        result = update_result
-    else:  # Create a new keyword
-        document = {
-            "keyword_string": keyword_string,
-            "language": language,
-            "users": [username],
-            "indexes": [],
-            "deleted": False,
-        }
+    if result.upserted_id is not None:  # Created
+        self._invalidate_keyword(result.upserted_id, keyword_string, language)
 
-        result = self.keywords_collection.insert_one(document)
+        return InsertOneResult(result.upserted_id, result.acknowledged)
 
-    if return_object:
-        result = self.get_keyword(keyword_string, language, username, cast=cast)
+    self._invalidate_keyword(keyword_string=keyword_string, language=language)
 
     return result
 
@@ -78,12 +86,20 @@ def get_keyword(self, keyword_string: str, language: str, username=None, cast=Fa
     """
     Get a keyword object from the database
     """
-    query = {"keyword_string": keyword_string, "language": language}
+    keyword = self._cache_get_by_key(
+        ("keyword_string", keyword_string, language), "keyword"
+    )
+
+    if keyword is None:
+        query = {"keyword_string": keyword_string, "language": language}
 
-    if username:  # If a username was passded
-        query["users"] = username  # Make sure the username is associated to the keyword
+        keyword = self.keywords_collection.find_one(query)
 
-    keyword = self.keywords_collection.find_one(query)
+        self._cache_set_keyword(keyword)
+
+    # Make sure the username is associated to the keyword
+    if keyword and username and username not in keyword["users"]:
+        keyword = None
 
     if keyword and cast:
         keyword = Keyword.from_dict(keyword)
@@ -110,12 +126,18 @@ def get_keyword_by_id(self, _id: ObjectId, username=None, cast=False):
     """
     Get a keyword via its ID
     """
-    query = {"_id": _id}
+    keyword = self._cache_get(("keyword", _id))
+
+    if keyword is None:
+        query = {"_id": _id}
 
-    if username:
-        query["users"] = username
+        keyword = self.keywords_collection.find_one(query)
 
-    keyword = self.keywords_collection.find_one(query)
+        self._cache_set_keyword(keyword)
+
+    # Make sure the username is associated to the keyword
+    if keyword and username and username not in keyword["users"]:
+        keyword = None
 
     if cast:
         keyword = Keyword.from_dict(keyword)
@@ -129,11 +151,11 @@ def delete_keyword(self, _id: ObjectId, username: str) -> UpdateResult:
     Delete a user from a keyword given the ID
     """
     query = {"_id": _id}
-    update = {"$pull": {"users": username}}
+    update = pipelines.keyword_remove_user(username)
 
     deletion = self.keywords_collection.update_one(query, update)
 
-    self._set_deleted_flag(_id)
+    self._invalidate_keyword(_id)
 
     return deletion
 
@@ -149,19 +171,40 @@ def get_keyword_batch_cursor(self):
     return cursor
 
 
-def get_keywords_public(self, cast=False) -> list:
-    keywords_public_ids = self.get_meta_keywords_public_ids()
+def get_keywords_by_ids(self, _ids: list, cast=False) -> list:
+    """
+    Get many keywords via their IDs with a single query
+
+    The keywords are returned in the order of the IDs, IDs which
+    don't belong to a keyword are skipped.
 
-    # Only add keywords which are not None
-    keywords = []
-    for _id in keywords_public_ids:
-        keyword = self.get_keyword_by_id(_id, cast=cast)
-        if keyword:
-            keywords.append(keyword)
+    :param list _ids: The IDs of the keywords
+    :param boolean cast: If true, cast all results to Keyword
+    :return: The keywords found
+    :rtype: List<Keyword> or List<dict>
+    """
+    _ids = [_id if type(_id) is ObjectId else ObjectId(_id) for _id in _ids]
+
+    query = {"_id": {"$in": _ids}}
+
+    keywords_by_id = {
+        keyword["_id"]: keyword for keyword in self.keywords_collection.find(query)
+    }
+
+    keywords = [keywords_by_id[_id] for _id in _ids if _id in keywords_by_id]
+
+    if cast:
+        keywords = [Keyword.from_dict(mongo_result) for mongo_result in keywords]
 
     return keywords
 
 
+def get_keywords_public(self, cast=False) -> list:
+    keywords_public_ids = self.get_meta_keywords_public_ids()
+
+    return self.get_keywords_by_ids(keywords_public_ids, cast=cast)
+
+
 @validate_id(["keyword_id", "index_id"])
 def add_index_to_keyword(
     self, keyword_id: ObjectId, index_id: ObjectId, return_object=False, cast=False
@@ -169,10 +212,18 @@ def add_index_to_keyword(
     query = {"_id": keyword_id}
     update = {"$addToSet": {"indexes": index_id}}
 
-    self.keywords_collection.update_one(query, update)
+    if not return_object:
+        self.keywords_collection.update_one(query, update)
+        self._invalidate_keyword(keyword_id)
+        return
 
-    if return_object:
-        return self.get_keyword_by_id(keyword_id, cast=cast)
+    keyword = self.keywords_collection.find_one_and_update(
+        query, update, return_document=ReturnDocument.AFTER
+    )
+
+    self._invalidate_keyword(keyword_id)
+
+    return Keyword.from_dict(keyword) if cast else keyword
 
 
 @validate_id(["keyword_id", "index_id"])
@@ -182,10 +233,18 @@ def delete_index_from_keyword(
     query = {"_id": keyword_id}
     update = {"$pull": {"indexes": index_id}}
 
-    self.keywords_collection.update_one(query, update)
+    if not return_object:
+        self.keywords_collection.update_one(query, update)
+        self._invalidate_keyword(keyword_id)
+        return
 
-    if return_object:
-        return self.get_keyword_by_id(keyword_id, cast=cast)
+    keyword = self.keywords_collection.find_one_and_update(
+        query, update, return_document=ReturnDocument.AFTER
+    )
+
+    self._invalidate_keyword(keyword_id)
+
+    return Keyword.from_dict(keyword) if cast else keyword
 
 
 @validate_id("index_id")
@@ -201,18 +260,35 @@ def get_keywords_by_index(self, index_id: ObjectId, cast=False):
 
 
 def get_outdated_keywords(self, timestamp: datetime, cast=False):
-    query = {"timestamp": {"$lte": str(timestamp.isoformat())}}
-    projection = {"keyword_ref": 1}
+    """
+    Get all keywords which have crawls older than the timestamp
+
+    :param datetime timestamp: Crawls up to this point in time are outdated
+    :param boolean cast: If true, cast all results to Keyword
+    :return: The distinct outdated keywords
+    :rtype: List<Keyword> or List<dict>
+    """
+    pipeline = pipelines.outdated_keywords(self.keywords_collection.name, timestamp)
 
-    crawls_outdated = self.crawls_collection.find(query, projection)
+    keywords = list(self.crawls_collection.aggregate(pipeline))
 
-    keyword_ids_added = []
-    keywords = []
-    for crawl in crawls_outdated:
-        keyword_id = crawl["keyword_ref"]
-        if keyword_id not in keyword_ids_added:  # check for duplicates
-            keyword = self.get_keyword_by_id(keyword_id, cast=cast)
-            keywords.append(keyword)
-            keyword_ids_added.append(keyword_id)
+    if cast:
+        keywords = [Keyword.from_dict(mongo_result) for mongo_result in keywords]
 
     return keywords
+
+
+def iter_outdated_keywords(self, timestamp: datetime, batch_size=1000, cast=False):
+    """
+    Stream all keywords which have crawls older than the timestamp
+
+    :param datetime timestamp: Crawls up to this point in time are outdated
+    :param int batch_size: The amount of keywords fetched per round trip
+    :param boolean cast: If true, cast all results to Keyword
+    :return: The distinct outdated keywords
+    :rtype: Generator<Keyword> or Generator<dict>
+    """
+    pipeline = pipelines.outdated_keywords(self.keywords_collection.name, timestamp)
+
+    for keyword in self.crawls_collection.aggregate(pipeline, batchSize=batch_size):
+        yield Keyword.from_dict(keyword) if cast else keyword
@@ -6,6 +6,7 @@ be changed by admins
 
 There is only ONE object in this collection
 """
+from pymongo import ReturnDocument
 
 
 def set_meta_keywords_public_ids(
@@ -14,18 +15,35 @@ def set_meta_keywords_public_ids(
     query = {}
     update = {"$set": {"keywords_public_ids": keywords_public_ids}}
 
-    update_result = self.meta_collection.update_one(query, update, upsert=True)
+    if return_object:
+        result = self.meta_collection.find_one_and_update(
+            query,
+            update,
+            projection={"keywords_public_ids": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    else:
+        result = self.meta_collection.update_one(query, update, upsert=True)
+
+    if self.cache is not None:
+        self.cache.delete(("meta",))
 
     if return_object:
-        return self.get_meta_keywords_public_ids()
-    return update_result
+        return result["keywords_public_ids"]
+    return result
 
 
 def get_meta_keywords_public_ids(self) -> dict:
-    query = {}
-    projection = {"keywords_public_ids": 1}
+    meta = self._cache_get(("meta",))
+
+    if meta is None:
+        query = {}
+        projection = {"keywords_public_ids": 1}
+
+        meta = self.meta_collection.find_one(query, projection)
 
-    meta = self.meta_collection.find_one(query, projection)
+        self._cache_set([("meta",)], meta)
 
     return meta["keywords_public_ids"]
 
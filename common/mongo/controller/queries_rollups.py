@@ -0,0 +1,129 @@
+"""
+The entity and category rollups of the keywords are maintained in this module
+
+The rollups collection holds one document per keyword, kind (entities or
+categories) and value with the running count, the amount of occurrences and the
+sum plus the amount of the numeric scores / confidences. Every write of the
+entities or categories of a crawl applies the difference to its previous values
+with $inc, so the top values of a keyword can be read without scanning its crawls.
+
+Rollups only move along with writes made through the controllers, after
+changing crawls by other means (or to backfill) run
+python -m common.mongo.commands rebuild-rollups
+"""
+from bson import ObjectId
+from pymongo import ReturnDocument, ReplaceOne, UpdateOne
+from pymongo.results import UpdateResult
+
+from common.mongo import pipelines
+
+
+def _set_crawl_values(self, _id: ObjectId, kind: str, values: list) -> UpdateResult:
+    """
+    Set the entities or categories of a crawl and update the rollups
+
+    :param ObjectId _id: The ID of the crawl
+    :param str kind: entities or categories
+    :param list values: The new entities or categories
+    """
+    previous = self.crawls_collection.find_one_and_update(
+        {"_id": _id},
+        {"$set": {kind: values}},
+        projection={"_id": 0, "keyword_ref": 1, kind: 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+
+    if previous is not None:
+        self._update_rollups(
+            kind, [(previous.get("keyword_ref"), previous.get(kind), values)]
+        )
+
+    acknowledged = self.crawls_collection.write_concern.acknowledged
+
+    return _update_result(previous, kind, values, acknowledged)
+
+
+def _update_result(
+    previous: dict, field: str, value: any, acknowledged: bool
+) -> UpdateResult:
+    """
+    Build the result update_one would have returned for setting the field
+
+    :param dict previous: The document before the write, None if none matched
+    :param str field: The field which was set
+    :param value: The value which was set
+    :param boolean acknowledged: If the write concern of the write is acknowledged
+    """
+    matched = 0 if previous is None else 1
+    modified = matched if matched and previous.get(field) != value else 0
+
+    return UpdateResult(
+        {"n": matched, "nModified": modified, "updatedExisting": bool(matched)},
+        acknowledged,
+    )
+
+
+def _update_rollups(self, kind: str, changes: list) -> None:
+    """
+    Apply the changes of the entities or categories of crawls to the rollups
+
+    :param str kind: entities or categories
+    :param list changes: (keyword_ref, previous values, current values) per crawl
+    """
+    operations = [
+        UpdateOne(query, update, upsert=True)
+        for query, update in pipelines.rollup_updates(kind, changes)
+    ]
+
+    if operations:
+        self.rollups_collection.bulk_write(operations, ordered=False)
+
+
+def _get_rollup_top_values(self, keyword_ref: ObjectId, kind: str, limit: int):
+    """
+    Get the most common entities or categories of a keyword from the rollups
+    """
+    pipeline = pipelines.rollup_top_values(keyword_ref, kind, limit)
+
+    return list(self.rollups_collection.aggregate(pipeline))
+
+
+def rebuild_rollups(self, keyword_ref=None, batch_size=1000) -> int:
+    """
+    Recompute the rollups from the crawls
+
+    Writes made while rebuilding can get lost, rebuild while the processors
+    are paused.
+
+    :param ObjectId keyword_ref: Only rebuild the rollups of this keyword
+    :param int batch_size: The amount of rollups written per bulk write
+    :return: The amount of rollups written
+    :rtype: int
+    """
+    if keyword_ref is not None and type(keyword_ref) is not ObjectId:
+        keyword_ref = ObjectId(keyword_ref)
+
+    query = {} if keyword_ref is None else {"keyword_ref": keyword_ref}
+    self.rollups_collection.delete_many(query)
+
+    written = 0
+    for kind in pipelines.ROLLUP_MEASURES:
+        pipeline = pipelines.rollups_from_crawls(kind, keyword_ref)
+
+        operations = []
+        for rollup in self.crawls_collection.aggregate(
+            pipeline, allowDiskUse=True, batchSize=batch_size
+        ):
+            key = {field: rollup[field] for field in ["keyword_ref", "kind", "value"]}
+            operations.append(ReplaceOne(key, rollup, upsert=True))
+
+            if len(operations) == batch_size:
+                self.rollups_collection.bulk_write(operations, ordered=False)
+                written += len(operations)
+                operations = []
+
+        if operations:
+            self.rollups_collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+
+    return written
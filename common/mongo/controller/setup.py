@@ -2,9 +2,11 @@
 All general mongo controller methods are defined in here
 """
 
-from pymongo import ASCENDING
+from bson import ObjectId
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING
 
-from common.mongo import schemas
+from common.mongo import pipelines, schemas
 
 
 def set_db(self, db_name):
@@ -20,14 +22,29 @@ def configure_database(self):
     """
     Add basic configurations to the database
     This only needs to be called once when the database
-    is freshly created
+    is freshly created, e.g. at deploy time via
+    python -m common.mongo.commands configure
     """
+    # Create the collections, the schemas can only be applied to existing ones
+    collection_names = self.db.list_collection_names()
+    for collection in [
+        self.keywords_collection,
+        self.crawls_collection,
+        self.users_collection,
+        self.meta_collection,
+        self.indexes_collection,
+        self.rollups_collection,
+    ]:
+        if collection.name not in collection_names:
+            self.db.create_collection(collection.name)
+
     # Apply schemas
     self.db.command(schemas.schema_keywords(self.keywords_collection.name))
     self.db.command(schemas.schema_crawls(self.crawls_collection.name))
     self.db.command(schemas.schema_users(self.users_collection.name))
     self.db.command(schemas.schema_meta(self.meta_collection.name))
     self.db.command(schemas.schema_index(self.indexes_collection.name))
+    self.db.command(schemas.schema_rollups(self.rollups_collection.name))
 
     # Apply indexes
     # Keywords collection
@@ -35,30 +52,129 @@ def configure_database(self):
         [("keyword_string", ASCENDING), ("language", ASCENDING)], unique=True
     )
 
+    self.keywords_collection.create_index([("users", ASCENDING)])
+    self.keywords_collection.create_index([("indexes", ASCENDING)])
+
     # Crawls collection
     self.crawls_collection.create_index([("tweet_id", ASCENDING)])
     self.crawls_collection.create_index([("crawl_type", ASCENDING)])
+    self.crawls_collection.create_index([("author", ASCENDING), ("title", ASCENDING)])
+    self.crawls_collection.create_index([("article_id", ASCENDING)])
+    self.crawls_collection.create_index(
+        [("keyword_ref", ASCENDING), ("timestamp", ASCENDING)]
+    )
+    self.crawls_collection.create_index([("timestamp", ASCENDING)])
+    # Unprocessed crawls, a partial filter can't express {"$exists": False} so the
+    # queue is read from the null bounds of the score
+    self.crawls_collection.create_index(
+        [("score", ASCENDING), ("lease.expires_at", ASCENDING)]
+    )
 
     # Users collection
     self.users_collection.create_index([("username", ASCENDING)], unique=True)
 
+    # Indexes collection
+    self.indexes_collection.create_index([("name", ASCENDING)], unique=True)
+    self.indexes_collection.create_index([("users", ASCENDING)])
+
+    # Rollups collection
+    self.rollups_collection.create_index(
+        [("keyword_ref", ASCENDING), ("kind", ASCENDING), ("value", ASCENDING)],
+        unique=True,
+    )
+    self.rollups_collection.create_index(
+        [
+            ("keyword_ref", ASCENDING),
+            ("kind", ASCENDING),
+            ("count", DESCENDING),
+            ("value", ASCENDING),
+        ]
+    )
+
     # Initialise meta collection
     if not self.is_meta_initialised():
         self.set_meta_keywords_public_ids([])
 
 
-def create_collection_if_not_exists(self, collection_name):
+def find_collection_scans(self) -> list:
     """
-    Check if a collection exists, if not, add the collection
+    Explain the queries of the controller and report the ones
+    which are not backed by an index
+
+    This is meant as a self check after configure_database was called,
+    the queries are run with placeholder values.
 
-    :param str collection_name: The name of the new collection
-    :return: The created / existing collection
-    :rtype: Collection
+    :return: The names of the controller methods whose query scans the whole collection
+    :rtype: List<str>
     """
-    if collection_name not in self.db.list_collection_names():
-        return self.db.create_collection(collection_name)
-    else:
-        return self.db[collection_name]
+    keyword_id = ObjectId()
+    now = datetime.now()
+
+    queries = {
+        "get_unprocessed_crawls": (
+            self.crawls_collection,
+            {"score": {"$exists": False}},
+        ),
+        "claim_unprocessed_crawls": (
+            self.crawls_collection,
+            pipelines.claimable_crawls(now),
+        ),
+        "claim_unprocessed_crawls_read_back": (
+            self.crawls_collection,
+            pipelines.claimed_crawls([keyword_id], keyword_id),
+        ),
+        "get_crawls_plotting_data": (
+            self.crawls_collection,
+            pipelines.crawls_plotting_data(keyword_id, now, 60, False)[0]["$match"],
+        ),
+        "get_crawls_texts": (
+            self.crawls_collection,
+            pipelines.crawls_texts(keyword_id)[0]["$match"],
+        ),
+        "get_outdated_keywords": (
+            self.crawls_collection,
+            pipelines.timestamp_range("$lte", now),
+        ),
+        "add_crawl_twitter": (self.crawls_collection, {"tweet_id": 0}),
+        "add_crawl_news": (self.crawls_collection, {"author": "", "title": ""}),
+        "add_crawl_nyt": (self.crawls_collection, {"article_id": ""}),
+        "get_keyword": (
+            self.keywords_collection,
+            {"keyword_string": "", "language": ""},
+        ),
+        "get_keywords_user": (self.keywords_collection, {"users": ""}),
+        "get_keywords_by_index": (self.keywords_collection, {"indexes": keyword_id}),
+        "get_entities_from_rollup": (
+            self.rollups_collection,
+            {"keyword_ref": keyword_id, "kind": "entities"},
+        ),
+        "get_user": (self.users_collection, {"username": ""}),
+        "get_index": (self.indexes_collection, {"name": ""}),
+        "get_indexes": (self.indexes_collection, {"users": ""}),
+    }
+
+    collection_scans = []
+    for method_name, (collection, query) in queries.items():
+        explanation = collection.find(query).explain()
+        if _has_stage(explanation["queryPlanner"]["winningPlan"], "COLLSCAN"):
+            collection_scans.append(method_name)
+
+    return collection_scans
+
+
+def _has_stage(plan: any, stage: str) -> bool:
+    """
+    Check if a stage is used anywhere within an explained query plan
+    """
+    if isinstance(plan, dict):
+        if plan.get("stage") == stage:
+            return True
+        return any(_has_stage(value, stage) for value in plan.values())
+
+    if isinstance(plan, list):
+        return any(_has_stage(value, stage) for value in plan)
+
+    return False
 
 
 def set_collections(
@@ -68,18 +184,16 @@ def set_collections(
     users_collection_name="users",
     meta_collection_name="meta",
     indexes_collection_name="indexes",
+    rollups_collection_name="rollups",
 ) -> None:
     """
     Set custom collection names
+
+    No request is sent, the collections are created by configure_database.
     """
-    self.keywords_collection = self.create_collection_if_not_exists(
-        keywords_collection_name
-    )
-    self.crawls_collection = self.create_collection_if_not_exists(
-        crawls_collection_name
-    )
-    self.users_collection = self.create_collection_if_not_exists(users_collection_name)
-    self.meta_collection = self.create_collection_if_not_exists(meta_collection_name)
-    self.indexes_collection = self.create_collection_if_not_exists(
-        indexes_collection_name
-    )
+    self.keywords_collection = self.db[keywords_collection_name]
+    self.crawls_collection = self.db[crawls_collection_name]
+    self.users_collection = self.db[users_collection_name]
+    self.meta_collection = self.db[meta_collection_name]
+    self.indexes_collection = self.db[indexes_collection_name]
+    self.rollups_collection = self.db[rollups_collection_name]
@@ -0,0 +1,169 @@
+"""
+This module provides a buffered writer for crawls of all crawl types
+
+Instead of upserting every crawl on its own, the crawlers hand their results
+to a CrawlWriter which collects them and writes them as bulk upserts.
+Crawls which are already stored keep their processing results.
+The keyword_string and language of the keyword are stored on every crawl.
+"""
+import time
+
+from collections import OrderedDict
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from common.exceptions.parameters import UnsupportedCrawlTypeError
+from common.mongo import operations, pipelines
+from common.mongo.controller import queries_crawls_news
+from common.mongo.controller import queries_crawls_nyt
+from common.mongo.controller import queries_crawls_twitter
+from common.mongo.data_types.crawling.enums.crawl_types import CrawlTypes
+
+# How to build the document of a crawl type, which fields identify it
+# and which fields are updated when it is crawled again
+CRAWL_TYPE_WRITERS = {
+    CrawlTypes.TWITTER.value: (
+        queries_crawls_twitter.crawl_twitter_document,
+        queries_crawls_twitter.DEDUPE_FIELDS,
+        queries_crawls_twitter.MUTABLE_FIELDS,
+    ),
+    CrawlTypes.NEWS.value: (
+        queries_crawls_news.crawl_news_document,
+        queries_crawls_news.DEDUPE_FIELDS,
+        queries_crawls_news.MUTABLE_FIELDS,
+    ),
+    CrawlTypes.NYT.value: (
+        queries_crawls_nyt.crawl_nyt_document,
+        queries_crawls_nyt.DEDUPE_FIELDS,
+        queries_crawls_nyt.MUTABLE_FIELDS,
+    ),
+}
+
+
+class CrawlWriter:
+    """
+    Buffer crawls of any crawl type and flush them as unordered bulk upserts
+
+    The buffer is flushed once it holds max_batch_size crawls or once the oldest
+    buffered crawl has waited max_delay_seconds. The writer runs no timer of its
+    own, the deadline is checked whenever a crawl is added or flush_if_due is
+    called. Crawlers which can idle should call flush_if_due periodically, and
+    flush (or leave the with block) when done.
+
+    Usage:
+        with CrawlWriter(mongo_controller) as writer:
+            for article in articles:  # article_id, text and timestamp
+                writer.add(CrawlTypes.NYT.value, keyword_id, **article)
+    """
+
+    def __init__(self, mongo_controller, max_batch_size=1000, max_delay_seconds=5):
+        """
+        :param MongoController mongo_controller: The controller used to write the crawls
+        :param int max_batch_size: The amount of buffered crawls which triggers a flush
+        :param float max_delay_seconds: The max time a crawl stays in the buffer
+        """
+        self.mongo_controller = mongo_controller
+        self.max_batch_size = max_batch_size
+        self.max_delay_seconds = max_delay_seconds
+
+        self.buffer = OrderedDict()
+        self.deadline = None
+        self.flushed = 0  # The amount of crawls written by the previous flushes
+        self.results = operations.bulk_write_result()
+
+    def add(self, crawl_type: str, keyword_id: ObjectId, **fields) -> None:
+        """
+        Add a crawl to the buffer
+
+        A crawl which is already buffered (same dedupe key) is replaced.
+
+        :param str crawl_type: The CrawlTypes value of the crawl
+        :param ObjectId keyword_id: The ID of the keyword the crawl was found with
+        :param fields: The fields of the crawl type, e.g. tweet_id, text, likes,
+            retweets and timestamp for twitter crawls
+        """
+        if crawl_type not in CRAWL_TYPE_WRITERS:
+            raise UnsupportedCrawlTypeError(crawl_type)
+
+        build_document, dedupe_fields, mutable_fields = CRAWL_TYPE_WRITERS[crawl_type]
+
+        document = build_document(keyword_id, **fields)
+        document.update(
+            self.mongo_controller.crawl_keyword_fields(document["keyword_ref"])
+        )
+        query, update = pipelines.crawl_upsert(document, dedupe_fields, mutable_fields)
+
+        key = (crawl_type,) + tuple(query.values())
+        self.buffer[key] = (query, update)
+
+        if self.deadline is None:
+            self.deadline = time.monotonic() + self.max_delay_seconds
+
+        if len(self.buffer) >= self.max_batch_size:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self) -> dict:
+        """
+        Flush the buffer if the oldest buffered crawl has waited max_delay_seconds
+
+        :return: The result of the flush, None if the deadline was not reached
+        :rtype: dict
+        """
+        if self.deadline is None or time.monotonic() < self.deadline:
+            return None
+
+        return self.flush()
+
+    def flush(self) -> dict:
+        """
+        Write all buffered crawls to the database
+
+        The index of an error is the position of the crawl among all the crawls
+        written by the writer, in the order they were first buffered.
+
+        :return: The matched, modified and upserted counts plus the errors of this flush
+        :rtype: dict
+        """
+        write_operations = [
+            UpdateOne(query, update, upsert=True)
+            for query, update in self.buffer.values()
+        ]
+
+        self.buffer = OrderedDict()
+        self.deadline = None
+
+        if not write_operations:
+            return operations.bulk_write_result()
+
+        result = self.mongo_controller.bulk_write_crawls(
+            write_operations, self.max_batch_size
+        )
+        self.mongo_controller.count_recrawls(result["matched"])
+
+        for error in result["errors"]:
+            error["index"] += self.flushed
+        self.flushed += len(write_operations)
+
+        # The totals are unknown once a flush was not acknowledged
+        if not result["acknowledged"]:
+            self.results.update(
+                acknowledged=False, matched=None, modified=None, upserted=None
+            )
+        elif self.results["acknowledged"]:
+            self.results["matched"] += result["matched"]
+            self.results["modified"] += result["modified"]
+            self.results["upserted"] += result["upserted"]
+        self.results["errors"] += result["errors"]
+
+        return result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def __len__(self):
+        return len(self.buffer)
@@ -2,6 +2,7 @@
 This module holds all validation decorators
 """
 
+import functools
 import inspect
 
 from bson import ObjectId
@@ -13,14 +14,31 @@ def validate_id(target_parameters: any):
 
     target_parameters can be a string or a list, it will always be converted to a list
     """
+    # Make sure the target parameters is a list
+    target_parameters_validated = (
+        [target_parameters] if type(target_parameters) is str else target_parameters
+    )
 
     def validate_id_inner(func):
         """
         ID validation decorator
 
+        The positions of the target parameters are resolved once when decorating,
+        so a call only costs a couple of type checks.
+
         :param func func: The function which shall be validated
         """
+        # Get the original names of all the parameters
+        param_names = inspect.getfullargspec(func)[0]
+
+        targets = []
+        for target_parameter in target_parameters_validated:
+            position = None
+            if target_parameter in param_names:
+                position = param_names.index(target_parameter)
+            targets.append((target_parameter, position))
 
+        @functools.wraps(func)
         def validate(*args, **kwargs):
             """
             Actual validator function
@@ -28,30 +46,15 @@ def validate_id(target_parameters: any):
             :param tuple args: All inserted arguments
             :param Object kwargs: All extra arguments inserted as an object
             """
-            # Cast args to list so you can mutate the parameters
-            args = list(args)
-
-            # Get the original names of all the parameters
-            param_names = inspect.getfullargspec(func)[0]
-
-            # Make sure the target parameters is a list
-            target_parameters_validated = (
-                [target_parameters]
-                if type(target_parameters) is str
-                else target_parameters
-            )
-
-            # parse
-            for target_parameter in target_parameters_validated:
-                arg_parsed, position = parse_parameter(
-                    target_parameter, param_names, args, ObjectId
-                )
-
-                if arg_parsed:
-                    args[position] = arg_parsed
-
-            # Cast back to tuple
-            args = tuple(args)
+            for target_parameter, position in targets:
+                if position is not None and position < len(args):
+                    if type(args[position]) is not ObjectId:
+                        # Cast args to list so you can mutate the parameters
+                        args = list(args)
+                        args[position] = ObjectId(args[position])
+                elif target_parameter in kwargs:
+                    if type(kwargs[target_parameter]) is not ObjectId:
+                        kwargs[target_parameter] = ObjectId(kwargs[target_parameter])
 
             return func(*args, **kwargs)
 
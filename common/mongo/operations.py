@@ -0,0 +1,210 @@
+"""
+The steps of the controller operations which don't touch the database are defined here
+
+Batching bulk writes, merging their results, preparing the writes of processing
+results and resolving keywords through the join cache are shared by the blocking
+MongoController and the AsyncMongoController, both controllers only send the
+requests and pass the responses back in.
+"""
+from pymongo import UpdateOne
+
+from common.exceptions.parameters import InvalidParameterError
+from common.mongo import pipelines
+
+
+def bulk_batches(operations: list, batch_size: int):
+    """
+    Split write operations into the batches of unordered bulk writes
+
+    :param list operations: The pymongo write operations
+    :param int batch_size: The max amount of operations per batch
+    :return: The position of every batch within operations plus the batch
+    :rtype: Generator<(int, list)>
+    """
+    if batch_size < 1:
+        raise InvalidParameterError(batch_size)
+
+    for offset in range(0, len(operations), batch_size):
+        yield offset, operations[offset : offset + batch_size]
+
+
+def bulk_write_result() -> dict:
+    """
+    The aggregated result of bulk writes before any batch was written
+    """
+    return {
+        "acknowledged": True,
+        "matched": 0,
+        "modified": 0,
+        "upserted": 0,
+        "errors": [],
+    }
+
+
+def bulk_write_details(result) -> dict:
+    """
+    Get the details of a successful bulk write,
+    None if the bulk write was not acknowledged (w=0)
+
+    :param BulkWriteResult result: The result returned by bulk_write
+    """
+    return result.bulk_api_result if result.acknowledged else None
+
+
+def merge_bulk_write_result(result: dict, details: dict, offset: int) -> None:
+    """
+    Add the details of one bulk write to the aggregated result
+
+    :param dict result: The aggregated result which is updated in place
+    :param dict details: The bulk_api_result or BulkWriteError details of the batch,
+        None if the bulk write was not acknowledged
+    :param int offset: The position of the batch within all operations
+    """
+    if details is None or not result["acknowledged"]:
+        result.update(acknowledged=False, matched=None, modified=None, upserted=None)
+        return
+
+    result["matched"] += details["nMatched"]
+    result["modified"] += details["nModified"]
+    result["upserted"] += details["nUpserted"]
+
+    for error in details["writeErrors"]:
+        error["index"] += offset
+        result["errors"].append(error)
+
+
+def crawl_upserts(documents: list, dedupe_fields: list, mutable_fields: list) -> tuple:
+    """
+    Build the upserts of crawl documents, documents holding the same dedupe
+    fields are written once and the last occurrence wins
+
+    :param list documents: The crawl documents
+    :param list dedupe_fields: The fields which identify a crawl of the source
+    :param list mutable_fields: The fields which change when a crawl is crawled again
+    :return: The operations plus the position of the document of every operation
+        within documents
+    :rtype: tuple
+    """
+    positions = {}  # The position of the last occurrence by the dedupe values
+    for position, document in enumerate(documents):
+        positions[tuple(document[field] for field in dedupe_fields)] = position
+
+    operations = []
+    for position in positions.values():
+        query, update = pipelines.crawl_upsert(
+            documents[position], dedupe_fields, mutable_fields
+        )
+        operations.append(UpdateOne(query, update, upsert=True))
+
+    return operations, list(positions.values())
+
+
+def point_errors_to_documents(
+    result: dict, documents: list, positions: list, dedupe_fields: list
+) -> None:
+    """
+    Point the errors of the upserts built by crawl_upserts to the documents,
+    every error gets the dedupe fields plus the position of the document
+
+    :param dict result: The aggregated result which is updated in place
+    :param list documents: The crawl documents
+    :param list positions: The positions returned by crawl_upserts
+    :param list dedupe_fields: The fields which identify a crawl of the source
+    """
+    for error in result["errors"]:
+        error["index"] = positions[error["index"]]
+
+        for field in dedupe_fields:
+            error[field] = documents[error["index"]][field]
+
+
+def processing_results_updates(results: list) -> tuple:
+    """
+    Build the writes of processing results
+
+    :param list results: Dicts holding the _id plus score, entities and/or categories
+    :return: The operations, (_id, $set values) per operation and the IDs of the
+        crawls whose rollups have to be read before the write
+    :rtype: tuple
+    :raises InvalidParameterError: When a crawl shows up more than once
+    """
+    operations = []
+    updates = []
+    for result in results:
+        query, update = pipelines.processing_results(result)
+
+        if update:
+            operations.append(UpdateOne(query, update))
+            updates.append((query["_id"], update["$set"]))
+
+    # Every write of the same crawl would be diffed against the same previous values
+    if len({_id for _id, _ in updates}) != len(updates):
+        raise InvalidParameterError(results)
+
+    # The rollups are updated with the difference to the previous values
+    rollup_ids = [
+        _id
+        for _id, values in updates
+        if any(kind in values for kind in pipelines.ROLLUP_MEASURES)
+    ]
+
+    return operations, updates, rollup_ids
+
+
+def processing_results_rollups(updates: list, previous: dict, result: dict) -> dict:
+    """
+    Collect the rollup changes of the written processing results per kind,
+    the failed writes are left out
+
+    :param list updates: The updates returned by processing_results_updates
+    :param dict previous: The crawls before the write by their ID
+    :param dict result: The aggregated result of the bulk writes
+    """
+    failed = {error["index"] for error in result["errors"]}
+
+    return {
+        kind: pipelines.rollup_changes(kind, updates, previous, failed)
+        for kind in pipelines.ROLLUP_MEASURES
+    }
+
+
+def cached_keyword_fields(crawls: list, keyword_join_cache) -> tuple:
+    """
+    Resolve the keywords of the crawls which don't store the keyword fields
+    through the keyword join cache
+
+    :param list crawls: A batch of crawls
+    :param TTLCache keyword_join_cache: The keyword fields by keyword ID
+    :return: The cached keyword fields by keyword ID plus the IDs of the keywords
+        which have to be fetched
+    :rtype: tuple
+    """
+    keyword_fields_by_ref = {}
+    missing = []
+    for keyword_ref in pipelines.missing_keyword_refs(crawls):
+        keyword_fields = keyword_join_cache.get(keyword_ref)
+        if keyword_fields is None:
+            missing.append(keyword_ref)
+        else:
+            keyword_fields_by_ref[keyword_ref] = keyword_fields
+
+    return keyword_fields_by_ref, missing
+
+
+def cache_keyword_fields(
+    keyword_fields_by_ref: dict, missing: list, keywords: list, keyword_join_cache
+) -> None:
+    """
+    Add the fetched keywords to the resolved keyword fields and the cache,
+    keywords which don't exist are cached as empty fields
+
+    :param dict keyword_fields_by_ref: The resolved fields, updated in place
+    :param list missing: The IDs of the fetched keywords
+    :param list keywords: The keywords which were found
+    :param TTLCache keyword_join_cache: The keyword fields by keyword ID
+    """
+    found = {keyword["_id"]: pipelines.keyword_fields(keyword) for keyword in keywords}
+
+    for keyword_ref in missing:
+        keyword_fields_by_ref[keyword_ref] = found.get(keyword_ref, {})
+        keyword_join_cache.set(keyword_ref, keyword_fields_by_ref[keyword_ref])
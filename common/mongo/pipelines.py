@@ -0,0 +1,603 @@
+"""
+All queries and aggregation pipelines which are more than a plain lookup are built here
+
+The functions don't touch the database, they are shared by the blocking MongoController
+and the AsyncMongoController so both always send the exact same queries.
+"""
+from bson import ObjectId
+from datetime import datetime, timedelta
+
+
+def timestamp_range(operator: str, timestamp: datetime) -> dict:
+    """
+    Match crawls by comparing their timestamp
+
+    Legacy crawls store the timestamp as ISO string, both forms are matched.
+
+    :param str operator: The comparison operator, e.g. $gte or $lte
+    :param datetime timestamp: The timestamp compared to
+    """
+    return {
+        "$or": [
+            {"timestamp": {operator: timestamp}},
+            {"timestamp": {operator: str(timestamp.isoformat())}},
+        ]
+    }
+
+
+# The keyword fields which are denormalised onto the crawls of a keyword
+KEYWORD_FIELDS = ["keyword_string", "language"]
+
+# The fields of a crawl the processor needs
+CRAWL_PROJECTION = {
+    "_id": 1,
+    "keyword_ref": 1,
+    "keyword_string": 1,
+    "language": 1,
+    "text": 1,
+    "timestamp": 1,
+    "entities": 1,
+    "categories": 1,
+}
+
+
+def keyword_fields(keyword: dict) -> dict:
+    """
+    The fields of a keyword stored on its crawls, they never change for a keyword
+
+    :return: keyword_string and language, empty if the keyword doesn't exist
+    :rtype: dict
+    """
+    if keyword is None:
+        return {}
+
+    return {field: keyword[field] for field in KEYWORD_FIELDS}
+
+
+def crawl_with_keyword(crawl: dict, keyword: dict) -> dict:
+    """
+    Attach the keyword fields to a crawl stored before they were denormalised
+
+    :return: The crawl or None if the keyword doesn't exist
+    :rtype: dict
+    """
+    if crawl is None or keyword is None:
+        return None
+
+    return dict(crawl, **keyword_fields(keyword))
+
+
+# How get_unprocessed_crawls joins crawls which don't store the keyword fields,
+# client resolves the keywords of every batch with one query, lookup joins on the server
+JOIN_STRATEGIES = ["client", "lookup"]
+
+
+def keyword_join(keywords_collection_name: str) -> list:
+    """
+    Stages which join a crawl with its keyword and project
+    the fields the processor needs
+    """
+    return [
+        {
+            "$lookup": {
+                "from": keywords_collection_name,
+                "localField": "keyword_ref",
+                "foreignField": "_id",
+                "as": "keyword",
+            }
+        },
+        {"$unwind": "$keyword"},
+        {
+            "$project": dict(
+                CRAWL_PROJECTION,
+                keyword_string="$keyword.keyword_string",
+                language="$keyword.language",
+            )
+        },
+    ]
+
+
+def unprocessed_crawls(keywords_collection_name: str, limit=None) -> list:
+    pipeline = [{"$match": {"score": {"$exists": False}}}]
+
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+
+    return pipeline + keyword_join(keywords_collection_name)
+
+
+def missing_keyword_refs(crawls: list) -> list:
+    """
+    The distinct keywords of the crawls which don't store the keyword fields
+    """
+    return list(
+        {crawl["keyword_ref"] for crawl in crawls if "keyword_string" not in crawl}
+    )
+
+
+def crawls_with_keywords(crawls: list, keyword_fields_by_ref: dict) -> list:
+    """
+    Attach the keyword fields to the crawls which don't store them,
+    crawls whose keyword doesn't exist are dropped just like $unwind does
+
+    :param list crawls: A batch of crawls
+    :param dict keyword_fields_by_ref: The keyword fields of every missing keyword,
+        empty for keywords which don't exist
+    """
+    joined = []
+    for crawl in crawls:
+        if "keyword_string" not in crawl:
+            fields = keyword_fields_by_ref.get(crawl["keyword_ref"])
+            if not fields:
+                continue
+            crawl = dict(crawl, **fields)
+
+        joined.append(crawl)
+
+    return joined
+
+
+def source_projection(source_fields: list) -> dict:
+    """
+    The fields of a crawl returned by the getters of a crawl source,
+    including the fields specific to the source
+    """
+    projection = {field: 1 for field in ["_id"] + source_fields}
+    projection.update(
+        {
+            "text": 1,
+            "timestamp": 1,
+            "keyword_ref": 1,
+            "keyword_string": 1,
+            "language": 1,
+            "score": 1,
+            "entities": 1,
+            "categories": 1,
+        }
+    )
+    return projection
+
+
+def claimable_crawls(now: datetime) -> dict:
+    """
+    Query the unprocessed crawls which are not leased to a worker
+    """
+    return {
+        "score": {"$exists": False},
+        "$or": [
+            {"lease.expires_at": {"$exists": False}},
+            {"lease.expires_at": {"$lte": now}},
+        ],
+    }
+
+
+def claim_crawls(
+    candidate_ids: list,
+    now: datetime,
+    worker_id: str,
+    lease_token: ObjectId,
+    lease_seconds: int,
+) -> tuple:
+    """
+    Build the query and update which lease the candidates
+    that are still claimable to a worker
+
+    :return: query, update
+    :rtype: tuple
+    """
+    query = {"$and": [{"_id": {"$in": candidate_ids}}, claimable_crawls(now)]}
+    update = {
+        "$set": {
+            "lease": {
+                "owner": worker_id,
+                "token": lease_token,
+                "expires_at": now + timedelta(seconds=lease_seconds),
+            }
+        }
+    }
+    return query, update
+
+
+def claimed_crawls(candidate_ids: list, lease_token: ObjectId) -> dict:
+    """
+    Query the crawls leased with a token, lease.token isn't indexed
+    so the candidate IDs keep the query on the _id index
+    """
+    return {"_id": {"$in": candidate_ids}, "lease.token": lease_token}
+
+
+def processing_results(result: dict) -> tuple:
+    """
+    Build the query and the combined update of a processing result
+
+    :return: query, update or None if the result holds nothing to update
+    :rtype: tuple
+    """
+    _id = result["_id"] if type(result["_id"]) is ObjectId else ObjectId(result["_id"])
+
+    update = {
+        field: result[field]
+        for field in ["score", "entities", "categories"]
+        if field in result
+    }
+
+    if not update:
+        return {"_id": _id}, None
+
+    return {"_id": _id}, {"$set": update}
+
+
+# The timestamp of a crawl as date, legacy ISO strings are converted and
+# timestamps which can't be converted are null
+TIMESTAMP_DATE = {
+    "$convert": {"input": "$timestamp", "to": "date", "onError": None, "onNull": None}
+}
+
+
+def crawls_plotting_data(
+    keyword_id: ObjectId,
+    date_cutoff: datetime,
+    granularity_in_minutes: int,
+    server_side: bool,
+) -> list:
+    match = {
+        "$match": dict(
+            {"keyword_ref": keyword_id, "score": {"$exists": True}},
+            **timestamp_range("$gte", date_cutoff),
+        )
+    }
+
+    # Legacy ISO strings sort before all dates, order by the converted date instead
+    date = TIMESTAMP_DATE
+
+    if not server_side:
+        return [
+            match,
+            {
+                "$project": {
+                    "_id": 0,
+                    "timestamp": 1,
+                    "score": 1,
+                    "count": {"$literal": 1},
+                    "date": date,
+                }
+            },
+            {"$sort": {"date": 1}},
+            {"$project": {"date": 0}},
+        ]
+
+    bucket_size = granularity_in_minutes * 60 * 1000
+    date_in_ms = {"$toLong": "$date"}
+
+    # Timestamps which can't be converted end up in the bucket with the _id null
+    return [
+        match,
+        {"$project": {"_id": 0, "timestamp": 1, "score": 1, "date": date}},
+        {
+            "$group": {
+                "_id": {"$subtract": [date_in_ms, {"$mod": [date_in_ms, bucket_size]}]},
+                "timestamp": {"$min": "$timestamp"},
+                "score": {"$avg": "$score"},
+                "count": {"$sum": 1},
+            }
+        },
+        {"$sort": {"_id": 1}},
+        {"$project": {"timestamp": 1, "score": 1, "count": 1}},
+    ]
+
+
+def crawls_texts(keyword_id: ObjectId) -> list:
+    """
+    The texts of a keyword plus their score, newest first
+
+    Legacy ISO strings sort before all dates, the texts are ordered by the
+    converted date instead. Timestamps which can't be converted come last.
+    """
+    return [
+        {"$match": {"keyword_ref": keyword_id}},
+        {
+            "$project": {
+                "_id": 0,
+                "text": 1,
+                "score": 1,
+                "timestamp": 1,
+                "date": TIMESTAMP_DATE,
+            }
+        },
+        {"$sort": {"date": -1}},
+        {"$project": {"date": 0}},
+    ]
+
+
+def crawls_average_score(keyword_id: ObjectId) -> list:
+    return [
+        {"$match": {"keyword_ref": keyword_id}},
+        {"$group": {"_id": "$keyword_ref", "avg": {"$avg": "$score"}}},
+    ]
+
+
+def _top_values(keyword_ref: ObjectId, field: str, measure: str, limit: int) -> list:
+    """
+    Count the values of an array field over all crawls of a keyword, the most
+    common first, and average the measure of every value
+
+    Every array element is unwound on its own, so the work grows linearly with
+    the amount of elements and no intermediate document holds all of them.
+    """
+    return [
+        {"$match": {"keyword_ref": keyword_ref}},
+        {"$project": {"_id": 0, field: 1}},
+        {"$unwind": f"${field}"},
+        {
+            "$group": {
+                "_id": f"${field}.value",
+                "count": {"$sum": f"${field}.count"},
+                measure: {"$avg": f"${field}.{measure}"},
+            }
+        },
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "value": "$_id", "count": 1, measure: 1}},
+    ]
+
+
+def entities(keyword_ref: ObjectId, limit: int) -> list:
+    return _top_values(keyword_ref, "entities", "score", limit)
+
+
+def categories(keyword_ref: ObjectId, limit: int) -> list:
+    return _top_values(keyword_ref, "categories", "confidence", limit)
+
+
+def crawl_upsert(document: dict, dedupe_fields: list, mutable_fields: list) -> tuple:
+    """
+    Build the upsert of a crawl which keeps the processing results of a stored crawl
+
+    Only the mutable fields (e.g. the likes of a tweet) of a stored crawl are
+    updated, everything else is only written when the crawl is inserted.
+
+    :param dict document: The document of the crawl
+    :param list dedupe_fields: The fields which identify the crawl
+    :param list mutable_fields: The fields which are updated on a re-crawl
+    :return: query, update
+    :rtype: tuple
+    """
+    query = {field: document[field] for field in dedupe_fields}
+
+    update = {
+        "$setOnInsert": {
+            field: value
+            for field, value in document.items()
+            if field not in dedupe_fields and field not in mutable_fields
+        }
+    }
+
+    if mutable_fields:
+        update["$set"] = {field: document[field] for field in mutable_fields}
+
+    return query, update
+
+
+def keyword_deleted_flag() -> dict:
+    """
+    Update stage which computes the deleted flag of a keyword,
+    a keyword is deleted once it has neither users nor indexes
+    """
+    return {
+        "$set": {
+            "deleted": {
+                "$and": [
+                    {"$eq": [{"$size": "$users"}, 0]},
+                    {"$eq": [{"$size": "$indexes"}, 0]},
+                ]
+            }
+        }
+    }
+
+
+def keyword_add_user(username: str) -> list:
+    """
+    Pipeline update which adds a user to a keyword, when upserted
+    the missing arrays of a new keyword are created
+    """
+    users = {"$ifNull": ["$users", []]}
+
+    return [
+        {
+            "$set": {
+                "users": {
+                    "$cond": [
+                        {"$in": [username, users]},
+                        users,
+                        {"$concatArrays": [users, [username]]},
+                    ]
+                },
+                "indexes": {"$ifNull": ["$indexes", []]},
+            }
+        },
+        keyword_deleted_flag(),
+    ]
+
+
+def keyword_remove_user(username: str) -> list:
+    """
+    Pipeline update which removes a user from a keyword
+    """
+    return [
+        {
+            "$set": {
+                "users": {
+                    "$filter": {
+                        "input": "$users",
+                        "cond": {"$ne": ["$$this", username]},
+                    }
+                }
+            }
+        },
+        keyword_deleted_flag(),
+    ]
+
+
+def outdated_keywords(keywords_collection_name: str, timestamp: datetime) -> list:
+    return [
+        {"$match": timestamp_range("$lte", timestamp)},
+        # Keep the keywords in the order their first crawl was inserted
+        {"$group": {"_id": "$keyword_ref", "first_crawl": {"$min": "$_id"}}},
+        {"$sort": {"first_crawl": 1}},
+        {
+            "$lookup": {
+                "from": keywords_collection_name,
+                "localField": "_id",
+                "foreignField": "_id",
+                "as": "keyword",
+            }
+        },
+        {"$unwind": "$keyword"},
+        {"$replaceRoot": {"newRoot": "$keyword"}},
+    ]
+
+
+# The measure which is averaged per value of the processing results
+ROLLUP_MEASURES = {"entities": "score", "categories": "confidence"}
+
+# Like $avg, only numeric measures are counted towards the average
+NUMERIC_TYPES = ["double", "int", "long", "decimal"]
+
+
+def rollup_updates(kind: str, changes: list) -> list:
+    """
+    Build the $inc updates which move the rollups from the previous
+    to the current processing results of crawls
+
+    Changes of the same value of a keyword are combined into one update. Values
+    without a numeric measure are left out of measure_sum and measured, the same as
+    $avg leaves them out of the average.
+
+    :param str kind: entities or categories
+    :param list changes: (keyword_ref, previous values, current values) per crawl
+    :return: query, update tuples to be upserted into the rollups collection
+    :rtype: List<tuple>
+    """
+    measure = ROLLUP_MEASURES[kind]
+
+    deltas = {}
+    for keyword_ref, previous, current in changes:
+        for values, sign in [(previous or [], -1), (current or [], 1)]:
+            for value in values:
+                delta = deltas.setdefault(
+                    (keyword_ref, value["value"]),
+                    {"count": 0, "occurrences": 0, "measure_sum": 0, "measured": 0},
+                )
+                delta["count"] += sign * value.get("count", 0)
+                delta["occurrences"] += sign
+
+                if _is_numeric(value.get(measure)):
+                    delta["measure_sum"] += sign * value[measure]
+                    delta["measured"] += sign
+
+    return [
+        ({"keyword_ref": keyword_ref, "kind": kind, "value": value}, {"$inc": delta})
+        for (keyword_ref, value), delta in deltas.items()
+        if any(delta.values())
+    ]
+
+
+def _is_numeric(measure) -> bool:
+    return isinstance(measure, (int, float)) and not isinstance(measure, bool)
+
+
+def rollup_changes(kind: str, updates: list, previous: dict, failed: set) -> list:
+    """
+    Collect the changes of the entities or categories made by a bulk write
+    of processing results, see rollup_updates
+
+    :param str kind: entities or categories
+    :param list updates: (_id, $set values) per written operation
+    :param dict previous: The crawls before the write by their ID
+    :param set failed: The indexes of the operations which failed
+    """
+    return [
+        (previous[_id].get("keyword_ref"), previous[_id].get(kind), values[kind])
+        for index, (_id, values) in enumerate(updates)
+        if kind in values and _id in previous and index not in failed
+    ]
+
+
+def rollup_top_values(keyword_ref: ObjectId, kind: str, limit: int) -> list:
+    """
+    Read the most common values of a keyword from the rollups collection,
+    in the same shape as entities and categories
+    """
+    return [
+        {
+            "$match": {
+                "keyword_ref": keyword_ref,
+                "kind": kind,
+                "occurrences": {"$gt": 0},
+            }
+        },
+        {"$sort": {"count": -1, "value": 1}},
+        {"$limit": limit},
+        {
+            "$project": {
+                "_id": 0,
+                "value": 1,
+                "count": 1,
+                ROLLUP_MEASURES[kind]: {
+                    "$cond": [
+                        {"$gt": ["$measured", 0]},
+                        {"$divide": ["$measure_sum", "$measured"]},
+                        None,
+                    ]
+                },
+            }
+        },
+    ]
+
+
+def rollups_from_crawls(kind: str, keyword_ref=None) -> list:
+    """
+    Compute the rollups from scratch out of the crawls, either of all keywords
+    or of a single one
+    """
+    match = {} if keyword_ref is None else {"keyword_ref": keyword_ref}
+
+    return [
+        {"$match": match},
+        {"$project": {"_id": 0, "keyword_ref": 1, kind: 1}},
+        {"$unwind": f"${kind}"},
+        {
+            "$group": {
+                "_id": {"keyword_ref": "$keyword_ref", "value": f"${kind}.value"},
+                "count": {"$sum": f"${kind}.count"},
+                "occurrences": {"$sum": 1},
+                "measure_sum": {"$sum": f"${kind}.{ROLLUP_MEASURES[kind]}"},
+                "measured": {
+                    "$sum": {
+                        "$cond": [
+                            {
+                                "$in": [
+                                    {"$type": f"${kind}.{ROLLUP_MEASURES[kind]}"},
+                                    NUMERIC_TYPES,
+                                ]
+                            },
+                            1,
+                            0,
+                        ]
+                    }
+                },
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "keyword_ref": "$_id.keyword_ref",
+                "kind": {"$literal": kind},
+                "value": "$_id.value",
+                "count": 1,
+                "occurrences": 1,
+                "measure_sum": 1,
+                "measured": 1,
+            }
+        },
+    ]
@@ -0,0 +1,81 @@
+"""
+A per process registry of mongo controllers
+
+Every MongoClient holds its own connection pool, tasks should therefore reuse
+a controller instead of constructing a new one per task:
+
+    from common.mongo.registry import get_controller
+
+    mongo_controller = get_controller()
+
+Clients are keyed by the process ID and the resolved connection string, so
+omitting the connection string and passing the one of MONGO_URL share a client.
+Every database gets its own controller on top of the shared client.
+A forked worker never reuses the connection pool of its parent since pymongo
+clients are not fork safe.
+"""
+import os
+import threading
+
+from common.mongo.controller import MongoController
+from common.mongo.controller.connection import resolve_target
+
+_clients = {}  # (pid, connection_string) -> the controller which created the client
+_controllers = {}  # (pid, connection_string, db_name) -> controller
+_lock = threading.Lock()
+
+
+def get_controller(connection_string=None, db_name=None) -> MongoController:
+    """
+    Get the controller of this process for the given database,
+    it is constructed on the first call
+
+    :param str connection_string: The URL used to connect to the database
+    :param str db_name: The databse which shall be using during runtime
+    :return: The shared controller
+    :rtype: MongoController
+    """
+    connection_string, db_name = resolve_target(connection_string, db_name)
+    pid = os.getpid()
+    key = (pid, connection_string, db_name)
+
+    with _lock:
+        if key not in _controllers:
+            owner = _clients.get((pid, connection_string))
+
+            if owner is None:
+                controller = MongoController(connection_string, db_name)
+                _clients[(pid, connection_string)] = controller
+            else:
+                controller = MongoController(
+                    connection_string, db_name, client=owner.client
+                )
+                # Share the pool stats along with the client
+                controller.pool_listener = owner.pool_listener
+
+            _controllers[key] = controller
+
+        return _controllers[key]
+
+
+def get_client(connection_string=None, db_name=None):
+    """
+    Get the MongoClient of the controller of this process
+
+    :rtype: MongoClient
+    """
+    return get_controller(connection_string, db_name).client
+
+
+def clear_controllers() -> None:
+    """
+    Close the clients and forget the controllers of this process
+    """
+    pid = os.getpid()
+
+    with _lock:
+        for key in [key for key in _controllers if key[0] == pid]:
+            _controllers.pop(key)
+
+        for key in [key for key in _clients if key[0] == pid]:
+            _clients.pop(key).client.close()
@@ -81,13 +81,22 @@ def schema_crawls(collection_name: str) -> dict:
                     "bsonType": "objectId",
                     "description": "must be an objectId and is required",
                 },
+                "keyword_string": {
+                    "bsonType": "string",
+                    "description": "must be a string, copied from the keyword",
+                },
+                "language": {
+                    "bsonType": "string",
+                    "description": "must be a string, copied from the keyword",
+                },
                 "text": {
                     "bsonType": "string",
                     "description": "must be a string and is required",
                 },
-                "timestmap": {
-                    "bsonType": "date",
-                    "description": "must be a date and is required",
+                "timestamp": {
+                    "bsonType": ["date", "string"],
+                    "description": "must be a date and is required, strings are "
+                    "only accepted for legacy crawls",
                 },
                 "crawl_type": {
                     "bsonType": "string",
@@ -182,3 +191,30 @@ def schema_index(collection_name: str) -> dict:
     Schema and restrictions of the index collection
     """
     return construct_schema(vexpr, collection_name)
+
+
+def schema_rollups(collection_name: str) -> dict:
+    """
+    Schema and restrictions of the rollups collection
+    """
+    vexpr = {
+        "$jsonSchema": {
+            "bsonType": "object",
+            "required": ["keyword_ref", "kind", "value"],
+            "properties": {
+                "keyword_ref": {
+                    "bsonType": "objectId",
+                    "description": "must be an objectId and is required",
+                },
+                "kind": {
+                    "enum": ["entities", "categories"],
+                    "description": "must be entities or categories and is required",
+                },
+                "value": {
+                    "bsonType": "string",
+                    "description": "must be a string and is required",
+                },
+            },
+        }
+    }
+    return construct_schema(vexpr, collection_name)
@@ -0,0 +1,103 @@
+"""
+This module provides an in memory cache with LRU eviction and a time to live
+"""
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread safe cache bounded by size, which evicts the least recently used
+    entry once it is full and treats entries older than ttl_seconds as missing
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=300):
+        """
+        :param int max_size: The max amount of entries
+        :param float ttl_seconds: The time an entry stays valid after it was set
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        Get a value and mark it as recently used
+
+        :param key: The key of the entry
+        :param default: Returned if the entry is missing or expired
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:  # Expired
+                    del self.entries[key]
+                self.misses += 1
+                return default
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key, default=None):
+        """
+        Get a value without counting a hit or miss and without marking it as used
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            return default if entry is None else entry[1]
+
+    def set(self, key, value) -> None:
+        """
+        Add or replace an entry, evicting the least recently used one if needed
+        """
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key) -> None:
+        """
+        Remove an entry if it exists
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all entries
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the counters of the cache
+
+        :return: hits, misses, evictions, size, max_size and ttl_seconds
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def __len__(self):
+        return len(self.entries)
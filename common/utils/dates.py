@@ -0,0 +1,19 @@
+"""
+This module provides helpers to deal with timestamps of different formats
+"""
+
+from datetime import datetime
+from dateutil import parser
+
+
+def parse_timestamp(timestamp) -> datetime:
+    """
+    Parse a timestamp which can either be a datetime or a string
+
+    :param timestamp: The timestamp as datetime or in any format dateutil understands
+    :return: The parsed timestamp
+    :rtype: datetime
+    """
+    if isinstance(timestamp, datetime):
+        return timestamp
+    return parser.parse(timestamp)
@@ -0,0 +1,166 @@
+"""
+This module provides the accumulation of plotting data into time buckets
+
+The data is expected to be in chronological order and to consist of dicts with a
+timestamp, a score and the count of crawls the score was averaged over.
+Every bucket starts at the first entry after the previous bucket and includes all
+entries up to granularity_in_minutes later, the score of a bucket is the mean of
+the scores weighted by their count.
+
+If NumPy is installed the vectorized implementation is used, otherwise the plain
+Python one is used.
+"""
+import warnings
+
+from datetime import timedelta
+
+from common.utils.dates import parse_timestamp
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional dependency
+    np = None
+
+
+def accumulate_scores_python(plotting_data: list, granularity_in_minutes: int) -> list:
+    """
+    Accumulate the plotting data one entry after another
+
+    Be aware that the first entry of every bucket is reused and mutated.
+
+    :param list plotting_data: The chronologically ordered {timestamp, score, count}
+    :param int granularity_in_minutes: The time span of one bucket
+    :return: The accumulated buckets
+    :rtype: List<{timestamp, score, count}>
+    """
+    plotting_data_accumulated = []
+    if not plotting_data or len(plotting_data) == 0:
+        return plotting_data
+
+    accumulator = plotting_data[0]
+    cut_off = parse_timestamp(accumulator["timestamp"]) + timedelta(
+        minutes=granularity_in_minutes
+    )
+    for i in range(len(plotting_data)):
+        if i == 0:
+            continue
+        data = plotting_data[i]
+        if parse_timestamp(data["timestamp"]) <= cut_off:
+            accumulator["score"] = (
+                accumulator["score"] * accumulator["count"]
+                + data["score"] * data["count"]
+            ) / (accumulator["count"] + data["count"])
+            accumulator["count"] += data["count"]
+        else:
+            plotting_data_accumulated.append(accumulator)
+            accumulator = data
+            cut_off = parse_timestamp(accumulator["timestamp"]) + timedelta(
+                minutes=granularity_in_minutes
+            )
+
+    if accumulator["count"] > 0:
+        plotting_data_accumulated.append(accumulator)
+
+    return plotting_data_accumulated
+
+
+def _to_datetime64(timestamps: list):
+    """
+    Convert all the timestamps to a datetime64 array at once
+
+    ISO strings are parsed by NumPy directly, anything else is parsed one by one.
+    Timestamps with a timezone are converted to UTC.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # NumPy warns about timezone offsets
+
+        try:
+            return np.array(timestamps, dtype="datetime64[us]")
+        except (ValueError, TypeError):
+            timestamps = [parse_timestamp(timestamp) for timestamp in timestamps]
+            return np.array(
+                [
+                    timestamp.replace(tzinfo=None) - timestamp.utcoffset()
+                    if timestamp.utcoffset() is not None
+                    else timestamp
+                    for timestamp in timestamps
+                ],
+                dtype="datetime64[us]",
+            )
+
+
+def accumulate_scores_numpy(plotting_data: list, granularity_in_minutes: int) -> list:
+    """
+    Accumulate the plotting data using NumPy arrays
+
+    Produces the same buckets as accumulate_scores_python without mutating the input.
+    The first entry of every bucket is found with searchsorted, the weighted means
+    are computed with reduceat over the bucket starts.
+
+    :param list plotting_data: The chronologically ordered {timestamp, score, count}
+    :param int granularity_in_minutes: The time span of one bucket
+    :return: The accumulated buckets
+    :rtype: List<{timestamp, score, count}>
+    """
+    if not plotting_data:
+        return plotting_data
+
+    timestamps = _to_datetime64([data["timestamp"] for data in plotting_data])
+
+    # The bucket logic relies on the order, fall back if the data isn't sorted
+    if np.any(timestamps[1:] < timestamps[:-1]):
+        return accumulate_scores_python(plotting_data, granularity_in_minutes)
+
+    scores = np.array([data["score"] for data in plotting_data], dtype=np.float64)
+    counts = np.array([data["count"] for data in plotting_data], dtype=np.int64)
+
+    # For every entry, the position of the first entry past its cut off
+    cut_offs = timestamps + np.timedelta64(granularity_in_minutes, "m")
+    next_starts = np.searchsorted(timestamps, cut_offs, side="right").tolist()
+
+    # Follow the chain of bucket starts beginning with the first entry
+    starts = []
+    position = 0
+    while position < len(next_starts):
+        starts.append(position)
+        position = next_starts[position]
+
+    starts = np.array(starts, dtype=np.int64)
+    counts_accumulated = np.add.reduceat(counts, starts)
+    scores_weighted = np.add.reduceat(scores * counts, starts)
+
+    # Buckets without crawls keep the score of their first entry, as in Python
+    scores_accumulated = scores[starts]
+    filled = counts_accumulated > 0
+    scores_accumulated[filled] = scores_weighted[filled] / counts_accumulated[filled]
+
+    buckets = [
+        {
+            "timestamp": plotting_data[start]["timestamp"],
+            "score": score,
+            "count": count,
+        }
+        for start, score, count in zip(
+            starts.tolist(), scores_accumulated.tolist(), counts_accumulated.tolist()
+        )
+    ]
+
+    # The last bucket is only kept if it holds crawls, as in Python
+    if buckets[-1]["count"] == 0:
+        buckets.pop()
+
+    return buckets
+
+
+def accumulate_scores(plotting_data: list, granularity_in_minutes: int) -> list:
+    """
+    Accumulate the plotting data into buckets of granularity_in_minutes
+
+    :param list plotting_data: The chronologically ordered {timestamp, score, count}
+    :param int granularity_in_minutes: The time span of one bucket
+    :return: The accumulated buckets
+    :rtype: List<{timestamp, score, count}>
+    """
+    if np is not None:
+        return accumulate_scores_numpy(plotting_data, granularity_in_minutes)
+    return accumulate_scores_python(plotting_data, granularity_in_minutes)
@@ -26,5 +26,6 @@ setuptools.setup(
     license="unlicense",
     packages=setuptools.find_packages(),
     install_requires=install_requires,
+    extras_require={"numpy": ["numpy"], "motor": ["motor>=2.0,<2.1"]},
     zip_safe=False,
 )
@@ -0,0 +1,122 @@
+import asyncio
+import functools
+
+from unittest import skipIf
+
+from test.mongo.controller.queries_crawls_test import generate_crawls
+from test.mongo.controller.queries_crawls_twitter_test import generate_tweets
+from test.mongo.controller.setup import QueryTests, DB_NAME
+
+try:
+    from common.mongo.async_controller import AsyncMongoController
+except ImportError:  # Motor is an optional dependency
+    AsyncMongoController = None
+
+
+def async_test(test):
+    """
+    Run an async test in its own event loop, the controller is constructed
+    within the loop since the Motor client is bound to it
+    """
+
+    @functools.wraps(test)
+    def wrapper(self):
+        async def run_test():
+            self.async_mongo_controller = AsyncMongoController(db_name=DB_NAME)
+            try:
+                await test(self)
+            finally:
+                self.async_mongo_controller.client.close()
+
+        asyncio.run(run_test())
+
+    return wrapper
+
+
+async def collect(async_generator):
+    return [item async for item in async_generator]
+
+
+@skipIf(AsyncMongoController is None, "motor is not installed")
+class AsyncMongoControllerTests(QueryTests):
+    def setUp(self) -> None:
+        super().setUp()
+        self.load_sample_keyword()
+
+    @async_test
+    async def test_get_keyword_by_id(self):
+        keyword = await self.async_mongo_controller.get_keyword_by_id(
+            str(self.keyword_sample._id)
+        )
+
+        self.assertEqual(
+            keyword, self.mongo_controller.get_keyword_by_id(self.keyword_sample._id),
+        )
+
+    @async_test
+    async def test_add_crawls_twitter_bulk(self):
+        result = await self.async_mongo_controller.add_crawls_twitter_bulk(
+            self.keyword_sample._id, generate_tweets(25), batch_size=10
+        )
+
+        self.assertEqual(result["upserted"], 25, "All tweets should have been added")
+        self.assertEqual(
+            self.mongo_controller.get_crawl_twitter_by_id(3),
+            await self.async_mongo_controller.get_crawl_twitter_by_id(3),
+            "Both controllers should return the same document",
+        )
+
+    @async_test
+    async def test_iter_unprocessed_crawls(self):
+        self.load_crawls(generate_crawls(self.keyword_sample, 15))
+        self.mongo_controller.crawls_collection.update_many(
+            {}, {"$unset": {"score": ""}}
+        )
+
+        crawls = await collect(
+            self.async_mongo_controller.iter_unprocessed_crawls(batch_size=4)
+        )
+
+        self.assertEqual(crawls, self.mongo_controller.get_unprocessed_crawls())
+
+    @async_test
+    async def test_get_crawl_by_id_missing(self):
+        crawl = await self.async_mongo_controller.get_crawl_by_id(
+            str(self.keyword_sample._id)
+        )
+
+        self.assertIsNone(crawl, "No crawl should have been found")
+
+    @async_test
+    async def test_add_crawls_twitter_bulk_unacknowledged(self):
+        async_mongo_controller = AsyncMongoController(
+            db_name=DB_NAME, bulk_write_concern="0"
+        )
+        try:
+            result = await async_mongo_controller.add_crawls_twitter_bulk(
+                self.keyword_sample._id, generate_tweets(5)
+            )
+        finally:
+            async_mongo_controller.client.close()
+
+        self.assertFalse(result["acknowledged"])
+        self.assertIsNone(result["upserted"], "The counts should be unknown")
+
+    @async_test
+    async def test_stats_settings(self):
+        async_mongo_controller = AsyncMongoController(
+            db_name=DB_NAME, analytics_read_preference="secondaryPreferred"
+        )
+        try:
+            await async_mongo_controller.get_crawls_average_score(
+                self.keyword_sample._id
+            )
+            stats = async_mongo_controller.stats()
+        finally:
+            async_mongo_controller.client.close()
+
+        self.assertEqual(
+            stats["settings"]["read_preferences"]["get_entities"],
+            {"mode": "secondaryPreferred"},
+        )
+        self.assertGreater(stats["pool"]["connections_created"], 0)
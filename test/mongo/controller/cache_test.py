@@ -0,0 +1,170 @@
+import time
+
+from common.mongo.controller import MongoController
+from common.mongo.data_types.index import IndexTypes
+from test.mongo.controller.setup import DB_NAME, QueryTests
+
+
+class CacheTests(QueryTests):
+    def setUp(self) -> None:
+        super().setUp()
+        self.load_sample_keyword()
+        self.mongo_controller.enable_cache()
+
+    def test_cache_disabled(self):
+        self.mongo_controller.disable_cache()
+        self.mongo_controller.get_keyword_by_id(self.keyword_sample._id)
+
+        self.assertIsNone(self.mongo_controller.get_cache_stats())
+
+    def test_get_keyword_by_id_cached(self):
+        keyword = self.mongo_controller.get_keyword_by_id(self.keyword_sample._id)
+        keyword_cached = self.mongo_controller.get_keyword_by_id(
+            self.keyword_sample._id
+        )
+
+        self.assertEqual(keyword, keyword_cached, "The same keyword is returned")
+        stats = self.mongo_controller.get_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_get_keyword_cached_by_id(self):
+        self.mongo_controller.get_keyword_by_id(self.keyword_sample._id)
+        self.mongo_controller.get_keyword(
+            self.keyword_sample.keyword_string, self.keyword_sample.language
+        )
+
+        self.assertEqual(
+            self.mongo_controller.get_cache_stats()["hits"],
+            1,
+            "The keyword should be cached under both keys",
+        )
+
+    def test_get_keyword_by_id_username(self):
+        self.mongo_controller.get_keyword_by_id(self.keyword_sample._id)
+        keyword = self.mongo_controller.get_keyword_by_id(
+            self.keyword_sample._id, username="some user"
+        )
+
+        self.assertIsNone(keyword, "The user is not associated to the keyword")
+
+    def test_add_keyword_invalidates(self):
+        username = "some user"
+        self.mongo_controller.get_keyword_by_id(self.keyword_sample._id)
+        self.mongo_controller.add_keyword(
+            self.keyword_sample.keyword_string, self.keyword_sample.language, username
+        )
+
+        keyword = self.mongo_controller.get_keyword_by_id(
+            self.keyword_sample._id, cast=True
+        )
+        self.assertIn(username, keyword.users, "The cache should have been updated")
+
+    def test_delete_keyword_invalidates(self):
+        username = "some user"
+        self.mongo_controller.add_keyword(
+            self.keyword_sample.keyword_string, self.keyword_sample.language, username
+        )
+        self.mongo_controller.get_keyword(
+            self.keyword_sample.keyword_string, self.keyword_sample.language
+        )
+        self.mongo_controller.delete_keyword(self.keyword_sample._id, username)
+
+        keyword = self.mongo_controller.get_keyword(
+            self.keyword_sample.keyword_string, self.keyword_sample.language, cast=True
+        )
+        self.assertNotIn(username, keyword.users, "The cache should have been updated")
+
+    def test_add_keyword_invalidates_evicted_natural_key(self):
+        keyword = self.keyword_sample
+        username = "some user"
+        self.mongo_controller.get_keyword(keyword.keyword_string, keyword.language)
+
+        # The natural key was evicted, the ID key is still cached
+        self.mongo_controller.cache.delete(
+            ("keyword_string", keyword.keyword_string, keyword.language)
+        )
+        self.mongo_controller.add_keyword(
+            keyword.keyword_string, keyword.language, username
+        )
+
+        self.assertIsNotNone(
+            self.mongo_controller.get_keyword_by_id(keyword._id, username=username),
+            "The subscribed user should be associated to the keyword",
+        )
+
+    def test_delete_keyword_invalidates_evicted_id(self):
+        keyword = self.keyword_sample
+        username = "some user"
+        self.mongo_controller.add_keyword(
+            keyword.keyword_string, keyword.language, username
+        )
+        self.mongo_controller.get_keyword(keyword.keyword_string, keyword.language)
+
+        # The ID key was evicted, the natural key is still cached
+        self.mongo_controller.cache.delete(("keyword", keyword._id))
+        self.mongo_controller.delete_keyword(keyword._id, username)
+
+        self.assertIsNone(
+            self.mongo_controller.get_keyword(
+                keyword.keyword_string, keyword.language, username=username
+            ),
+            "No stale keyword should be served through the natural key",
+        )
+
+    def test_add_index_invalidates(self):
+        name = "some index"
+        self.mongo_controller.add_index(name, IndexTypes.COMPANY.value, "user one")
+        self.mongo_controller.get_index(name)
+        self.mongo_controller.add_index(name, IndexTypes.COMPANY.value, "user two")
+
+        index = self.mongo_controller.get_index(name, cast=True)
+        self.assertIn("user two", index.users, "The cache should have been updated")
+
+    def test_get_meta_keywords_public_ids_invalidates(self):
+        self.mongo_controller.get_meta_keywords_public_ids()
+        self.mongo_controller.set_meta_keywords_public_ids([self.keyword_sample._id])
+
+        self.assertEqual(
+            self.mongo_controller.get_meta_keywords_public_ids(),
+            [self.keyword_sample._id],
+            "The cache should have been updated",
+        )
+
+    def test_get_cache_stats_invalidation(self):
+        stats = self.mongo_controller.get_cache_stats()
+        self.assertEqual(
+            (stats["invalidation_running"], stats["invalidation_failures"]),
+            (False, 0),
+            "The change stream is only tailed once started",
+        )
+
+        if not self.mongo_controller.start_cache_invalidation():
+            self.skipTest("Change streams need a replica set")
+
+        stats = self.mongo_controller.get_cache_stats()
+        self.mongo_controller.stop_cache_invalidation()
+        self.assertTrue(stats["invalidation_running"])
+
+    def test_start_cache_invalidation_other_process(self):
+        if not self.mongo_controller.start_cache_invalidation():
+            self.skipTest("Change streams need a replica set")
+
+        username = "some user"
+        self.mongo_controller.get_keyword_by_id(self.keyword_sample._id)
+
+        # Another process changes the keyword
+        other_controller = MongoController(db_name=DB_NAME)
+        other_controller.add_keyword(
+            self.keyword_sample.keyword_string, self.keyword_sample.language, username
+        )
+
+        for _ in range(50):
+            keyword = self.mongo_controller.get_keyword_by_id(
+                self.keyword_sample._id, cast=True
+            )
+            if username in keyword.users:
+                break
+            time.sleep(0.1)
+
+        self.mongo_controller.stop_cache_invalidation()
+        self.assertIn(username, keyword.users, "The entry should have been evicted")
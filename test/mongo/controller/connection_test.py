@@ -0,0 +1,102 @@
+import os
+
+from unittest import TestCase
+from pymongo import ReadPreference, WriteConcern
+
+from common.exceptions.parameters import InvalidParameterError
+from common.mongo.controller import MongoController
+from common.mongo.controller.connection import client_settings, client_options
+
+DB_NAME = "apoa-unit-testing"
+
+
+class ConnectionTests(TestCase):
+    def tearDown(self) -> None:
+        os.environ.pop("MONGO_MAX_POOL_SIZE", None)
+
+    def test_client_settings_parameters(self):
+        settings = client_settings(
+            max_pool_size=20,
+            compressors=["zlib"],
+            analytics_read_preference="secondaryPreferred",
+            bulk_write_concern="1",
+        )
+
+        self.assertEqual(settings["max_pool_size"], 20)
+        self.assertEqual(settings["compressors"], "zlib")
+        self.assertEqual(
+            settings["analytics_read_preference"], ReadPreference.SECONDARY_PREFERRED
+        )
+        self.assertEqual(settings["bulk_write_concern"], WriteConcern(w=1))
+        self.assertEqual(
+            client_options(settings),
+            {"maxPoolSize": 20, "compressors": "zlib"},
+            "Settings which are not set should keep the driver defaults",
+        )
+
+    def test_client_settings_environment(self):
+        os.environ["MONGO_MAX_POOL_SIZE"] = "50"
+
+        self.assertEqual(client_settings()["max_pool_size"], 50)
+        self.assertEqual(
+            client_settings(max_pool_size=10)["max_pool_size"],
+            10,
+            "The parameter should take precedence over the env var",
+        )
+
+    def test_stats(self):
+        mongo_controller = MongoController(
+            db_name=DB_NAME, max_pool_size=10, bulk_write_concern="majority"
+        )
+
+        stats = mongo_controller.stats()
+
+        self.assertEqual(mongo_controller.client.max_pool_size, 10)
+        self.assertEqual(stats["settings"]["bulk_write_concern"], {"w": "majority"})
+        self.assertEqual(stats["pool"]["connections_open"], 0, "Nothing is connected")
+
+    def test_read_preferences_routing(self):
+        mongo_controller = MongoController(
+            db_name=DB_NAME,
+            analytics_read_preference="secondaryPreferred",
+            read_preferences={"get_entities": "nearest"},
+            max_staleness_seconds=120,
+        )
+        crawls_collection = mongo_controller.crawls_collection
+
+        plotting = mongo_controller._read_collection(
+            crawls_collection, "get_crawls_plotting_data"
+        )
+        entities = mongo_controller._read_collection(crawls_collection, "get_entities")
+        claim = mongo_controller._read_collection(
+            crawls_collection, "claim_unprocessed_crawls"
+        )
+
+        self.assertEqual(
+            plotting.read_preference.document,
+            {"mode": "secondaryPreferred", "maxStalenessSeconds": 120},
+        )
+        self.assertEqual(
+            entities.read_preference.document,
+            {"mode": "nearest", "maxStalenessSeconds": 120},
+            "A method route should override the analytics read preference",
+        )
+        self.assertEqual(
+            claim.read_preference, ReadPreference.PRIMARY, "Leasing stays on primary"
+        )
+
+    def test_read_preferences_environment(self):
+        os.environ["MONGO_READ_PREFERENCES"] = "get_categories=secondary"
+
+        try:
+            settings = client_settings()
+        finally:
+            os.environ.pop("MONGO_READ_PREFERENCES")
+
+        self.assertEqual(
+            settings["read_preferences"], {"get_categories": ReadPreference.SECONDARY}
+        )
+
+    def test_read_preferences_unknown_method(self):
+        with self.assertRaises(InvalidParameterError):
+            client_settings(read_preferences={"claim_unprocessed_crawls": "nearest"})
@@ -1,8 +1,11 @@
 from bson import ObjectId
 from datetime import datetime, timedelta
 
+from common.exceptions.parameters import InvalidParameterError
 from common.mongo.data_types.keyword import Keyword
+from common.mongo.data_types.crawling.crawl_result import CrawlResult
 from common.mongo.data_types.crawling.crawl_results.news_result import NewsResult
+from common.utils.dates import parse_timestamp
 from test.mongo.controller.setup import QueryTests
 
 
@@ -81,3 +84,419 @@ class QueriesCrawlsTests(QueryTests):
             int(len(crawls) / amount_accumulated),
             "every x crawl should have been accumulated",
         )
+
+    def test_get_crawls_plotting_data_server_side_no_data(self):
+        plotting_data = self.mongo_controller.get_crawls_plotting_data(
+            ObjectId(), server_side=True
+        )
+        self.assertEqual(plotting_data, [], "No plotting data should have been found")
+
+    def test_get_crawls_plotting_data_server_side(self):
+        granularity = 60
+        keyword = self.keyword_sample
+        crawls = generate_crawls(keyword, 100, time_difference=7)
+        self.load_crawls(crawls)
+
+        plotting_data = self.mongo_controller.get_crawls_plotting_data(
+            keyword._id, granularity_in_minutes=granularity, server_side=True
+        )
+
+        self.assertEqual(
+            sum([data["count"] for data in plotting_data]),
+            len(crawls),
+            "Every crawl should have been accumulated",
+        )
+        self.assertEqual(
+            [data["timestamp"] for data in plotting_data],
+            sorted([data["timestamp"] for data in plotting_data]),
+            "The buckets should be in chronological order",
+        )
+        for data in plotting_data:
+            self.assertLessEqual(data["count"], 9, "A bucket spans 60 minutes")
+            self.assertEqual(data["score"], 1, "They should all average out to 1")
+
+    def test_get_crawls_plotting_data_server_side_unparseable(self):
+        keyword = self.keyword_sample
+        crawls = generate_crawls(keyword, 10)
+        self.load_crawls(crawls)
+        self.mongo_controller.crawls_collection.update_one(
+            {"_id": crawls[0]._id}, {"$set": {"timestamp": "not a timestamp"}}
+        )
+
+        plotting_data = self.mongo_controller.get_crawls_plotting_data(
+            keyword._id, server_side=True
+        )
+
+        self.assertEqual(
+            sum([data["count"] for data in plotting_data]),
+            9,
+            "The crawl with the invalid timestamp should be left out",
+        )
+        self.assertEqual(
+            self.mongo_controller.stats()["counters"]["plotting_rows_dropped"],
+            1,
+            "The left out crawl should be counted",
+        )
+
+    def test_migrate_crawl_timestamps(self):
+        keyword = self.keyword_sample
+        crawls = generate_crawls(keyword, 25)
+        self.load_crawls(crawls)
+        self.mongo_controller.crawls_collection.update_one(
+            {"_id": crawls[0]._id}, {"$set": {"timestamp": "not a timestamp"}}
+        )
+
+        result = self.mongo_controller.migrate_crawl_timestamps(batch_size=10)
+
+        self.assertEqual(result["migrated"], 24, "All valid timestamps are migrated")
+        self.assertEqual(result["failed"], [crawls[0]._id], "The invalid one failed")
+        self.assertEqual(
+            self.mongo_controller.crawls_collection.count_documents(
+                {"timestamp": {"$type": "date"}}
+            ),
+            24,
+            "The timestamps should be stored as dates now",
+        )
+
+        result = self.mongo_controller.migrate_crawl_timestamps(
+            start_after=result["last_id"]
+        )
+        self.assertEqual(result["migrated"], 0, "Nothing is left to migrate")
+
+    def test_migrate_crawl_keywords(self):
+        crawls = self.load_unprocessed_crawls(25)
+        self.mongo_controller.crawls_collection.update_many(
+            {}, {"$unset": {"keyword_string": "", "language": ""}}
+        )
+
+        self.assertEqual(
+            self.mongo_controller.get_crawl_by_id(crawls[0]._id)["keyword_string"],
+            self.keyword_sample.keyword_string,
+            "Legacy crawls should be joined with their keyword",
+        )
+
+        result = self.mongo_controller.migrate_crawl_keywords(batch_size=1)
+
+        self.assertEqual(result["migrated"], 25, "All crawls should be migrated")
+        self.assertEqual(
+            self.mongo_controller.crawls_collection.count_documents(
+                {"keyword_string": self.keyword_sample.keyword_string}
+            ),
+            25,
+            "The keyword fields should be stored on the crawls",
+        )
+        self.assertEqual(
+            self.mongo_controller.migrate_crawl_keywords()["migrated"],
+            0,
+            "Nothing is left to migrate",
+        )
+
+    def test_get_crawls_plotting_data_mixed_timestamps(self):
+        keyword = self.keyword_sample
+        start = datetime(2020, 1, 1)
+        timestamps = [start + timedelta(minutes=10 * i) for i in range(12)]
+
+        crawls = generate_crawls(keyword, len(timestamps))
+        for crawl, timestamp in zip(crawls, timestamps):
+            crawl.timestamp = timestamp
+        self.load_crawls(crawls)
+
+        # Every other crawl is migrated, the others keep their ISO string
+        for crawl, timestamp in list(zip(crawls, timestamps))[::2]:
+            self.mongo_controller.crawls_collection.update_one(
+                {"_id": crawl._id}, {"$set": {"timestamp": timestamp}}
+            )
+
+        plotting_data = self.mongo_controller.get_crawls_plotting_data(
+            keyword._id, granularity_in_minutes=60
+        )
+
+        self.assertEqual(
+            [parse_timestamp(data["timestamp"]) for data in plotting_data],
+            [timestamps[0], timestamps[7]],
+            "The buckets should be in chronological order",
+        )
+        self.assertEqual(
+            [data["count"] for data in plotting_data],
+            [7, 5],
+            "Migrated and legacy crawls should be bucketed together",
+        )
+
+    def load_unprocessed_crawls(self, amount: int):
+        crawls = generate_crawls(self.keyword_sample, amount)
+        self.load_sample_keyword()
+        self.load_crawls(crawls)
+        self.mongo_controller.crawls_collection.update_many(
+            {}, {"$unset": {"score": ""}}
+        )
+        return crawls
+
+    def test_claim_unprocessed_crawls(self):
+        self.load_unprocessed_crawls(15)
+
+        crawls_one = self.mongo_controller.claim_unprocessed_crawls(
+            "worker one", batch_size=10
+        )
+        crawls_two = self.mongo_controller.claim_unprocessed_crawls(
+            "worker two", batch_size=10
+        )
+
+        self.assertEqual(len(crawls_one), 10, "A full batch should be claimed")
+        self.assertEqual(len(crawls_two), 5, "Only the remaining should be claimed")
+        self.assertEqual(
+            set([crawl["_id"] for crawl in crawls_one])
+            & set([crawl["_id"] for crawl in crawls_two]),
+            set(),
+            "No crawl should be claimed twice",
+        )
+        self.assertEqual(
+            crawls_one[0]["keyword_string"],
+            self.keyword_sample.keyword_string,
+            "The keyword should have been joined",
+        )
+
+    def test_claim_unprocessed_crawls_expired_lease(self):
+        self.load_unprocessed_crawls(5)
+
+        self.mongo_controller.claim_unprocessed_crawls("worker one", lease_seconds=0)
+        crawls = self.mongo_controller.claim_unprocessed_crawls("worker two", cast=True)
+
+        self.assertEqual(len(crawls), 5, "Expired leases should be claimable")
+        self.assertEqual(
+            self.mongo_controller.crawls_collection.count_documents(
+                {"lease.owner": "worker two"}
+            ),
+            5,
+            "The lease should belong to the new worker",
+        )
+
+    def test_set_processing_results_bulk(self):
+        crawls = self.load_unprocessed_crawls(10)
+        entities = [{"value": "some entity", "count": 1, "score": 0.5}]
+        categories = [{"value": "some category", "count": 1, "confidence": 0.5}]
+
+        result = self.mongo_controller.set_processing_results_bulk(
+            [
+                {
+                    "_id": str(crawl._id),
+                    "score": 0.5,
+                    "entities": entities,
+                    "categories": categories,
+                }
+                for crawl in crawls[:9]
+            ]
+            + [{"_id": crawls[9]._id, "score": 1}]
+        )
+
+        self.assertEqual(result["modified"], 10, "Every crawl should be updated")
+        self.assertEqual(
+            self.mongo_controller.get_unprocessed_crawls(),
+            [],
+            "All crawls should have a score now",
+        )
+
+        crawl = self.mongo_controller.get_crawl_by_id(crawls[0]._id)
+        self.assertEqual(crawl["entities"], entities)
+        self.assertEqual(crawl["categories"], categories)
+
+        crawl = self.mongo_controller.get_crawl_by_id(crawls[9]._id)
+        self.assertEqual(crawl["entities"], [], "Missing fields are untouched")
+
+    def test_iter_unprocessed_crawls(self):
+        self.load_unprocessed_crawls(25)
+
+        crawls = self.mongo_controller.iter_unprocessed_crawls(batch_size=10, cast=True)
+
+        self.assertNotIsInstance(crawls, list, "The crawls should be streamed")
+        crawls = list(crawls)
+        self.assertEqual(len(crawls), 25, "All crawls should be streamed")
+        self.assertIsInstance(crawls[0], CrawlResult, "Crawls should be casted")
+
+    def test_get_unprocessed_crawls_join_strategies(self):
+        crawls = self.load_unprocessed_crawls(25)
+        self.mongo_controller.crawls_collection.update_many(
+            {"_id": {"$in": [crawl._id for crawl in crawls[:10]]}},
+            {"$unset": {"keyword_string": "", "language": ""}},
+        )
+
+        crawls_client = self.mongo_controller.get_unprocessed_crawls(join="client")
+        crawls_lookup = self.mongo_controller.get_unprocessed_crawls(join="lookup")
+
+        self.assertEqual(len(crawls_client), 25, "All crawls should be joined")
+        self.assertCountEqual(
+            crawls_client, crawls_lookup, "Both strategies return the same crawls"
+        )
+        self.assertRaises(
+            InvalidParameterError,
+            self.mongo_controller.get_unprocessed_crawls,
+            join="some strategy",
+        )
+
+    def test_get_unprocessed_crawls_keyword_join_cache(self):
+        self.load_unprocessed_crawls(5)
+        self.mongo_controller.crawls_collection.update_many(
+            {}, {"$unset": {"keyword_string": "", "language": ""}}
+        )
+        keyword_join_cache = self.mongo_controller.keyword_join_cache
+
+        self.mongo_controller.get_unprocessed_crawls()
+        self.mongo_controller.get_unprocessed_crawls()
+
+        self.assertEqual(
+            keyword_join_cache.stats()["hits"],
+            1,
+            "The keyword should be cached across calls",
+        )
+
+        self.mongo_controller.delete_keyword(self.keyword_sample._id, "some user")
+
+        self.assertIsNone(
+            keyword_join_cache.peek(self.keyword_sample._id),
+            "Changing the keyword should invalidate it",
+        )
+
+    def test_iter_crawls_texts(self):
+        keyword = self.keyword_sample
+        self.load_crawls(generate_crawls(keyword, 25))
+
+        texts = list(
+            self.mongo_controller.iter_crawls_texts(keyword._id, batch_size=10)
+        )
+
+        self.assertEqual(
+            texts,
+            self.mongo_controller.get_crawls_texts(keyword._id),
+            "Streaming should return the same texts",
+        )
+
+    def test_get_crawls_texts_legacy_timestamps(self):
+        keyword = self.keyword_sample
+        self.load_crawls(generate_crawls(keyword, 4))
+
+        # Store every other timestamp as legacy ISO string
+        crawls_collection = self.mongo_controller.crawls_collection
+        for index, crawl in enumerate(crawls_collection.find()):
+            if index % 2:
+                crawls_collection.update_one(
+                    {"_id": crawl["_id"]},
+                    {"$set": {"timestamp": crawl["timestamp"].isoformat()}},
+                )
+
+        texts = self.mongo_controller.get_crawls_texts(keyword._id)
+
+        timestamps = [parse_timestamp(text["timestamp"]) for text in texts]
+        self.assertEqual(
+            timestamps,
+            sorted(timestamps, reverse=True),
+            "The texts should be sorted by date regardless of the stored type",
+        )
+
+    def load_crawls_with_entities(self, amount: int):
+        crawls = generate_crawls(self.keyword_sample, amount)
+        self.load_sample_keyword()
+        self.load_crawls(crawls)
+
+        # The entity i shows up in the first amount - i crawls
+        for i, crawl in enumerate(crawls):
+            self.mongo_controller.set_entities_crawl(
+                crawl._id,
+                [
+                    {"value": f"entity {j}", "count": 1, "score": 0.5}
+                    for j in range(amount - i)
+                ],
+            )
+        return crawls
+
+    def test_get_entities_top_n(self):
+        self.load_crawls_with_entities(10)
+
+        entities = self.mongo_controller.get_entities(self.keyword_sample._id, limit=3)
+
+        self.assertEqual(
+            [entity["value"] for entity in entities],
+            ["entity 0", "entity 1", "entity 2"],
+            "The most common entities should be returned",
+        )
+        self.assertEqual([entity["count"] for entity in entities], [10, 9, 8])
+
+    def test_get_entities_allow_disk_use(self):
+        self.load_crawls_with_entities(5)
+
+        self.assertEqual(
+            self.mongo_controller.get_entities(
+                self.keyword_sample._id, allow_disk_use=True
+            ),
+            self.mongo_controller.get_entities(self.keyword_sample._id),
+        )
+
+    def test_get_entities_from_rollup(self):
+        crawls = self.load_crawls_with_entities(10)
+
+        # Replace the entities of a crawl, the rollups have to follow
+        self.mongo_controller.set_entities_crawl(
+            crawls[0]._id, [{"value": "entity 9", "count": 5, "score": 1}]
+        )
+
+        self.assertEqual(
+            self.mongo_controller.get_entities(
+                self.keyword_sample._id, limit=5, from_rollup=True
+            ),
+            self.mongo_controller.get_entities(self.keyword_sample._id, limit=5),
+            "The rollups should match the crawls",
+        )
+
+    def test_set_processing_results_bulk_rollups(self):
+        crawls = self.load_unprocessed_crawls(10)
+        categories = [{"value": "some category", "count": 1, "confidence": 0.5}]
+
+        self.mongo_controller.set_processing_results_bulk(
+            [{"_id": crawl._id, "categories": categories} for crawl in crawls]
+        )
+
+        self.assertEqual(
+            self.mongo_controller.get_categories(
+                self.keyword_sample._id, from_rollup=True
+            ),
+            [{"value": "some category", "count": 10, "confidence": 0.5}],
+        )
+
+    def test_set_processing_results_bulk_duplicate_ids(self):
+        crawls = self.load_unprocessed_crawls(1)
+        results = [{"_id": crawls[0]._id, "score": score} for score in [0.25, 0.5]]
+
+        with self.assertRaises(InvalidParameterError):
+            self.mongo_controller.set_processing_results_bulk(results)
+
+    def test_rebuild_rollups(self):
+        self.load_crawls_with_entities(10)
+        self.mongo_controller.rollups_collection.delete_many({})
+
+        written = self.mongo_controller.rebuild_rollups(batch_size=3)
+
+        self.assertEqual(written, 10, "Every entity should have a rollup")
+        self.assertEqual(
+            self.mongo_controller.get_entities(
+                self.keyword_sample._id, from_rollup=True
+            ),
+            self.mongo_controller.get_entities(self.keyword_sample._id),
+        )
+
+    def test_set_score_crawl_return_object(self):
+        crawls = self.load_unprocessed_crawls(1)
+
+        crawl = self.mongo_controller.set_score_crawl(
+            crawls[0]._id, 0.5, return_object=True
+        )
+
+        self.assertEqual(
+            crawl,
+            self.mongo_controller.get_crawl_by_id(crawls[0]._id),
+            "The same shape as get_crawl_by_id should be returned",
+        )
+
+    def test_set_score_crawl_return_object_missing(self):
+        crawl = self.mongo_controller.set_score_crawl(
+            ObjectId(), 0.5, return_object=True, cast=True
+        )
+
+        self.assertIsNone(crawl, "No crawl should have been found")
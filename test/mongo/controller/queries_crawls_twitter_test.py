@@ -0,0 +1,165 @@
+from datetime import datetime
+
+from common.mongo.controller import MongoController
+from test.mongo.controller.setup import QueryTests, DB_NAME
+
+
+def generate_tweets(amount: int, tweet_id_offset=0):
+    return [
+        {
+            "tweet_id": tweet_id_offset + i,
+            "text": f"some tweet {i}",
+            "likes": i,
+            "retweets": i,
+            "timestamp": datetime.now(),
+        }
+        for i in range(amount)
+    ]
+
+
+class QueriesCrawlsTwitterTests(QueryTests):
+    def setUp(self) -> None:
+        super().setUp()
+        self.load_sample_keyword()
+
+    def test_add_crawls_twitter_bulk(self):
+        tweets = generate_tweets(25)
+
+        result = self.mongo_controller.add_crawls_twitter_bulk(
+            self.keyword_sample._id, tweets, batch_size=10
+        )
+
+        self.assertEqual(result["upserted"], 25, "All tweets should have been added")
+        self.assertEqual(result["errors"], [], "No errors should have occurred")
+        self.assertEqual(
+            self.mongo_controller.crawls_collection.count_documents({}),
+            25,
+            "Every tweet should be stored once",
+        )
+
+    def test_add_crawls_twitter_bulk_unacknowledged(self):
+        mongo_controller = MongoController(db_name=DB_NAME, bulk_write_concern="0")
+
+        result = mongo_controller.add_crawls_twitter_bulk(
+            self.keyword_sample._id, generate_tweets(5)
+        )
+        mongo_controller.client.close()
+
+        self.assertFalse(result["acknowledged"], "w=0 writes are not acknowledged")
+        self.assertIsNone(result["matched"], "The counts should be unknown")
+
+    def test_add_crawls_twitter_bulk_dedupe(self):
+        tweets = generate_tweets(10)
+        self.mongo_controller.add_crawls_twitter_bulk(self.keyword_sample._id, tweets)
+
+        tweets_updated = generate_tweets(10) + generate_tweets(5, tweet_id_offset=10)
+        tweets_updated[0]["likes"] = 100
+        tweets_updated.append(dict(tweets_updated[0], likes=200))
+
+        result = self.mongo_controller.add_crawls_twitter_bulk(
+            self.keyword_sample._id, tweets_updated
+        )
+
+        self.assertEqual(result["upserted"], 5, "Only the new tweets are inserted")
+        self.assertEqual(result["matched"], 10, "The existing tweets are matched")
+        self.assertEqual(
+            self.mongo_controller.crawls_collection.count_documents({}),
+            15,
+            "Tweets should have been deduplicated on their tweet_id",
+        )
+
+        tweet = self.mongo_controller.crawls_collection.find_one({"tweet_id": 0})
+        self.assertEqual(tweet["likes"], 200, "The last occurrence should win")
+
+    def test_add_crawls_twitter_bulk_error_index(self):
+        tweets = generate_tweets(6)
+        tweets.insert(1, dict(tweets[0]))
+        tweets[-1]["text"] = None  # Violates the schema
+
+        result = self.mongo_controller.add_crawls_twitter_bulk(
+            self.keyword_sample._id, tweets, batch_size=2
+        )
+
+        self.assertEqual(len(result["errors"]), 1, "Only the invalid tweet fails")
+        self.assertEqual(
+            (result["errors"][0]["index"], result["errors"][0]["tweet_id"]),
+            (6, 5),
+            "The error should point to the tweet rather than the operation",
+        )
+
+    def test_add_crawl_twitter_timestamp_date(self):
+        timestamp = datetime(2020, 1, 1, 12)
+        self.mongo_controller.add_crawl_twitter(
+            self.keyword_sample._id, 1, "some tweet", 0, 0, timestamp.isoformat()
+        )
+
+        tweet = self.mongo_controller.crawls_collection.find_one({"tweet_id": 1})
+        self.assertEqual(tweet["timestamp"], timestamp, "Stored as a native date")
+
+    def test_add_crawl_twitter_keyword_fields_cached(self):
+        for tweet_id in range(3):
+            self.mongo_controller.add_crawl_twitter(
+                self.keyword_sample._id, tweet_id, "some tweet", 0, 0, datetime.now()
+            )
+
+        self.assertEqual(
+            self.mongo_controller.keyword_join_cache.stats()["hits"],
+            2,
+            "The keyword should only be read for the first crawl",
+        )
+
+    def test_add_crawl_twitter_keyword_fields(self):
+        self.mongo_controller.add_crawl_twitter(
+            self.keyword_sample._id, 1, "some tweet", 0, 0, datetime.now()
+        )
+
+        tweet = self.mongo_controller.crawls_collection.find_one({"tweet_id": 1})
+        self.assertEqual(
+            (tweet["keyword_string"], tweet["language"]),
+            (self.keyword_sample.keyword_string, self.keyword_sample.language),
+            "The keyword fields should be stored on the crawl",
+        )
+
+    def test_add_crawl_twitter_keeps_processing_results(self):
+        timestamp = datetime(2020, 1, 1, 12)
+        self.mongo_controller.add_crawl_twitter(
+            self.keyword_sample._id, 1, "some tweet", 0, 0, timestamp
+        )
+        tweet = self.mongo_controller.crawls_collection.find_one({"tweet_id": 1})
+        self.mongo_controller.set_score_crawl(tweet["_id"], 0.5)
+
+        self.mongo_controller.add_crawl_twitter(
+            self.keyword_sample._id, 1, "some tweet", 10, 2, timestamp
+        )
+
+        tweet = self.mongo_controller.crawls_collection.find_one({"tweet_id": 1})
+        self.assertEqual(tweet["score"], 0.5, "The score should have been kept")
+        self.assertEqual((tweet["likes"], tweet["retweets"]), (10, 2))
+        self.assertEqual(
+            self.mongo_controller.get_unprocessed_crawls(),
+            [],
+            "The tweet should not be queued for processing again",
+        )
+        self.assertEqual(
+            self.mongo_controller.stats()["counters"]["recrawls_skipped"], 1
+        )
+
+    def test_add_crawls_twitter_bulk_keeps_processing_results(self):
+        self.mongo_controller.add_crawls_twitter_bulk(
+            self.keyword_sample._id, generate_tweets(5)
+        )
+        self.mongo_controller.crawls_collection.update_many({}, {"$set": {"score": 1}})
+
+        result = self.mongo_controller.add_crawls_twitter_bulk(
+            self.keyword_sample._id, generate_tweets(5)
+        )
+
+        self.assertEqual(result["matched"], 5)
+        self.assertEqual(
+            self.mongo_controller.crawls_collection.count_documents({"score": 1}),
+            5,
+            "Every score should have been kept",
+        )
+        self.assertEqual(
+            self.mongo_controller.stats()["counters"]["recrawls_skipped"], 5
+        )
@@ -1,6 +1,7 @@
 from datetime import datetime
 from bson import ObjectId
 from random import randint
+from pymongo.results import InsertOneResult
 
 from common.mongo.data_types.keyword import Keyword
 from common.config import SUPPORTED_LANGUAGES
@@ -242,6 +243,35 @@ class QueriesKeywordTests(QueryTests):
             "The username should have been deleted",
         )
 
+    def test_add_delete_keyword_deleted_flag(self):
+        keyword = self.keyword_new
+        username = "some user"
+
+        result = self.mongo_controller.add_keyword(
+            keyword.keyword_string, keyword.language, username
+        )
+        self.assertIsInstance(result, InsertOneResult, "The keyword should be created")
+
+        keyword_added = self.mongo_controller.get_keyword_by_id(
+            result.inserted_id, cast=False
+        )
+        self.assertEqual(keyword_added["indexes"], [], "Indexes should be initialised")
+        self.assertFalse(keyword_added["deleted"], "A keyword with users is active")
+
+        result = self.mongo_controller.add_keyword(
+            keyword.keyword_string, keyword.language, username
+        )
+        self.assertEqual(result.matched_count, 1, "The keyword should be matched")
+        self.assertEqual(result.modified_count, 0, "The user was already added")
+
+        self.mongo_controller.delete_keyword(keyword_added["_id"], username)
+
+        keyword_deleted = self.mongo_controller.get_keyword_by_id(
+            keyword_added["_id"], cast=False
+        )
+        self.assertEqual(keyword_deleted["users"], [], "The user should be removed")
+        self.assertTrue(keyword_deleted["deleted"], "The flag is set in the update")
+
     def test_keywords_public_no_keywords(self):
         keywords = self.mongo_controller.get_keywords_public(cast=True)
 
@@ -271,6 +301,26 @@ class QueriesKeywordTests(QueryTests):
 
         self.assertEqual(len(keywords), 0, "No keywords should have been returned")
 
+    def test_get_keywords_by_ids(self):
+        _ids = [
+            self.keyword_crawl_outdated_two._id,
+            ObjectId(),
+            str(self.keyword_sample._id),
+            self.keyword_crawl_outdated._id,
+        ]
+
+        keywords = self.mongo_controller.get_keywords_by_ids(_ids, cast=True)
+
+        self.assertEqual(
+            [keyword._id for keyword in keywords],
+            [
+                self.keyword_crawl_outdated_two._id,
+                self.keyword_sample._id,
+                self.keyword_crawl_outdated._id,
+            ],
+            "The keywords should be found in the order of the IDs",
+        )
+
     def test_add_index_to_keyword_simple(self):
         keyword_id = self.keyword_sample._id
         index_id = ObjectId()
@@ -437,3 +487,18 @@ class QueriesKeywordTests(QueryTests):
             ],
             "Should have found the correct keyword",
         )
+
+    def test_iter_outdated_keywords(self):
+        self.load_crawls(
+            [self.crawl_outdated, self.crawl_outdated_two, self.crawl_outdated_three]
+        )
+        timestamp = datetime.now()
+        keywords = self.mongo_controller.iter_outdated_keywords(
+            timestamp, batch_size=1, cast=True
+        )
+
+        self.assertEqual(
+            [keyword._id for keyword in keywords],
+            [self.keyword_crawl_outdated._id, self.keyword_crawl_outdated_two._id],
+            "Should have streamed the correct keywords",
+        )
@@ -1,3 +1,5 @@
+from bson import ObjectId
+
 from test.mongo.controller.setup import QueryTests
 
 
@@ -15,3 +17,15 @@ class QueriesMetaTests(QueryTests):
 
         is_initialised = self.mongo_controller.is_meta_initialised()
         self.assertTrue(is_initialised, "Should be initialised")
+
+    def test_set_meta_keywords_public_ids_return_object(self):
+        keywords_public_ids = [ObjectId(), ObjectId()]
+
+        result = self.mongo_controller.set_meta_keywords_public_ids(
+            keywords_public_ids, return_object=True
+        )
+
+        self.assertEqual(result, keywords_public_ids)
+        self.assertEqual(
+            self.mongo_controller.get_meta_keywords_public_ids(), keywords_public_ids
+        )
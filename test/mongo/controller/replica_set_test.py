@@ -0,0 +1,92 @@
+"""
+Check the read preference routing against a replica set
+
+The tests only run if MONGO_REPLICA_SET_URL points to a replica set with at least
+one secondary, e.g. mongodb://localhost:27017,localhost:27018/?replicaSet=rs0
+"""
+import os
+
+from datetime import datetime
+from unittest import TestCase, skipIf
+from pymongo import WriteConcern, monitoring
+
+from common.mongo.controller import MongoController
+from common.mongo.controller.queries_crawls_twitter import crawl_twitter_document
+from common.config import SUPPORTED_LANGUAGES
+
+DB_NAME = "apoa-unit-testing"
+REPLICA_SET_URL = os.environ.get("MONGO_REPLICA_SET_URL")
+
+
+class CommandAddresses(monitoring.CommandListener):
+    """
+    Remember the servers every command was sent to
+    """
+
+    def __init__(self):
+        self.addresses = {}
+
+    def started(self, event):
+        self.addresses.setdefault(event.command_name, set()).add(event.connection_id)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@skipIf(REPLICA_SET_URL is None, "MONGO_REPLICA_SET_URL is not set")
+class ReplicaSetTests(TestCase):
+    def setUp(self) -> None:
+        self.command_addresses = CommandAddresses()
+
+        self.mongo_controller = MongoController(
+            REPLICA_SET_URL,
+            DB_NAME,
+            configure=True,
+            analytics_read_preference="secondary",
+            max_staleness_seconds=90,
+            event_listeners=[self.command_addresses],
+        )
+
+        self.keyword_id = self.mongo_controller.add_keyword(
+            "replica set keyword", SUPPORTED_LANGUAGES[0], "some user"
+        ).inserted_id
+
+        # Make sure the crawl was replicated before reading from a secondary
+        crawls = self.mongo_controller.crawls_collection.with_options(
+            write_concern=WriteConcern(w="majority")
+        )
+        crawls.insert_one(
+            crawl_twitter_document(
+                self.keyword_id, 1, "some text", 0, 0, datetime.now()
+            )
+        )
+
+        self.command_addresses.addresses.clear()
+
+    def tearDown(self) -> None:
+        self.mongo_controller.client.drop_database(DB_NAME)
+        self.mongo_controller.client.close()
+
+    def test_analytics_on_secondary(self):
+        self.mongo_controller.get_entities(self.keyword_id)
+        self.mongo_controller.get_crawls_average_score(self.keyword_id)
+
+        self.assertTrue(
+            self.command_addresses.addresses["aggregate"]
+            <= self.mongo_controller.client.secondaries,
+            "The analytics aggregations should be served by secondaries",
+        )
+
+    def test_leasing_on_primary(self):
+        self.mongo_controller.claim_unprocessed_crawls("some worker")
+
+        # The candidates are found, leased and read back with find and update
+        for command_name in ["find", "update"]:
+            self.assertEqual(
+                self.command_addresses.addresses[command_name],
+                {self.mongo_controller.client.primary},
+                f"{command_name} should be sent to the primary",
+            )
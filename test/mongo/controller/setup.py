@@ -58,7 +58,7 @@ class QueryTests(TestCase):
     )
 
     def setUp(self) -> None:
-        self.mongo_controller = MongoController(db_name=DB_NAME)
+        self.mongo_controller = MongoController(db_name=DB_NAME, configure=True)
 
         # General setup
         self.mongo_controller.set_meta_keywords_public_ids([])
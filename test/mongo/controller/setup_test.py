@@ -0,0 +1,19 @@
+from test.mongo.controller.setup import QueryTests
+
+
+class SetupTests(QueryTests):
+    def test_find_collection_scans(self):
+        collection_scans = self.mongo_controller.find_collection_scans()
+        self.assertEqual(
+            collection_scans, [], "Every query should be backed by an index"
+        )
+
+    def test_find_collection_scans_no_indexes(self):
+        self.mongo_controller.crawls_collection.drop_indexes()
+
+        collection_scans = self.mongo_controller.find_collection_scans()
+        self.assertIn(
+            "get_unprocessed_crawls",
+            collection_scans,
+            "Without indexes the crawls should be scanned",
+        )
@@ -0,0 +1,180 @@
+from datetime import datetime
+
+from common.exceptions.parameters import UnsupportedCrawlTypeError
+from common.mongo.controller import MongoController
+from common.mongo.crawl_writer import CrawlWriter
+from common.mongo.data_types.crawling.enums.crawl_types import CrawlTypes
+from test.mongo.controller.setup import QueryTests, DB_NAME
+
+
+class CrawlWriterTests(QueryTests):
+    def setUp(self) -> None:
+        super().setUp()
+        self.load_sample_keyword()
+
+    def test_add_unsupported_crawl_type(self):
+        writer = CrawlWriter(self.mongo_controller)
+
+        self.assertRaises(
+            UnsupportedCrawlTypeError,
+            writer.add,
+            CrawlTypes.NEUTRAL.value,
+            self.keyword_sample._id,
+        )
+
+    def test_flush_on_exit(self):
+        with CrawlWriter(self.mongo_controller) as writer:
+            writer.add(
+                CrawlTypes.TWITTER.value,
+                self.keyword_sample._id,
+                tweet_id=1,
+                text="some tweet",
+                likes=0,
+                retweets=0,
+                timestamp=datetime.now(),
+            )
+            writer.add(
+                CrawlTypes.NEWS.value,
+                self.keyword_sample._id,
+                author="some author",
+                title="some title",
+                text="some article",
+                timestamp=datetime.now(),
+            )
+            writer.add(
+                CrawlTypes.NYT.value,
+                self.keyword_sample._id,
+                article_id="some article id",
+                text="some article",
+                timestamp=datetime.now(),
+            )
+            self.assertEqual(
+                self.mongo_controller.crawls_collection.count_documents({}),
+                0,
+                "Nothing should be written before the flush",
+            )
+
+        self.assertEqual(
+            self.mongo_controller.crawls_collection.count_documents({}),
+            3,
+            "All crawls should have been written on exit",
+        )
+        self.assertEqual(len(writer), 0, "The buffer should be empty")
+
+    def test_flush_on_batch_size(self):
+        writer = CrawlWriter(self.mongo_controller, max_batch_size=5)
+
+        for i in range(12):
+            writer.add(
+                CrawlTypes.NYT.value,
+                self.keyword_sample._id,
+                article_id=f"article {i}",
+                text="some article",
+                timestamp=datetime.now(),
+            )
+
+        self.assertEqual(len(writer), 2, "Two crawls should still be buffered")
+        self.assertEqual(
+            self.mongo_controller.crawls_collection.count_documents({}),
+            10,
+            "Two full batches should have been written",
+        )
+
+    def test_flush_on_deadline(self):
+        writer = CrawlWriter(self.mongo_controller, max_delay_seconds=0)
+
+        writer.add(
+            CrawlTypes.NYT.value,
+            self.keyword_sample._id,
+            article_id="some article id",
+            text="some article",
+            timestamp=datetime.now(),
+        )
+
+        self.assertEqual(len(writer), 0, "The deadline should have triggered a flush")
+
+    def test_flush_if_due(self):
+        writer = CrawlWriter(self.mongo_controller, max_delay_seconds=60)
+        writer.add(
+            CrawlTypes.NYT.value,
+            self.keyword_sample._id,
+            article_id="some article id",
+            text="some article",
+            timestamp=datetime.now(),
+        )
+
+        self.assertIsNone(writer.flush_if_due(), "The deadline was not reached")
+
+        writer.deadline = 0
+        writer.flush_if_due()
+
+        self.assertEqual(len(writer), 0, "The due buffer should have been flushed")
+
+    def test_flush_error_index(self):
+        writer = CrawlWriter(self.mongo_controller, max_batch_size=3)
+
+        for i in range(6):
+            writer.add(
+                CrawlTypes.NYT.value,
+                self.keyword_sample._id,
+                article_id=f"article {i}",
+                text=None if i == 4 else "some article",  # Violates the schema
+                timestamp=datetime.now(),
+            )
+
+        self.assertEqual(
+            [error["index"] for error in writer.results["errors"]],
+            [4],
+            "The error should point to the crawl rather than the operation of a flush",
+        )
+
+    def test_flush_unacknowledged(self):
+        mongo_controller = MongoController(db_name=DB_NAME, bulk_write_concern="0")
+
+        with CrawlWriter(mongo_controller) as writer:
+            writer.add(
+                CrawlTypes.NYT.value,
+                self.keyword_sample._id,
+                article_id="some article id",
+                text="some article",
+                timestamp=datetime.now(),
+            )
+        mongo_controller.client.close()
+
+        self.assertFalse(writer.results["acknowledged"])
+        self.assertIsNone(writer.results["upserted"], "The counts should be unknown")
+
+    def test_dedupe_in_buffer(self):
+        with CrawlWriter(self.mongo_controller) as writer:
+            for author in ["some author", "some author", "another author"]:
+                writer.add(
+                    CrawlTypes.NEWS.value,
+                    self.keyword_sample._id,
+                    author=author,
+                    title="some title",
+                    text="some article",
+                    timestamp=datetime.now(),
+                )
+
+            self.assertEqual(len(writer), 2, "Author + title identify an article")
+
+        self.assertEqual(writer.results["upserted"], 2)
+
+    def test_flush_keeps_processing_results(self):
+        for _ in range(2):
+            with CrawlWriter(self.mongo_controller) as writer:
+                writer.add(
+                    CrawlTypes.NYT.value,
+                    self.keyword_sample._id,
+                    article_id="some article",
+                    text="some article",
+                    timestamp=datetime.now(),
+                )
+            self.mongo_controller.crawls_collection.update_many(
+                {}, {"$set": {"score": 1}}
+            )
+
+        self.assertEqual(writer.results["matched"], 1, "The article was stored")
+        self.assertEqual(
+            self.mongo_controller.crawls_collection.count_documents({"score": 1}), 1
+        )
@@ -39,6 +39,40 @@ class ValidateIdTests(ValidationTests):
 
         self.assertEqual(_id_converted, _id, "Should have done nothing")
 
+    def test_validate_id_keyword_argument(self):
+        @validate_id("_id")
+        def test(_id):
+            return _id
+
+        _id = ObjectId()
+        _id_converted = test(_id=str(_id))
+
+        self.assertEqual(_id_converted, _id, "Should have casted the id")
+
+    def test_validate_id_multiple(self):
+        @validate_id(["keyword_id", "index_id"])
+        def test(self, keyword_id, index_id, cast=False):
+            return keyword_id, index_id
+
+        keyword_id = ObjectId()
+        index_id = ObjectId()
+        ids_converted = test(None, str(keyword_id), index_id=str(index_id))
+
+        self.assertEqual(
+            ids_converted, (keyword_id, index_id), "Should have casted both ids"
+        )
+
+    def test_validate_id_wraps(self):
+        @validate_id("_id")
+        def test(_id):
+            """
+            Some docstring
+            """
+            return _id
+
+        self.assertEqual(test.__name__, "test", "Should keep the name")
+        self.assertIn("Some docstring", test.__doc__, "Should keep the docstring")
+
 
 class ParseParameterTests(ValidationTests):
     def test_parse_parameter_str(self):
@@ -0,0 +1,140 @@
+from unittest import TestCase
+from bson import ObjectId
+
+from common.exceptions.parameters import InvalidParameterError
+from common.mongo import operations
+from common.utils.cache import TTLCache
+
+
+class BulkWriteResultTests(TestCase):
+    def test_bulk_batches(self):
+        batches = list(operations.bulk_batches(list(range(5)), 2))
+
+        self.assertEqual(batches, [(0, [0, 1]), (2, [2, 3]), (4, [4])])
+
+    def test_bulk_batches_invalid_size(self):
+        with self.assertRaises(InvalidParameterError):
+            list(operations.bulk_batches([1], 0))
+
+    def test_merge_bulk_write_result(self):
+        result = operations.bulk_write_result()
+        details = {
+            "nMatched": 1,
+            "nModified": 1,
+            "nUpserted": 2,
+            "writeErrors": [{"index": 1}],
+        }
+
+        operations.merge_bulk_write_result(result, details, 10)
+
+        self.assertEqual(result["upserted"], 2)
+        self.assertEqual(
+            result["errors"],
+            [{"index": 11}],
+            "The error should point to the position within all operations",
+        )
+
+    def test_merge_bulk_write_result_unacknowledged(self):
+        result = operations.bulk_write_result()
+
+        operations.merge_bulk_write_result(result, None, 0)
+        operations.merge_bulk_write_result(
+            result,
+            {"nMatched": 1, "nModified": 0, "nUpserted": 0, "writeErrors": []},
+            1,
+        )
+
+        self.assertFalse(result["acknowledged"])
+        self.assertIsNone(result["matched"], "The counts are unknown")
+
+
+class CrawlUpsertsTests(TestCase):
+    def test_crawl_upserts_last_occurrence_wins(self):
+        documents = [
+            {"tweet_id": 1, "likes": 1},
+            {"tweet_id": 2, "likes": 2},
+            {"tweet_id": 1, "likes": 3},
+        ]
+
+        write_operations, positions = operations.crawl_upserts(
+            documents, ["tweet_id"], ["likes"]
+        )
+
+        self.assertEqual(len(write_operations), 2)
+        self.assertEqual(positions, [2, 1])
+
+        result = operations.bulk_write_result()
+        result["errors"] = [{"index": 0}]
+        operations.point_errors_to_documents(result, documents, positions, ["tweet_id"])
+
+        self.assertEqual(result["errors"], [{"index": 2, "tweet_id": 1}])
+
+
+class ProcessingResultsTests(TestCase):
+    def test_processing_results_updates(self):
+        scored, processed = ObjectId(), ObjectId()
+
+        write_operations, updates, rollup_ids = operations.processing_results_updates(
+            [
+                {"_id": scored, "score": 0.5},
+                {"_id": processed, "entities": []},
+                {"_id": ObjectId()},
+            ]
+        )
+
+        self.assertEqual(len(write_operations), 2, "Empty results are skipped")
+        self.assertEqual(rollup_ids, [processed])
+
+    def test_processing_results_updates_duplicate(self):
+        _id = ObjectId()
+
+        with self.assertRaises(InvalidParameterError):
+            operations.processing_results_updates(
+                [{"_id": _id, "score": 0.5}, {"_id": _id, "score": 1}]
+            )
+
+    def test_processing_results_rollups_failed(self):
+        keyword_ref = ObjectId()
+        written, failed = ObjectId(), ObjectId()
+        updates = [(written, {"entities": []}), (failed, {"entities": []})]
+        previous = {
+            _id: {"_id": _id, "keyword_ref": keyword_ref, "entities": []}
+            for _id in [written, failed]
+        }
+        result = operations.bulk_write_result()
+        result["errors"] = [{"index": 1}]
+
+        rollups = operations.processing_results_rollups(updates, previous, result)
+
+        self.assertEqual(rollups["entities"], [(keyword_ref, [], [])])
+        self.assertEqual(rollups["categories"], [])
+
+
+class KeywordFieldsTests(TestCase):
+    def test_keyword_fields_cached(self):
+        cache = TTLCache()
+        cached, missing, deleted = ObjectId(), ObjectId(), ObjectId()
+        cache.set(cached, {"keyword_string": "cached", "language": "en"})
+        crawls = [
+            {"keyword_ref": cached},
+            {"keyword_ref": missing},
+            {"keyword_ref": deleted},
+            {"keyword_ref": ObjectId(), "keyword_string": "stored"},
+        ]
+
+        keyword_fields_by_ref, to_fetch = operations.cached_keyword_fields(
+            crawls, cache
+        )
+
+        self.assertEqual(list(keyword_fields_by_ref), [cached])
+        self.assertEqual(set(to_fetch), {missing, deleted})
+
+        keyword = {"_id": missing, "keyword_string": "missing", "language": "en"}
+        operations.cache_keyword_fields(
+            keyword_fields_by_ref, to_fetch, [keyword], cache
+        )
+
+        self.assertEqual(keyword_fields_by_ref[missing]["keyword_string"], "missing")
+        self.assertEqual(
+            cache.get(deleted), {}, "Keywords which don't exist should be cached"
+        )
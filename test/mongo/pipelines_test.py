@@ -0,0 +1,115 @@
+from unittest import TestCase
+from bson import ObjectId
+
+from common.mongo import pipelines
+
+
+class RollupUpdatesTests(TestCase):
+    keyword_ref = ObjectId()
+
+    def test_rollup_updates_difference(self):
+        previous = [
+            {"value": "kept", "count": 1, "score": 0.5},
+            {"value": "removed", "count": 2, "score": 0.25},
+        ]
+        current = [
+            {"value": "kept", "count": 1, "score": 0.5},
+            {"value": "added", "count": 3, "score": 1},
+        ]
+
+        updates = pipelines.rollup_updates(
+            "entities", [(self.keyword_ref, previous, current)]
+        )
+
+        self.assertEqual(
+            {query["value"]: update["$inc"] for query, update in updates},
+            {
+                "removed": {
+                    "count": -2,
+                    "occurrences": -1,
+                    "measure_sum": -0.25,
+                    "measured": -1,
+                },
+                "added": {
+                    "count": 3,
+                    "occurrences": 1,
+                    "measure_sum": 1,
+                    "measured": 1,
+                },
+            },
+            "Unchanged values should not be updated",
+        )
+
+    def test_rollup_updates_combined(self):
+        categories = [{"value": "some category", "count": 1, "confidence": 0.5}]
+
+        updates = pipelines.rollup_updates(
+            "categories",
+            [(self.keyword_ref, None, categories), (self.keyword_ref, [], categories)],
+        )
+
+        self.assertEqual(
+            updates,
+            [
+                (
+                    {
+                        "keyword_ref": self.keyword_ref,
+                        "kind": "categories",
+                        "value": "some category",
+                    },
+                    {
+                        "$inc": {
+                            "count": 2,
+                            "occurrences": 2,
+                            "measure_sum": 1.0,
+                            "measured": 2,
+                        }
+                    },
+                )
+            ],
+            "Changes of the same value should be combined",
+        )
+
+    def test_rollup_updates_missing_measure(self):
+        entities = [
+            {"value": "some entity", "count": 1, "score": 0.5},
+            {"value": "some entity", "count": 1},
+            {"value": "some entity", "count": 1, "score": None},
+        ]
+
+        updates = pipelines.rollup_updates(
+            "entities", [(self.keyword_ref, None, entities)]
+        )
+
+        self.assertEqual(
+            updates[0][1]["$inc"],
+            {"count": 3, "occurrences": 3, "measure_sum": 0.5, "measured": 1},
+            "Missing measures should be left out of the average like $avg does",
+        )
+
+
+class KeywordJoinTests(TestCase):
+    keyword_ref = ObjectId()
+    keyword_fields = {"keyword_string": "some keyword", "language": "en"}
+
+    def test_crawls_with_keywords(self):
+        crawls = [
+            {"_id": 0, "keyword_ref": self.keyword_ref},
+            dict({"_id": 1, "keyword_ref": ObjectId()}, **self.keyword_fields),
+            {"_id": 2, "keyword_ref": ObjectId()},
+        ]
+
+        self.assertCountEqual(
+            pipelines.missing_keyword_refs(crawls + crawls[:1]),
+            [self.keyword_ref, crawls[2]["keyword_ref"]],
+            "Only the distinct keywords of crawls without the fields are missing",
+        )
+
+        joined = pipelines.crawls_with_keywords(
+            crawls,
+            {self.keyword_ref: self.keyword_fields, crawls[2]["keyword_ref"]: {}},
+        )
+
+        self.assertEqual([crawl["_id"] for crawl in joined], [0, 1])
+        self.assertEqual(joined[0]["keyword_string"], "some keyword")
+        self.assertNotIn("keyword_string", crawls[0], "The input is not changed")
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from common.mongo.controller.connection import resolve_target
+from common.mongo.registry import get_controller, get_client, clear_controllers
+
+DB_NAME = "apoa-unit-testing"
+
+
+class RegistryTests(TestCase):
+    def tearDown(self) -> None:
+        clear_controllers()
+
+    def test_get_controller_reused(self):
+        mongo_controller = get_controller(db_name=DB_NAME)
+
+        self.assertIs(
+            mongo_controller,
+            get_controller(db_name=DB_NAME),
+            "The controller should be reused within the process",
+        )
+        self.assertIs(mongo_controller.client, get_client(db_name=DB_NAME))
+
+    def test_get_controller_per_database(self):
+        self.assertIsNot(
+            get_controller(db_name=DB_NAME),
+            get_controller(db_name=DB_NAME + "-other"),
+            "Every database should get its own controller",
+        )
+
+    def test_get_controller_shares_client(self):
+        self.assertIs(
+            get_controller(db_name=DB_NAME).client,
+            get_controller(db_name=DB_NAME + "-other").client,
+            "The databases should share the client of the connection string",
+        )
+
+    def test_get_controller_resolved_connection_string(self):
+        connection_string, _ = resolve_target()
+
+        self.assertIs(
+            get_controller(db_name=DB_NAME),
+            get_controller(connection_string, DB_NAME),
+            "The default and the explicit connection string should match",
+        )
+
+    def test_clear_controllers(self):
+        mongo_controller = get_controller(db_name=DB_NAME)
+        clear_controllers()
+
+        self.assertIsNot(mongo_controller, get_controller(db_name=DB_NAME))
@@ -0,0 +1,53 @@
+from unittest import TestCase
+
+from common.utils.cache import TTLCache
+
+
+class TTLCacheTests(TestCase):
+    def test_get_missing(self):
+        cache = TTLCache()
+
+        self.assertIsNone(cache.get("key"), "Nothing should be cached")
+        self.assertEqual(cache.stats()["misses"], 1, "A miss should be counted")
+
+    def test_get_hit(self):
+        cache = TTLCache()
+        cache.set("key", "value")
+
+        self.assertEqual(cache.get("key"), "value", "The value should be cached")
+        self.assertEqual(cache.stats()["hits"], 1, "A hit should be counted")
+
+    def test_ttl(self):
+        cache = TTLCache(ttl_seconds=0)
+        cache.set("key", "value")
+
+        self.assertIsNone(cache.get("key"), "The entry should have expired")
+        self.assertEqual(len(cache), 0, "The expired entry should be removed")
+
+    def test_lru_eviction(self):
+        cache = TTLCache(max_size=2)
+        cache.set("one", 1)
+        cache.set("two", 2)
+        cache.get("one")
+        cache.set("three", 3)
+
+        self.assertEqual(cache.peek("one"), 1, "Recently used entries are kept")
+        self.assertIsNone(cache.peek("two"), "The least recently used is evicted")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_peek_no_stats(self):
+        cache = TTLCache()
+        cache.set("key", "value")
+        cache.peek("key")
+        cache.peek("missing")
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (0, 0))
+
+    def test_delete(self):
+        cache = TTLCache()
+        cache.set("key", "value")
+        cache.delete("key")
+        cache.delete("missing")
+
+        self.assertIsNone(cache.get("key"), "The entry should have been deleted")
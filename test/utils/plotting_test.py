@@ -0,0 +1,95 @@
+import warnings
+
+from copy import deepcopy
+from datetime import datetime, timedelta
+from random import randint, random, seed
+from unittest import TestCase, skipIf
+
+from common.utils import plotting
+from common.utils.plotting import accumulate_scores_numpy, accumulate_scores_python
+
+
+def generate_plotting_data(amount: int, cast_to_string=True):
+    seed(amount)
+    timestamp = datetime(2020, 1, 1)
+    plotting_data = []
+    for i in range(amount):
+        timestamp += timedelta(minutes=randint(0, 90))
+        plotting_data.append(
+            {
+                "timestamp": timestamp.isoformat() if cast_to_string else timestamp,
+                "score": random() * 2 - 1,
+                "count": randint(1, 5),
+            }
+        )
+    return plotting_data
+
+
+class AccumulateScoresPythonTests(TestCase):
+    def test_accumulate_scores_no_data(self):
+        self.assertEqual(accumulate_scores_python([], 60), [])
+
+    def test_accumulate_scores(self):
+        plotting_data = [
+            {"timestamp": "2020-01-01T00:00:00", "score": 1, "count": 1},
+            {"timestamp": "2020-01-01T01:00:00", "score": 0, "count": 3},
+            {"timestamp": "2020-01-01T01:01:00", "score": 1, "count": 1},
+        ]
+
+        plotting_data_accumulated = accumulate_scores_python(plotting_data, 60)
+
+        self.assertEqual(
+            plotting_data_accumulated,
+            [
+                {"timestamp": "2020-01-01T00:00:00", "score": 0.25, "count": 4},
+                {"timestamp": "2020-01-01T01:01:00", "score": 1, "count": 1},
+            ],
+            "The cut off should be inclusive",
+        )
+
+
+@skipIf(plotting.np is None, "NumPy is not installed")
+class AccumulateScoresNumpyTests(TestCase):
+    def assert_same_output(self, plotting_data: list, granularity: int):
+        expected = accumulate_scores_python(deepcopy(plotting_data), granularity)
+        result = accumulate_scores_numpy(plotting_data, granularity)
+
+        self.assertEqual(len(result), len(expected), "Same amount of buckets")
+        for data, data_expected in zip(result, expected):
+            self.assertEqual(data["timestamp"], data_expected["timestamp"])
+            self.assertEqual(data["count"], data_expected["count"])
+            self.assertAlmostEqual(data["score"], data_expected["score"])
+
+    def test_accumulate_scores_no_data(self):
+        self.assertEqual(accumulate_scores_numpy([], 60), [])
+
+    def test_accumulate_scores_strings(self):
+        self.assert_same_output(generate_plotting_data(1000), 60)
+
+    def test_accumulate_scores_datetimes(self):
+        self.assert_same_output(generate_plotting_data(1000, cast_to_string=False), 120)
+
+    def test_accumulate_scores_non_iso_strings(self):
+        plotting_data = generate_plotting_data(100, cast_to_string=False)
+        for data in plotting_data:
+            data["timestamp"] = data["timestamp"].strftime("%a %b %d %H:%M:%S +0000 %Y")
+
+        self.assert_same_output(plotting_data, 60)
+
+    def test_accumulate_scores_unsorted(self):
+        plotting_data = generate_plotting_data(100)
+        plotting_data.reverse()
+
+        self.assert_same_output(plotting_data, 60)
+
+    def test_accumulate_scores_zero_counts(self):
+        plotting_data = [
+            {"timestamp": "2020-01-01T00:00:00", "score": 0.5, "count": 0},
+            {"timestamp": "2020-01-01T02:00:00", "score": 0, "count": 0},
+            {"timestamp": "2020-01-01T02:30:00", "score": 1, "count": 2},
+            {"timestamp": "2020-01-01T04:00:00", "score": 0.25, "count": 0},
+        ]
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")  # No division by zero
+            self.assert_same_output(plotting_data, 60)